@@ -3,23 +3,54 @@ These include results of client.retrieve() client.find().
 """
 
 from collections import UserList
+import os.path
 
-#!import copy
+import copy
 from sparcl.utils import _AttrDict
+from sparcl.spectra_store import SpectraStore, STORE_FILE
+from sparcl.shared import SharedSpectra
 
 # from sparcl.gather_2d import bin_spectra_records
 import sparcl.exceptions as ex
+from sparcl.dedup import keep_mask
 from warnings import warn
 
 
+# Convert Internal field names of record REC to Science field names.
+# RETURN: new record, or None if a field has no Science field name.
+def science_record(rec, fields):
+    newrec = dict()
+    dr = rec["_dr"]
+    for orig in rec.keys():
+        if orig == "_dr":
+            # keep DR around unchanged. We need it to rename back
+            # to Internal Field Names later.
+            newrec[orig] = rec[orig]
+        else:
+            new = fields._science_name(orig, dr)
+            if new is None:
+                return None  # We don't have name mapping, toss rec
+            newrec[new] = rec[orig]
+    return _AttrDict(newrec)
+
+
 class Results(UserList):
-    def __init__(self, dict_list, client=None):
+    # RENAMED: records of DICT_LIST already have Science field names.
+    def __init__(self, dict_list, client=None, renamed=False):
         super().__init__(dict_list)
         self.hdr = dict_list[0]
         self.recs = dict_list[1:]
         self.client = client
         self.fields = client.fields
-        self.to_science_fields()
+        # Timings of the client call that produced this collection.
+        # Seconds spent in each phase: connect, ttfb (time to first byte),
+        # download, decompress, unpickle (or decode), merge (of a split
+        # find), rename, total.
+        # Plus bytes (transferred) and records (count).
+        # Set by the client.
+        self.timings = dict()
+        if not renamed:
+            self.to_science_fields()
 
         # HACK 12/14/2023 -sp- to fix UUID problem presumably
         # produced on stack version upgrade (to Django 4.2, postgres 13+)
@@ -61,21 +92,9 @@ class Results(UserList):
     def to_science_fields(self):  # from_orig
         newrecs = list()
         for rec in self.recs:
-            newrec = dict()
-            dr = rec["_dr"]
-            keep = True
-            for orig in rec.keys():
-                if orig == "_dr":
-                    # keep DR around unchanged. We need it to rename back
-                    # to Internal Field Names later.
-                    newrec[orig] = rec[orig]
-                else:
-                    new = self.fields._science_name(orig, dr)
-                    if new is None:
-                        keep = False  # We don't have name mapping, toss rec
-                    newrec[new] = rec[orig]
-            if keep:
-                newrecs.append(_AttrDict(newrec))
+            newrec = science_record(rec, self.fields)
+            if newrec is not None:
+                newrecs.append(newrec)
         self.recs = newrecs
 
     # Convert Science field names to Internal field names.
@@ -111,6 +130,39 @@ class Results(UserList):
         self.recs = newrecs
         return self.recs
 
+    def dedup(self, by=("targetid",), radius=None, prefer=("specprimary",)):
+        """Remove duplicate records (the same object in several Data Sets
+        or observed more than once).  Use on the results of find() before
+        retrieve() so duplicate spectra are never downloaded.
+
+        Args:
+            by (:obj:`list`, optional): Fields whose values (all of them)
+                identify an object. Defaults to ("targetid",).
+
+            radius (float, optional): Records within RADIUS degrees of
+                each other (by ra and dec) are also duplicates. Requires
+                scipy. Defaults to None.
+
+            prefer (:obj:`list`, optional): Keep the first record of a
+                group of duplicates with a true value of these fields.
+                Defaults to ("specprimary",).
+
+        Returns:
+            A collection of the same type containing the records kept
+            (in their original order).
+
+        Example:
+            >>> client = SparclClient()
+            >>> outs = ['sparcl_id', 'targetid', 'specprimary']
+            >>> found = client.find(outfields=outs).dedup()
+            >>> got = client.retrieve(found.ids)
+        """
+        keep = keep_mask(self.recs, by=by, radius=radius, prefer=prefer)
+        new = copy.copy(self)
+        new.recs = [rec for rec, kept in zip(self.recs, keep) if kept]
+        new.data = [self.hdr] + new.recs
+        return new
+
     def reorder(self, ids_og):
         """
         Reorder the retrieved records to be in the same
@@ -185,12 +237,61 @@ class Results(UserList):
 class Retrieved(Results):
     """Holds spectra records (and header)."""
 
-    def __init__(self, dict_list, client=None):
-        super().__init__(dict_list, client=client)
+    def __init__(self, dict_list, client=None, renamed=False):
+        super().__init__(dict_list, client=client, renamed=renamed)
 
     def __repr__(self):
         return f"Retrieved Results: {len(self.recs)} records"
 
+    def to_store(self, path, *, fields=None, dtype=None):
+        """Write spectra fields of records to a memory-mapped store.
+
+        Args:
+            path (:obj:`str`): Directory to hold the store. If it already
+                contains a store, records are appended to it.
+
+            fields (:obj:`list`, optional): Spectra fields to put in a new
+                store. Defaults to None, meaning all spectra fields.
+                For an existing store, must be its fields (if given).
+
+            dtype (:obj:`str`, optional): Dtype for floating point fields
+                of a new store. Defaults to None (dtype of records).
+                For an existing store, must be its dtype (if given).
+
+        Returns:
+            :class:`~sparcl.spectra_store.SpectraStore`: Read-only store.
+        """
+        if os.path.exists(os.path.join(path, STORE_FILE)):
+            store = SpectraStore(path, mode="r+")
+            store.check(fields=fields, dtype=dtype)
+        else:
+            store = SpectraStore.create(path, fields=fields, dtype=dtype)
+        with store:
+            store.append(self.recs)
+        return SpectraStore(path)
+
+    def to_shared(self, fields=None):
+        """Copy spectra fields of records to shared memory, for pools of
+        worker processes.  Pass the (small, picklable) handle to workers
+        instead of records; they get NumPy views, not copies.
+
+        Args:
+            fields (:obj:`list`, optional): Fields to copy. Defaults to
+                None, meaning every field holding an array.
+
+        Returns:
+            :class:`~sparcl.shared.SharedSpectra`: Handle that owns the
+            shared memory. Call release() (or use it in a with-block) to
+            remove it. Record i of the handle is record i of this
+            collection.
+
+        Example:
+            >>> got = client.retrieve(ids, include=['flux'])
+            >>> with got.to_shared() as spectra:
+            ...     flux = spectra.array('flux', 0)
+        """
+        return SharedSpectra.create(self.recs, fields=fields)
+
 
 #!    def bin_spectra(self):
 #!        """Align flux from all records by common wavelength bin.
@@ -217,6 +318,45 @@ class Retrieved(Results):
 #!        return flux2d, wavs
 
 
+class RecordStream:
+    """Records of client.retrieve_stream() in the order they are
+    received. Each record (a dictionary with Science field names) can be
+    used as soon as it has been received; before the rest of the
+    response. A stream can only be iterated once.
+
+    Attributes:
+        hdr (dict): Header from Server (available once the first record
+            has been received).
+        count (int): Number of records received so far.
+        timings (dict): Timings of the call (see Results.timings).
+            Available after the last record.
+    """
+
+    def __init__(self):
+        self.hdr = None
+        self.count = 0
+        self.timings = dict()
+        self._records = iter(())
+
+    def __repr__(self):
+        return f"RecordStream: {self.count} records received"
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._records)
+
+    @property
+    def info(self):
+        """Info about this collection (header from Server)."""
+        return self.hdr
+
+    def close(self):
+        """Stop receiving records (and release the connection)."""
+        self._records.close()
+
+
 class Found(Results):
     """Holds metadata records (and header)."""
 
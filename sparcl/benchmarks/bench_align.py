@@ -0,0 +1,170 @@
+#! /usr/bin/env python
+"""Benchmark speed of sparcl.gather_2d.align_records().
+Compares against the original (Decimal and list.index based) algorithm.
+Uses synthetic records so no Server is needed.
+"""
+# EXAMPLES:
+# cd ~/sandbox/sparclclient
+# python3 -m sparcl.benchmarks.bench_align
+# python3 -m sparcl.benchmarks.bench_align --numrecs 1000 --skip-reference
+
+# Standard Python library
+import argparse
+from decimal import Decimal
+import json
+
+# External packages
+import numpy as np
+
+# Local packages
+from sparcl.gather_2d import align_records
+from sparcl.utils import _AttrDict, tic, toc, here_now
+
+
+###############################################################################
+# Reference (original) implementation of align_records().
+# Kept to verify the vectorized implementation gives identical results
+# and to measure speedup.
+
+
+def _ref_wavelength_grid_offsets(records, precision=11):
+    PLACES = Decimal(10) ** -precision
+    gset = set()  # Grid SET
+    for r in records:
+        gset.update([Decimal(w).quantize(PLACES) for w in r.wavelength])
+    grid = sorted(gset)
+    offsets = {
+        ri: grid.index(Decimal(rec.wavelength[0]).quantize(PLACES))
+        for ri, rec in enumerate(records)
+    }
+    return (grid, offsets)
+
+
+def _ref_validate_wavelength_alignment(records, grid, offsets, precision):
+    PLACES = Decimal(10) ** -precision
+    for ri, rec in enumerate(records):
+        for wi, rwl in enumerate(rec.wavelength):
+            recwl = Decimal(rwl).quantize(PLACES)
+            if recwl != grid[offsets[ri] + wi]:
+                msg = (
+                    f"The spectra cannot be aligned with the given"
+                    f' "precision" parameter ({precision}).'
+                    f" Try lowering the precision value."
+                )
+                raise Exception(msg)
+
+
+def ref_align_records(records, fields=["flux", "wavelength"], precision=7):
+    """Original align_records() algorithm (pure python)."""
+    grid, offsets = _ref_wavelength_grid_offsets(records, precision=precision)
+    _ref_validate_wavelength_alignment(records, grid, offsets, precision)
+    adict = dict()
+    for fld in fields:
+        ar = np.full([len(records), len(grid)], np.nan)
+        for ri, r in enumerate(records):
+            for fi, fieldValue in enumerate(r[fld]):
+                ar[ri, offsets[ri] + fi] = fieldValue
+        adict[fld] = ar
+    return adict, np.array([float(x) for x in grid])
+
+
+###############################################################################
+
+
+# BOSS-like records: log-linear wavelength, different start/length per record
+def boss_records(numrecs, npix=4600, seed=0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for ri in range(numrecs):
+        start = int(rng.integers(0, 80))
+        length = npix - int(rng.integers(0, 100))
+        loglam = 3.5523 + 1e-4 * (start + np.arange(length))
+        records.append(
+            _AttrDict(
+                _dr="BOSS-DR16",
+                wavelength=10**loglam,
+                flux=rng.normal(10, 2, length),
+                ivar=rng.uniform(0.5, 2, length),
+                model=rng.normal(10, 1, length),
+            )
+        )
+    return records
+
+
+def run_align(numrecs, fields, precision=7, reference=True, verbose=True):
+    records = boss_records(numrecs)
+    result = dict(numrecs=numrecs, numfields=len(fields), precision=precision)
+
+    tic()
+    adict, grid = align_records(records, fields=fields, precision=precision)
+    result["elapsed"] = toc()
+    result["rate"] = numrecs / result["elapsed"]
+
+    if reference:
+        tic()
+        ref_dict, ref_grid = ref_align_records(
+            records, fields=fields, precision=precision
+        )
+        result["ref_elapsed"] = toc()
+        result["speedup"] = result["ref_elapsed"] / result["elapsed"]
+        result["identical"] = bool(
+            np.array_equal(grid, ref_grid)
+            and all(
+                np.array_equal(adict[f], ref_dict[f], equal_nan=True)
+                for f in fields
+            )
+        )
+    if verbose:
+        print(f"Run-Result: {result}")
+    return result
+
+
+def my_parser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark sparcl.gather_2d.align_records()",
+        epilog="EXAMPLE: %(prog)s --numrecs 10 100 1000",
+    )
+    parser.add_argument(
+        "--numrecs",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="Number of records to align (one run per value)",
+    )
+    parser.add_argument(
+        "--fields",
+        default="wavelength,flux,ivar,model",
+        help="Comma separated list of fields to align",
+    )
+    parser.add_argument(
+        "--skip-reference",
+        action="store_true",
+        help="Do not run (slow) original algorithm for comparison",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output results as JSON",
+    )
+    return parser
+
+
+def main():
+    args = my_parser().parse_args()
+    fields = args.fields.split(",")
+    results = [
+        run_align(
+            n,
+            fields,
+            reference=not args.skip_reference,
+            verbose=not args.json,
+        )
+        for n in args.numrecs
+    ]
+    if args.json:
+        hostname, now = here_now()
+        print(json.dumps(dict(host=hostname, date=now, results=results)))
+
+
+if __name__ == "__main__":
+    main()
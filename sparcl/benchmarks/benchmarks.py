@@ -1,29 +1,59 @@
 #! /usr/bin/env python
-"""Benchmark speed of SPARC spectra retrieve with various parameters.
+"""Benchmark speed and memory of SPARCL find and retrieve.
+Each client.retrieve() is broken down into its stages (the phases of
+Results.timings): wait (time to first byte), download, decode
+(unpickle), rename (Internal to Science Field Names and wrap in
+Results); then the records are aligned.  By default, runs against a
+local stand-in server (sparcl.benchmarks.fake_server) so no real Server
+is needed.
 """
 # EXAMPLES:
 # cd ~/sandbox/sparclclient
-# python3 -m sparcl.benchmarks.benchmarks ~/data/sparc/sids5.list
-# python3 -m sparcl.benchmarks.benchmarks ~/data/sparc/sids644.list
+# python3 -m sparcl.benchmarks.benchmarks
+# python3 -m sparcl.benchmarks.benchmarks --numrecs 100 1000 --numfields 3 8
+# python3 -m sparcl.benchmarks.benchmarks --json > bench.json
+# python3 -m sparcl.benchmarks.benchmarks --url http://localhost:8050
 
 # Alice reported 22 minutes on 64K retrieved from specClient (rate=48 spec/sec)
 #   slack.spectro: 3/31/2021
 
 # Standard Python library
 import argparse
-import logging
-import os
-from pprint import pformat
+import json
+import resource
+import tracemalloc
 
 # External packages
-import psutil
+#   none
 
 # Local packages
-from ..client import SparclClient
-from ..utils import tic, toc, here_now
+from sparcl.client import SparclClient, MAX_NUM_RECORDS_RETRIEVED
+from sparcl.gather_2d import align_records
+from sparcl.utils import PhaseTimer, here_now
+from sparcl.benchmarks.fake_server import FakeSparclServer
+
+# Fields added to INCLUDE (in this order) as number of fields increases.
+allfields = [
+    "sparcl_id",
+    "wavelength",
+    "flux",
+    "ivar",
+    "model",
+    "mask",
+    "wave_sigma",
+    "redshift",
+    "ra",
+    "dec",
+]
 
-# rooturl = 'http://localhost:8030/' #@@@
-rooturl = "http://sparc1.datalab.noirlab.edu:8000/"
+# Stages of a retrieve: (stage, phase of Results.timings)
+STAGES = [
+    ("wait", "ttfb"),
+    ("download", "download"),
+    ("decompress", "decompress"),
+    ("decode", "unpickle"),
+    ("rename", "rename"),
+]
 
 
 def human_size(num, units=["b", "KB", "MB", "GB", "TB", "PB", "EB"]):
@@ -35,215 +65,116 @@ def human_size(num, units=["b", "KB", "MB", "GB", "TB", "PB", "EB"]):
     )
 
 
-# with open('/data/sparc/sids5.list') as f:
-#      specids = [int(line.strip()) for line in f if not line.startswith('#')]
-def run_retrieve(specids, columns=None, xfer="p", verbose=True):
-    #!print(f'Retrieving {len(specids):,} spectra')
-    psutil.cpu_percent()  # begin interval
-    client = SparclClient(url=rooturl)
-    result = dict(numcols=len(columns), numspecids=len(specids))
-    if verbose:
-        print(f"Experiment: {pformat(result)}")
-    tic()
-    data = client.retrieve(specids, columns=columns, xfer=xfer)
-    elapsed = toc()
-    #!cpu = psutil.cpu_percent(interval=1)
-    if verbose:
-        print(f"len(specids)={len(specids)} len(data)={len(data)}")
-    assert len(specids) == len(data)  # @@@ but some of ingest may have failed
-    assert len(data[0]["spectra__coadd__flux"]) > 1000
-    result.update(
-        elapsed=elapsed,
-        retrieved=len(data),
-        rate=len(data) / elapsed,
-        end_smrem=psutil.swap_memory().free,
-        end_vmrem=psutil.virtual_memory().available,
-        end_cpuload=os.getloadavg()[1],
-        end_cpuperc=psutil.cpu_percent(),  # end interval
-    )
-    return result
-
-
-def run_paged_retrieve(
-    specids, columns=None, xfer="p", page=5000, verbose=True, keepall=False
-):
-    """Do 1 more more PAGE size retrieves to get data for all specids"""
-    print(f"Paged Retrieve of {len(specids):,} spectra")
-    psutil.cpu_percent()  # begin interval
-    client = SparclClient(url=rooturl)
+def run_find(client, numrecs, verbose=True):
+    found = client.find(["sparcl_id", "ra", "dec"], limit=numrecs)
+    elapsed = found.timings["total"]
     result = dict(
-        numcols=len(columns), numspecids=len(specids), xfer=xfer, page=page
+        stage="find",
+        numrecs=found.count,
+        elapsed=elapsed,
+        rate=found.count / elapsed,
     )
     if verbose:
-        print(f"Experiment: {pformat(result)}")
-
-    data = []
-    datacnt = 0
-    tic()
-    for cnt in range(0, len(specids), page):
-        pdata = client.retrieve(
-            specids[cnt : cnt + page], columns=columns, xfer=xfer
-        )
-        datacnt += len(pdata)
-        if keepall:
-            data.extend(pdata)
-    elapsed = toc()
-
-    #! cpu = psutil.cpu_percent(interval=1)
+        print(f"Run-Result: {result}")
+    return result, found.ids
+
+
+# Retrieve IDS with the client; stages of the call are its phases
+# (Results.timings) plus aligning the records.
+def run_stages(client, ids, include):
+    got = client.retrieve(ids, include=include, limit=len(ids))
+    timings = got.timings
+    stages = {stage: timings.get(phase, 0.0) for stage, phase in STAGES}
+    stages["elapsed"] = timings["total"]
+
+    if "wavelength" in include and "flux" in include:
+        timer = PhaseTimer("align")
+        with timer.phase("align"):
+            # Align each Data Set separately (different wavelength grids)
+            for dr in client.fields.all_drs:
+                recs = [r for r in got.records if r["_dr"] == dr]
+                if len(recs) > 0:
+                    align_records(recs, fields=["flux", "wavelength"])
+        stages["align"] = timer.phases["align"]
+    return stages, timings.get("bytes", 0), got.count
+
+
+def run_retrieve(client, ids, include, memory=True, verbose=True):
+    result = dict(stage="retrieve", numrecs=len(ids), numfields=len(include))
+
+    stages, nbytes, count = run_stages(client, ids, include)
+    result.update(stages)
+    result["retrieved"] = count
+    result["rate"] = count / stages["elapsed"]
+    result["bytes"] = nbytes
+    result["bytes_per_rec"] = nbytes / max(1, len(ids))
+
+    if memory:
+        # Separate run since tracing memory slows things down.
+        tracemalloc.start()
+        client.retrieve(ids, include=include, limit=len(ids))
+        _, result["peak_memory"] = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
     if verbose:
-        print(f"len(specids)={len(specids)} datacnt={datacnt}")
-    # assert len(specids) == len(data)   # @@@but some ingests may have failed
-    #!assert len(data[0]['spectra__coadd__flux']) > 1000 # @@@
-    result.update(
-        elapsed=elapsed,
-        retrieved=len(data),
-        rate=datacnt / elapsed,
-        end_smrem=psutil.swap_memory().free,
-        end_vmrem=psutil.virtual_memory().available,
-        end_cpuload=os.getloadavg()[1],
-        end_cpuperc=psutil.cpu_percent(),  # end interval
-    )
+        print(f"Run-Result: {result}")
     return result
 
 
-# flux,loglam,ivar,and_mask,or_mask,wdisp,sky,model
-allcols = [
-    "flux",
-    "loglam",
-    "ivar",
-    "and_mask",
-    "or_mask",
-    "wdisp",
-    "sky",
-    "model",
-]
-
-experiment_0 = dict(
-    xfers=["p"],
-    specidcnts=[600, 60],
-    numcols=range(1, 3),
-)
-experiment_1 = dict(
-    xfers=["p"],
-    specidcnts=[6, 60, 600, 6000, 30000],
-    numcols=range(1, 3),
-    # numcols=range(1,len(allcols)+1),
-)
-experiment_2 = dict(
-    xfers=["p"],
-    specidcnts=[1000, 100, 10],
-    numcols=range(1, len(allcols) + 1),
-)
-experiment_3 = dict(
-    xfers=["p"],
-    specidcnts=[
-        1000,
-    ],
-    numcols=reversed(range(1, len(allcols) + 1)),
-)
-
-experiment_8 = dict(
-    xfers=[
-        "p",
-    ],
-    specidcnts=[
-        65000,
-    ],
-    numcols=[1, 2, 8],
-)
-experiment_9 = dict(
-    xfers=["p", "j"],
-    specidcnts=sorted(set([min(7 * 10**x, 65000) for x in range(6)])),
-    numcols=range(1, len(allcols) + 1),
-)
-
-
-def run_trials(allspecids, verbose=True):
-    # ex = experiment_9 #@@@
-    ex = experiment_8  # @@@
-
-    xfers = ex["xfers"]
-    specidcnts = ex["specidcnts"]
-    numcols = ex["numcols"]
-
-    klist = ["elapsed", "numcols", "numspecids", "page", "rate", "xfer"]
-
+def run_trials(
+    client, numrecs_list, numfields_list, memory=True, verbose=True
+):
     all = []
-    for xfer in xfers:
-        for n in numcols:
-            cols = allcols[:n]
-            for specidcnt in specidcnts:
-                specids = allspecids[:specidcnt]
-                #!result = run_retrieve(specids, columns=cols, xfer='p')
-                result = run_paged_retrieve(specids, columns=cols, xfer="p")
-                if verbose:
-                    # print(f'Run-Result: {pformat(result)}')
-                    reduced = dict(
-                        (k, result[k]) for k in result.keys() if k in klist
-                    )
-                    print(f"Run-Result: {reduced}")
-                all.append(result)
-    report(all, len(allspecids), xfer=xfer)
+    maxrecs = min(max(numrecs_list), MAX_NUM_RECORDS_RETRIEVED)
+    result, allids = run_find(client, maxrecs, verbose=verbose)
+    all.append(result)
+    for numrecs in numrecs_list:
+        ids = allids[:numrecs]
+        for numfields in numfields_list:
+            include = allfields[:numfields]
+            all.append(
+                run_retrieve(
+                    client, ids, include, memory=memory, verbose=verbose
+                )
+            )
     return all
 
 
-def report(results, specidcnt, xfer=None, bandwidth=False):
+def report(results, url):
     hostname, now = here_now()
-    min1, min5, min15 = os.getloadavg()
-    #!smrem = psutil.swap_memory().free
-    #!vmrem = psutil.virtual_memory().available
-    #!cpuperc = psutil.cpu_percent(interval=1)
-
-    if bandwidth:
-        pass
-        #! s = speedtest.Speedtest()
-        #! ul_speed = s.upload(threads=1)
-        #! dl_speed = s.download(threads=1)
-    else:
-        #! ul_speed = 0
-        dl_speed = 0
-
-    #! Upload speed:    {human_size(ul_speed)}
-    print(f"\nBenchmark run on {hostname} at {now} with {specidcnt} specids.")
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(f"\nBenchmark run on {hostname} at {now} against {url}")
+    print(f"Max resident memory (client): {human_size(maxrss)}")
     print(
-        f"""
-Transfer Method: {"Pickle" if xfer=='p' else "JSON"}
-Download speed:  {human_size(dl_speed)}
-    """
+        "Recs\tFlds\tRate \tWait  \tDownld\tDecode\tRename\tAlign"
+        " \tSize  \tPeak Mem"
+    )
+    print(
+        "    \t    \ts/sec\tsec   \tsec   \tsec   \tsec   \tsec   "
+        "\tper rec\t"
+    )
+    print(
+        "----\t----\t-----\t------\t------\t------\t------\t------"
+        "\t------\t------"
     )
-    # Load Avg:        {min5:.1f}
-    #         (avg num processes running over last 5 minutes)
-    # CPU utilization: {cpuperc:.0f}%
-    # Swap Mem Avail:    {human_size(smrem)}
-    # Virtual Mem Avail: {human_size(vmrem)}
-    # (Above statistics are for CLIENT.)
-
-    #!print(f'Column\tSID\tRate \tAvg \tCPU \tSwap\tVirt')
-    #!print(f' Count\tCnt\ts/sec\tLoad\tUtil\t Mem\t Mem')
-    #!print(f'------\t---\t-----\t----\t----')
-    print(f"Column\tSID\tRate ")
-    print(f" Count\tCnt\ts/sec")
-    print(f"------\t---\t-----")
     for r in results:
+        if r["stage"] != "retrieve":
+            continue
         print(
-            (
-                "{numcols}\t"
-                "{numspecids}\t"
-                "{rate:.0f}\t"
-                #!"{end_cpuload:.02f}\t"
-                #!"{end_cpuperc:.0f}%\t"
-                #!"{smrem}\t"
-                #!"{vmrem}\t"
-            ).format(**r)
+            f"{r['numrecs']}\t{r['numfields']}\t{r['rate']:.0f}\t"
+            f"{r['wait']:.3f}\t{r['download']:.3f}\t{r['decode']:.3f}\t"
+            f"{r['rename']:.3f}\t{r.get('align', 0):.3f}\t"
+            f"{human_size(r['bytes_per_rec'])}\t"
+            f"{human_size(r.get('peak_memory', 0))}"
         )
-        # smrem=human_size(r['end_smrem']),
-        # vmrem=human_size(r['end_vmrem']),
     print(
         """
 LEGEND:
-  Rate:: spectra/second
-  Transfer method:: Pickle, Json
-  Load:: Number of processes in system run queue averaged over last 5 minutes.
+  Rate:: spectra/second of client.retrieve()
+  Wait, Downld, Decode, Rename:: seconds for each phase of
+      client.retrieve() (Results.timings; Wait is time to first byte)
+  Align:: seconds to align the retrieved records
+  Size:: bytes transferred per spectra
+  Peak Mem:: peak python memory allocated during client.retrieve()
   """
     )
     return "Done"
@@ -254,83 +185,81 @@ LEGEND:
 
 def my_parser():
     parser = argparse.ArgumentParser(
-        #!version='1.0.1',
-        description="My shiny new python program",
-        epilog='EXAMPLE: %(prog)s a b"',
+        description="Benchmark SPARCL find and retrieve",
+        epilog="EXAMPLE: %(prog)s --numrecs 100 1000 --numfields 3 8",
     )
-    allcols = [
-        "flux",
-        "loglam",
-        "ivar",
-        "and_mask",
-        "or_mask",
-        "wdisp",
-        "sky",
-        "model",
-    ]
-    #!dftcols = 'flux,loglam'
-    dftcols = ",".join(allcols)
     parser.add_argument(
-        "specids",
-        type=argparse.FileType("r"),
-        help=("File containing list of " "specobjids. One per line."),
+        "--numrecs",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 5000],
+        help="Number of records to retrieve (one run per value)",
     )
     parser.add_argument(
-        "--cols",
-        # choices=allcols,
-        default=dftcols,
+        "--numfields",
+        type=int,
+        nargs="+",
+        default=[3, 6],
         help=(
-            f"List of comma seperated columns to get. " f'Default="{dftcols}"'
+            f"Number of fields to include (one run per value)."
+            f" Fields are taken from: {','.join(allfields)}"
         ),
     )
     parser.add_argument(
-        "--xfer",
-        default="p",
-        help="Mode to use to transfer from Server to Client.",
+        "--url",
+        help=(
+            "URL of SPARCL Server to benchmark against. Default is to"
+            " start a local stand-in server with synthetic records."
+        ),
     )
-
     parser.add_argument(
-        "--loglevel",
-        help="Kind of diagnostic output",
-        choices=["CRTICAL", "ERROR", "WARNING", "INFO", "DEBUG"],
-        default="WARNING",
+        "--in-process",
+        action="store_true",
+        help="Run stand-in server in this process (instead of a subprocess)",
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Do not measure peak memory (saves one retrieve per run)",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output results as JSON",
     )
     return parser
 
 
 def main():
-    parser = my_parser()
-    args = parser.parse_args()
-    args.specids.close()
-    args.specids = args.specids.name
-
-    log_level = getattr(logging, args.loglevel.upper(), None)
-    if not isinstance(log_level, int):
-        parser.error("Invalid log level: %s" % args.loglevel)
-    logging.basicConfig(
-        level=log_level,
-        format="%(levelname)s %(message)s",
-        datefmt="%m-%d %H:%M",
-    )
-    logging.debug("Debug output is enabled!!!")
-
-    specids = []
-    with open(args.specids, "r") as fin:
-        for line in fin:
-            if line.startswith("#"):
-                continue
-            specids.append(int(line.strip()))
-    #! cols = args.cols.split(',')
-    # print(f'specids count={len(specids)} columns={cols}')
-
-    # run_retrieve(specids, columns=cols, xfer='p')
-    print(f"Starting benchmark on {here_now()}")
-    #! all = run_trials(specids)
-    print(f"Finished benchmark on {here_now()}")
-
+    args = my_parser().parse_args()
+    server = None
+    url = args.url
+    if url is None:
+        numrecs = max(args.numrecs)
+        server = FakeSparclServer(
+            numrecs=numrecs, process=not args.in_process
+        ).start()
+        url = server.url
+    try:
+        client = SparclClient(url=url)
+        results = run_trials(
+            client,
+            args.numrecs,
+            args.numfields,
+            memory=not args.no_memory,
+            verbose=not args.json,
+        )
+    finally:
+        if server is not None:
+            server.stop()
 
-def foo(x):
-    pass
+    if args.json:
+        hostname, now = here_now()
+        print(
+            json.dumps(dict(host=hostname, date=now, url=url, results=results))
+        )
+    else:
+        report(results, url)
 
 
 if __name__ == "__main__":
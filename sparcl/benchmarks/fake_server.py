@@ -0,0 +1,888 @@
+#! /usr/bin/env python
+"""Local stand-in for the SPARCL Server.
+Serves synthetic (but realistically sized) SDSS, BOSS and DESI records
+so the Client can be benchmarked and tested without a real Server.
+Supports login and private Data Sets, and can inject latency, limited
+bandwidth, errors, and dropped connections.
+"""
+# EXAMPLES:
+# cd ~/sandbox/sparclclient
+# python3 -m sparcl.benchmarks.fake_server --port 8050 --numrecs 10000
+# # then in another shell:
+# python3 -c "import sparcl.client as sc;
+#   print(sc.SparclClient(url='http://localhost:8050'))"
+#
+# In python:
+#   with FakeSparclServer(numrecs=1000) as server:
+#       client = sparcl.client.SparclClient(url=server.url)
+#
+#   # 50 ms latency, 10 MB/sec, 1% of requests fail
+#   with FakeSparclServer(latency=0.05, bandwidth=1e7, error_rate=0.01) as s:
+#       ...
+
+# Standard Python library
+import argparse
+from collections import Counter
+import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import multiprocessing
+import pickle
+import random
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+import uuid
+
+# External packages
+import jwt
+import numpy as np
+
+# Local packages
+from sparcl.framing import FORMATS, encode_frames
+
+
+API_VERSION = 12.0
+
+# Synthetic Data Sets.
+#   npix: (approximate) number of pixels of each spectrum
+#   loglam: True if log-linear wavelength (SDSS, BOSS), else linear (DESI)
+#   private: True if only authorized users may access it
+DATASETS = {
+    "SDSS-DR16": dict(
+        npix=3850,
+        loglam=True,
+        start=3.5798,
+        step=1e-4,
+        group="SDSS_BOSS",
+        instrument="SDSS",
+        telescope="sloan25m",
+        survey="sdss",
+    ),
+    "BOSS-DR16": dict(
+        npix=4620,
+        loglam=True,
+        start=3.5523,
+        step=1e-4,
+        group="SDSS_BOSS",
+        instrument="BOSS",
+        telescope="sloan25m",
+        survey="boss",
+    ),
+    "DESI-EDR": dict(
+        npix=7781,
+        loglam=False,
+        start=3600.0,
+        step=0.8,
+        group="DESI",
+        instrument="DESI",
+        telescope="mayall",
+        survey="sv3",
+    ),
+    "DESI-DR1": dict(
+        npix=7781,
+        loglam=False,
+        start=3600.0,
+        step=0.8,
+        group="DESI",
+        instrument="DESI",
+        telescope="mayall",
+        survey="main",
+        private=True,
+    ),
+}
+PUBLIC_DATASETS = [dr for dr, ds in DATASETS.items() if not ds.get("private")]
+
+# Science Field Names. (Internal Field Names are the same.)
+SPECTRA_FIELDS = ["wavelength", "flux", "ivar", "mask", "model", "wave_sigma"]
+CORE_FIELDS = [
+    "sparcl_id",
+    "specid",
+    "targetid",
+    "data_release",
+    "datasetgroup",
+    "ra",
+    "dec",
+    "redshift",
+    "redshift_err",
+    "redshift_warning",
+    "spectype",
+    "specprimary",
+    "survey",
+    "telescope",
+    "instrument",
+    "site",
+    "dateobs",
+    "dateobs_center",
+    "exptime",
+    "wavemin",
+    "wavemax",
+]
+OTHER_FIELDS = ["extra_files", "file", "updated"]  # Not in ALL
+DEFAULT_FIELDS = ["dec", "flux", "ra", "sparcl_id", "specid", "wavelength"]
+
+# Constraints on these fields are ranges: [min, max]
+# Constraints on other fields are lists of allowed values.
+RANGE_FIELDS = set(
+    ["ra", "dec", "redshift", "redshift_err", "exptime", "wavemin", "wavemax"]
+)
+
+
+def datafields(datasets=DATASETS, renamed=None):
+    """Rows of DataField table as returned by /datafields/.
+    RENAMED[ScienceName] = InternalName (default: the same name)."""
+    renamed = renamed or {}
+    rows = []
+    for dr in datasets:
+        for fld in CORE_FIELDS + SPECTRA_FIELDS + OTHER_FIELDS:
+            rows.append(
+                dict(
+                    data_release=dr,
+                    origdp=renamed.get(fld, fld),
+                    newdp=fld,
+                    storage="C" if fld in CORE_FIELDS else "S",
+                    default=fld in DEFAULT_FIELDS,
+                    all=fld not in OTHER_FIELDS,
+                )
+            )
+    return rows
+
+
+class SyntheticData:
+    """Metadata for NUMRECS records in every Data Set (held as columns)
+    and spectra generated on demand (deterministic per record).
+
+    Args:
+        numrecs (:obj:`int`, optional): Number of records in each Data Set.
+            Defaults to 1000.
+
+        datasets (:obj:`list`, optional): Data Sets to serve.
+            Defaults to PUBLIC_DATASETS.
+
+        seed (:obj:`int`, optional): Random seed. Defaults to 0.
+
+        renamed (:obj:`dict`, optional): Internal Field Names that differ
+            from Science Field Names: dict[ScienceName] = InternalName.
+            Requests and records use the Internal names.
+            Defaults to None (the same names).
+    """
+
+    def __init__(self, numrecs=1000, datasets=None, seed=0, renamed=None):
+        self.numrecs = numrecs
+        self.datasets = list(datasets or PUBLIC_DATASETS)
+        self.private = [
+            dr for dr in self.datasets if DATASETS[dr].get("private")
+        ]
+        self.seed = seed
+        self.renamed = dict(renamed or {})
+        self.science = {new: old for old, new in self.renamed.items()}
+        self.datafields = datafields(
+            {dr: DATASETS[dr] for dr in self.datasets}, renamed=self.renamed
+        )
+        self.columns = self._make_columns()
+        self.size = len(self.columns["sparcl_id"])
+        self.row = {sid: i for i, sid in enumerate(self.columns["sparcl_id"])}
+        self.specid_row = {
+            int(sid): i for i, sid in enumerate(self.columns["specid"])
+        }
+
+    def _make_columns(self):
+        rng = np.random.default_rng(self.seed)
+        ndr = len(self.datasets)
+        size = self.numrecs * ndr
+        cols = dict()
+        cols["_dr"] = np.repeat(np.array(self.datasets), self.numrecs)
+        cols["data_release"] = cols["_dr"]
+        cols["sparcl_id"] = np.array(
+            [
+                str(uuid.UUID(bytes=rng.bytes(16), version=4))
+                for _ in range(size)
+            ]
+        )
+        cols["specid"] = rng.integers(-(2**62), 2**62, size)
+        # The same object may be observed in more than one Data Set.
+        objects = max(1, int(size * 0.8))
+        obj = rng.integers(0, objects, size)
+        obj_ra = rng.uniform(0, 360, objects)
+        obj_dec = np.degrees(np.arcsin(rng.uniform(-1, 1, objects)))
+        cols["targetid"] = 39627000000000000 + obj
+        jitter = 0.2 / 3600  # degrees
+        cols["ra"] = (obj_ra[obj] + rng.normal(0, jitter, size)) % 360
+        cols["dec"] = np.clip(
+            obj_dec[obj] + rng.normal(0, jitter, size), -90, 90
+        )
+        cols["redshift"] = rng.uniform(0, 3, size)
+        cols["redshift_err"] = rng.uniform(0, 1e-3, size)
+        cols["redshift_warning"] = rng.choice([0, 0, 0, 4], size)
+        cols["spectype"] = rng.choice(["GALAXY", "QSO", "STAR"], size)
+        cols["specprimary"] = rng.choice([True, False], size, p=[0.9, 0.1])
+        for key, name in [
+            ("group", "datasetgroup"),
+            ("survey", "survey"),
+            ("telescope", "telescope"),
+            ("instrument", "instrument"),
+        ]:
+            cols[name] = np.array(
+                [DATASETS[dr][key] for dr in cols["_dr"]], dtype=object
+            )
+        cols["site"] = np.where(
+            cols["telescope"] == "mayall", "kpno", "apo"
+        ).astype(object)
+        mjd = rng.uniform(51500, 59500, size)
+        cols["dateobs"] = np.array(
+            [str(np.datetime64("1858-11-17") + int(d)) for d in mjd]
+        )
+        cols["dateobs_center"] = cols["dateobs"]
+        cols["exptime"] = rng.uniform(900, 5400, size)
+        wmin, wmax = zip(*[self._wave_range(dr) for dr in cols["_dr"]])
+        cols["wavemin"] = np.array(wmin)
+        cols["wavemax"] = np.array(wmax)
+        cols["extra_files"] = np.full(size, None, dtype=object)
+        cols["file"] = np.array([f"spec-{i:08d}.fits" for i in range(size)])
+        cols["updated"] = np.full(size, "2024-08-23T00:00:00", dtype=object)
+        return cols
+
+    def science_name(self, field):
+        """Science Field Name of (Internal) FIELD."""
+        return self.science.get(field, field)
+
+    def has_field(self, field):
+        """True if FIELD is the Internal name of a field of records."""
+        if field in self.renamed:
+            return False  # A Science name that is not Internal
+        return self.science_name(field) in self.columns
+
+    def _wave_range(self, dr):
+        ds = DATASETS[dr]
+        last = ds["start"] + ds["step"] * (ds["npix"] - 1)
+        if ds["loglam"]:
+            return 10 ** ds["start"], 10**last
+        return ds["start"], last
+
+    def scalar(self, field, row):
+        """Plain python value of FIELD for record in ROW."""
+        value = self.columns[field][row]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def spectra(self, row, fields):
+        """Spectra FIELDS of record in ROW. Same every time."""
+        dr = self.columns["_dr"][row]
+        ds = DATASETS[dr]
+        rng = np.random.default_rng([self.seed, row])
+        if ds["loglam"]:
+            start = int(rng.integers(0, 50))
+            npix = ds["npix"] - int(rng.integers(0, 60))
+            wavelength = 10 ** (
+                ds["start"] + ds["step"] * (start + np.arange(npix))
+            )
+        else:
+            npix = ds["npix"]
+            wavelength = ds["start"] + ds["step"] * np.arange(npix)
+        values = dict()
+        for fld in fields:
+            if fld == "wavelength":
+                values[fld] = wavelength
+            elif fld == "flux":
+                values[fld] = rng.normal(10, 2, npix)
+            elif fld == "ivar":
+                values[fld] = rng.uniform(0.5, 2, npix)
+            elif fld == "mask":
+                values[fld] = rng.integers(0, 2, npix, dtype=np.int32)
+            elif fld == "model":
+                values[fld] = rng.normal(10, 1, npix)
+            elif fld == "wave_sigma":
+                values[fld] = np.full(npix, 0.8 if not ds["loglam"] else 1.0)
+        return values
+
+    def record(self, row, fields):
+        """Record in ROW with FIELDS (Internal Field Names) and _dr."""
+        rec = dict(_dr=str(self.columns["_dr"][row]))
+        names = {fld: self.science_name(fld) for fld in fields}
+        spectra = [f for f in fields if names[f] in SPECTRA_FIELDS]
+        for fld in fields:
+            if fld not in spectra:
+                rec[fld] = self.scalar(names[fld], row)
+        values = self.spectra(row, [names[f] for f in spectra])
+        for fld in spectra:
+            if names[fld] in values:
+                rec[fld] = values[names[fld]]
+        return rec
+
+    def find(
+        self, outfields, search, limit=None, sort=None, dataset_list=None
+    ):
+        """Records matching SEARCH: [[field, value, ...], ...].
+        SORT: comma separated fields; "-" prefix for descending order."""
+        mask = np.ones(self.size, dtype=bool)
+        if dataset_list is not None:
+            mask &= np.isin(self.columns["_dr"], list(dataset_list))
+        for field, *values in search:
+            field = self.science_name(field)
+            col = self.columns[field]
+            if field in RANGE_FIELDS:
+                lo, hi = values
+                mask &= (col >= lo) & (col <= hi)
+            else:
+                mask &= np.isin(col, np.array(values, dtype=col.dtype))
+        rows = np.flatnonzero(mask)
+        if sort:
+            for term in reversed(sort.split(",")):
+                term = term.strip()
+                col = self.columns[self.science_name(term.lstrip("-"))]
+                _, rank = np.unique(col[rows], return_inverse=True)
+                rank = rank.ravel()
+                if term.startswith("-"):
+                    rank = -rank
+                rows = rows[np.argsort(rank, kind="stable")]
+        if limit is not None:
+            rows = rows[: int(limit)]
+        return [self.record(int(r), outfields) for r in rows]
+
+    def retrieve(self, ids, include, dataset_list=None):
+        """Records for IDS (sparcl_ids) in the order given."""
+        return list(self.iter_records(ids, include, dataset_list))
+
+    def iter_records(self, ids, include, dataset_list=None):
+        """Generate records for IDS (sparcl_ids) in the order given."""
+        rows = [self.row[i] for i in ids if i in self.row]
+        if dataset_list is not None:
+            rows = [r for r in rows if self.columns["_dr"][r] in dataset_list]
+        return (self.record(r, include) for r in rows)
+
+
+# Users that can login. email => (password, [private Data Sets])
+USERS = {
+    "test_user_1@noirlab.edu": ("test_pw_1", ["DESI-DR1"]),
+    "test_user_2@noirlab.edu": ("test_pw_2", []),
+}
+# Only used by this stand-in server
+TOKEN_SECRET = "stand-in-server-secret-not-for-production-use"
+ACCESS_LIFETIME = 60 * 60  # seconds
+
+# Fault injection (see FakeSparclServer).
+NO_FAULTS = dict(
+    latency=0.0,
+    bandwidth=None,
+    error_rate=0.0,
+    error_status=500,
+    fail_next=0,
+    drop_rate=0.0,
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    # Send small responses at once (headers and body are written apart)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass  # Be quiet
+
+    @property
+    def data(self):
+        return self.server.data
+
+    @property
+    def faults(self):
+        return self.server.faults
+
+    def _params(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        return url.path.rstrip("/"), params
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def _write(self, payload):
+        """Write PAYLOAD to client (throttled to bandwidth, if any)."""
+        bandwidth = self.faults["bandwidth"]
+        blocksize = 64 * 1024
+        start = time.perf_counter()
+        for offset in range(0, len(payload), blocksize):
+            self.wfile.write(payload[offset : offset + blocksize])
+            if bandwidth:
+                sent = min(offset + blocksize, len(payload))
+                delay = sent / bandwidth - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+    def _send(self, payload, status=200, ctype="application/json"):
+        if ctype == "application/json":
+            payload = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if status == 200 and self.server.chance("drop_rate"):
+            # Connection lost part way through the response
+            self._write(payload[: len(payload) // 2])
+            self.close_connection = True
+            return
+        self.server.count("bytes_sent", len(payload))
+        self._write(payload)
+
+    # Send FRAMES (iterable of bytes) with chunked transfer encoding
+    # as they are generated.
+    def _send_stream(self, frames, ctype):
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        drop = self.server.chance("drop_rate")
+        for cnt, frame in enumerate(frames):
+            if drop and cnt > 0:
+                # Connection lost part way through the response
+                self._write(f"{len(frame):X}\r\n".encode() + frame[:-1])
+                self.close_connection = True
+                return
+            self.server.count("bytes_sent", len(frame))
+            self._write(f"{len(frame):X}\r\n".encode() + frame + b"\r\n")
+        self._write(b"0\r\n\r\n")
+
+    def _error(self, code, message, status=400):
+        self._send(dict(errorCode=code, errorMessage=message), status=status)
+
+    # RETURN: True if a fault was injected (and response sent)
+    def _inject(self, path):
+        self.server.count(path)
+        faults = self.faults
+        if faults["latency"]:
+            time.sleep(faults["latency"])
+        if self.server.take_failure() or self.server.chance("error_rate"):
+            self._error(
+                "INJECTED",
+                f"Fault injected by stand-in server for {path}",
+                status=faults["error_status"],
+            )
+            return True
+        return False
+
+    # RETURN: email of user or None (Anonymous)
+    def _user(self):
+        token = self.headers.get("Authorization")
+        if not token:
+            return None
+        try:
+            claims = jwt.decode(token, TOKEN_SECRET, algorithms=["HS256"])
+        except jwt.PyJWTError:
+            return None
+        return claims.get("email")
+
+    # Data Sets USER may access.
+    def _authorized(self, user):
+        private = set(self.server.users.get(user, (None, []))[1])
+        return set(
+            dr
+            for dr in self.data.datasets
+            if (dr not in self.data.private) or (dr in private)
+        )
+
+    # RETURN: True if denied (and response sent)
+    def _denied(self, user, drs):
+        auth = self._authorized(user)
+        denied = sorted(set(drs) - auth)
+        if denied:
+            uname = user or "ANONYMOUS"
+            msg = (
+                f"uname='{uname}' is declined access to"
+                f" datasets={denied}; drs_requested={sorted(drs)}"
+                f" my_auth={sorted(auth)}"
+            )
+            self._error("NODRACCESS", msg, status=403)
+            return True
+        return False
+
+    def do_GET(self):
+        path, params = self._params()
+        if self._inject(path):
+            return
+        if path == "/sparc/version":
+            self._send(str(API_VERSION).encode(), ctype="text/plain")
+        elif path == "/sparc/datafields":
+            self._send(self.data.datafields)
+        elif path == "/sparc/auth_status":
+            self._auth_status()
+        else:
+            self._error("BADPATH", f"Unknown path: {path}", status=404)
+
+    def do_POST(self):
+        path, params = self._params()
+        body = self._body()
+        if self._inject(path):
+            return
+        if path == "/sparc/find":
+            self._find(body, params)
+        elif path == "/sparc/spectras":
+            self._spectras(body, params)
+        elif path == "/sparc/missing":
+            self._missing(body, params, self.data.row)
+        elif path == "/sparc/missing_specids":
+            self._missing(body, params, self.data.specid_row)
+        elif path == "/sparc/get_token":
+            self._get_token(body)
+        elif path == "/sparc/renew_token":
+            self._renew_token(body)
+        else:
+            self._error("BADPATH", f"Unknown path: {path}", status=404)
+
+    def _find(self, sspec, params):
+        has = self.data.has_field
+        search = sspec.get("search", [])
+        sort = params.get("sort")
+        sorts = (
+            [t.strip().lstrip("-") for t in sort.split(",")] if sort else []
+        )
+        unknown = [f for f in sspec["outfields"] if not has(f)]
+        unknown += [s[0] for s in search if not has(s[0])]
+        unknown += [f for f in sorts if not has(f)]
+        if unknown:
+            return self._error("UNKFIELD", f"Unknown fields: {unknown}")
+        user = self._user()
+        drs = [
+            s[1:]
+            for s in search
+            if self.data.science_name(s[0]) == "data_release"
+        ]
+        if drs and self._denied(user, drs[0]):
+            return
+        records = self.data.find(
+            sspec["outfields"],
+            search,
+            limit=params.get("limit"),
+            sort=sort,
+            dataset_list=self._authorized(user),
+        )
+        hdr = dict(status=dict(success=True, info=[], warnings=[]))
+        self._send([hdr] + records)
+
+    def _spectras(self, ids, params):
+        include = params.get("include", "").split(",")
+        user = self._user()
+        drs = params.get("dataset_list")
+        if drs is None:
+            drs = self._authorized(user)
+        else:
+            drs = drs.split(",")
+            if self._denied(user, drs):
+                return
+        include = [f for f in include if f]
+        hdr = dict(status=dict(success=True, info=[], warnings=[]))
+        fmt = params.get("format", "pkl")
+        if fmt in FORMATS:
+            # One frame per record, generated as it is sent
+            records = self.data.iter_records(ids, include, dataset_list=drs)
+            frames = encode_frames(itertools.chain([hdr], records), fmt)
+            ctype = "application/x-ndjson" if fmt == "ndjson" else None
+            self._send_stream(frames, ctype or "application/octet-stream")
+            return
+        records = self.data.retrieve(ids, include, dataset_list=drs)
+        payload = pickle.dumps(
+            [hdr] + records, protocol=pickle.HIGHEST_PROTOCOL
+        )
+        self._send(payload, ctype="application/octet-stream")
+
+    # ROWS: dict[id] => row
+    def _missing(self, ids, params, rows):
+        drs = params.get("dataset_list")
+        drs = set(self.data.datasets if drs is None else drs.split(","))
+        dr_col = self.data.columns["_dr"]
+        self._send(
+            [i for i in ids if i not in rows or dr_col[rows[i]] not in drs]
+        )
+
+    def _token(self, email, kind, lifetime):
+        exp = datetime.datetime.now(tz=datetime.timezone.utc)
+        exp += datetime.timedelta(seconds=lifetime)
+        claims = dict(email=email, token_type=kind, exp=exp)
+        return jwt.encode(claims, TOKEN_SECRET, algorithm="HS256")
+
+    def _get_token(self, body):
+        email = body.get("email")
+        password, _ = self.server.users.get(email, (None, None))
+        if password is None or password != body.get("password"):
+            return self._error("BADLOGIN", "Invalid credentials", status=401)
+        self._send(
+            dict(
+                access=self._token(email, "access", ACCESS_LIFETIME),
+                refresh=self._token(email, "refresh", 24 * ACCESS_LIFETIME),
+            )
+        )
+
+    def _renew_token(self, body):
+        try:
+            claims = jwt.decode(
+                body.get("refresh_token") or "",
+                TOKEN_SECRET,
+                algorithms=["HS256"],
+            )
+        except jwt.PyJWTError as err:
+            return self._error("BADTOKEN", str(err), status=401)
+        self.server.count("token_renewals")
+        access = self._token(claims["email"], "access", ACCESS_LIFETIME)
+        self._send(dict(access=access))
+
+    def _auth_status(self):
+        user = self._user()
+        private = set(self.data.private)
+        self._send(
+            {
+                "Loggedin_User": user or "Anonymous",
+                "All_Private_Datasets": sorted(private),
+                "All_Public_Datasets": sorted(
+                    set(self.data.datasets) - private
+                ),
+                "Authorized_Private_Datasets": sorted(
+                    self._authorized(user) & private
+                ),
+            }
+        )
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, data, users=None, faults=None):
+        super().__init__(address, _Handler)
+        self.data = data
+        self.users = USERS if users is None else users
+        self.faults = dict(NO_FAULTS)
+        self.faults.update(faults or {})
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._random = random.Random(data.seed)
+
+    def count(self, key, num=1):
+        with self._lock:
+            self.stats[key] += num
+
+    def chance(self, fault):
+        rate = self.faults[fault]
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def take_failure(self):
+        with self._lock:
+            if self.faults["fail_next"] > 0:
+                self.faults["fail_next"] -= 1
+                return True
+        return False
+
+
+class FakeSparclServer:
+    """Local HTTP server that behaves like the SPARCL Server. Implements
+    the endpoints used by the Client with synthetic records.
+    Latency, limited bandwidth, and errors can be injected.
+
+    Args:
+        numrecs (:obj:`int`, optional): Number of records in each Data Set.
+            Defaults to 1000.
+
+        datasets (:obj:`list`, optional): Data Sets to serve.
+            Defaults to the public Data Sets of DATASETS.
+
+        seed (:obj:`int`, optional): Random seed. Defaults to 0.
+
+        host (:obj:`str`, optional): Defaults to '127.0.0.1'.
+
+        port (:obj:`int`, optional): Defaults to 0 (any free port).
+
+        process (:obj:`bool`, optional): Run the server in a separate
+            process (so it does not compete with the Client for the GIL).
+            Defaults to False; run in a thread of this process.
+
+        users (:obj:`dict`, optional): Users that can login.
+            dict[email] = (password, [privateDataSet, ...]).
+            Defaults to USERS.
+
+        renamed (:obj:`dict`, optional): Internal Field Names that differ
+            from Science Field Names (see SyntheticData).
+            Defaults to None (the same names).
+
+        **faults: Faults to inject. Any of:
+            latency (seconds added to every response),
+            bandwidth (maximum bytes/second of each response),
+            error_rate (fraction of requests that fail),
+            error_status (HTTP status of failed requests, default 500),
+            fail_next (number of next requests that fail),
+            drop_rate (fraction of responses cut off part way through).
+            When not running in a separate process, faults can be changed
+            while running with set_faults().
+
+    Example:
+        >>> with FakeSparclServer(numrecs=10) as server:
+        ...     client = sparcl.client.SparclClient(url=server.url)
+        ...     len(client.find(limit=5).ids)
+        5
+    """
+
+    def __init__(
+        self,
+        numrecs=1000,
+        datasets=None,
+        seed=0,
+        *,
+        host="127.0.0.1",
+        port=0,
+        process=False,
+        users=None,
+        renamed=None,
+        **faults,
+    ):
+        unknown = set(faults) - set(NO_FAULTS)
+        if unknown:
+            msg = f"Unknown faults: {sorted(unknown)}. Use: {list(NO_FAULTS)}"
+            raise ValueError(msg)
+        self.kwargs = dict(
+            numrecs=numrecs, datasets=datasets, seed=seed, renamed=renamed
+        )
+        self.host = host
+        self.port = port
+        self.process = process
+        self.users = users
+        self.faults = faults
+        self._httpd = None
+        self._runner = None
+        self._data = None
+
+    def __repr__(self):
+        return f"FakeSparclServer({self.url}, {self.kwargs})"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def data(self):
+        """SyntheticData served (same as in a separate process)."""
+        if self._data is None:
+            self._data = SyntheticData(**self.kwargs)
+        return self._data
+
+    @property
+    def stats(self):
+        """Counts of requests by path (and bytes_sent, token_renewals).
+        Only available when not running in a separate process."""
+        return self._httpd.stats if self._httpd else Counter()
+
+    def set_faults(self, **faults):
+        """Change injected faults of running server (not in process)."""
+        self._httpd.faults.update(faults)
+
+    def start(self):
+        args = (self.host, self.port, self.users, self.faults)
+        if self.process:
+            ready = multiprocessing.Queue()
+            self._runner = multiprocessing.Process(
+                target=_serve,
+                args=(self.kwargs, *args, ready),
+                daemon=True,
+            )
+            self._runner.start()
+            self.port = ready.get(timeout=120)
+        else:
+            self._httpd = _make_httpd(self.data, *args)
+            self.port = self._httpd.server_address[1]
+            self._runner = threading.Thread(
+                target=self._httpd.serve_forever, daemon=True
+            )
+            self._runner.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        elif self._runner is not None:
+            self._runner.terminate()
+        if self._runner is not None:
+            self._runner.join()
+            self._runner = None
+
+
+def _make_httpd(data, host, port, users=None, faults=None):
+    return _HTTPServer((host, port), data, users=users, faults=faults)
+
+
+# Target of server process.
+def _serve(kwargs, host, port, users, faults, ready):
+    httpd = _make_httpd(SyntheticData(**kwargs), host, port, users, faults)
+    ready.put(httpd.server_address[1])
+    httpd.serve_forever()
+
+
+def my_parser():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the SPARCL Server",
+        epilog="EXAMPLE: %(prog)s --port 8050 --numrecs 10000",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument(
+        "--numrecs",
+        type=int,
+        default=1000,
+        help="Number of records in each Data Set",
+    )
+    parser.add_argument(
+        "--datasets",
+        default=",".join(DATASETS.keys()),
+        help="Comma separated list of Data Sets to serve",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Seconds added to every response",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        help="Maximum bytes/second of each response",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests that fail (status 500)",
+    )
+    parser.add_argument(
+        "--drop-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of responses cut off part way through",
+    )
+    return parser
+
+
+def main():
+    args = my_parser().parse_args()
+    data = SyntheticData(
+        numrecs=args.numrecs,
+        datasets=args.datasets.split(","),
+        seed=args.seed,
+    )
+    faults = dict(latency=args.latency, bandwidth=args.bandwidth)
+    faults.update(error_rate=args.error_rate, drop_rate=args.drop_rate)
+    httpd = _make_httpd(data, args.host, args.port, faults=faults)
+    print(f"Serving {data.size:,d} records on {args.host}:{args.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,12 @@ from warnings import warn
 import pickle
 import getpass
 import datetime
+import io
+import json
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
 #!from pathlib import Path
 import tempfile
@@ -33,9 +39,12 @@ import tempfile
 # External Packages
 import requests
 import jwt
+import urllib3
+import numpy as np
 
 #!from requests.auth import HTTPBasicAuth
 from requests.auth import AuthBase
+from requests.adapters import HTTPAdapter
 
 ############################################
 # Local Packages
@@ -45,12 +54,30 @@ import sparcl.exceptions as ex
 
 #!import sparcl.type_conversion as tc
 from sparcl import __version__
-from sparcl.Results import Found, Retrieved
+from sparcl.Results import Found, Retrieved, RecordStream, science_record
+import sparcl.framing as framing
+from sparcl.spectra_store import SpectraStore
+from sparcl.metrics import Metrics
+from sparcl.progress import as_progress
+import sparcl.cone as cone
+import sparcl.crossmatch as xmatch
+import sparcl.decode_pool as decode_pool
+from sparcl.hosts import HostPool
+import sparcl.hosts as hosts
 
 
 MAX_CONNECT_TIMEOUT = 3.1  # seconds
 MAX_READ_TIMEOUT = 150 * 60  # seconds
 MAX_NUM_RECORDS_RETRIEVED = int(24e3)  # Minimum Hard Limit = 25,000
+DOWNLOAD_CHUNK = 1024 * 1024  # bytes read from response at a time
+# Content encodings that _read_body decompresses.  Sent as Accept-Encoding
+# so that requests does not also offer br or zstd (when those packages
+# are installed).
+ACCEPT_ENCODING = "gzip, deflate"
+MAX_IN_LIST = 5000  # values of one list constraint sent per find request
+FIND_WORKERS = 4  # concurrent find requests (when a constraint is split)
+DECODE_CHUNK = 1000  # most sparcl_ids per request of retrieve(workers=N)
+HEALTH_TIMEOUT = 10  # seconds to wait for response to a health check
 #!MAX_NUM_RECORDS_RETRIEVED = int(5e4) #@@@ Reduce !!!
 
 
@@ -105,6 +132,10 @@ DEFAULT = "DEFAULT"
 ALL = "ALL"
 RESERVED = set([DEFAULT, ALL])
 
+# Events of the request lifecycle that hooks can be added to.
+# (See SparclClient.add_hook)
+HOOK_EVENTS = ["request", "response", "error", "chunk", "decode", "wrap"]
+
 
 ###########################
 # ## Convenience Functions
@@ -117,6 +148,60 @@ RESERVED = set([DEFAULT, ALL])
 #!    return set(lists[0]).intersection(*lists[1:])
 
 
+# Split the (one) longest list constraint of CONSTRAINTS (dict[fld] =
+# list) that has more than MAX_IN_LIST values into lists of at most
+# MAX_IN_LIST values (without duplicates).
+# RETURN: list of searches; each is [[fld, val, ...], ...]
+def _split_search(constraints, max_in_list=MAX_IN_LIST):
+    search = [[k] + list(v) for k, v in constraints.items()]
+    if max_in_list is None or len(search) == 0:
+        return [search]
+    idx = max(range(len(search)), key=lambda i: len(search[i]))
+    fld, *values = search[idx]
+    if len(values) <= max_in_list:
+        return [search]
+    values = list(dict.fromkeys(values))
+    step = int(max_in_list)
+    return [
+        search[:idx] + [[fld] + values[i : i + step]] + search[idx + 1 :]
+        for i in range(0, len(values), step)
+    ]
+
+
+# Parse SORT: comma separated field names (or a list of them), each
+# with an optional leading "-" for descending order (as the Server).
+# RETURN: list of (field, descending)
+def _sort_keys(sort):
+    if sort is None:
+        return []
+    if isinstance(sort, str):
+        sort = sort.split(",")
+    keys = []
+    for term in sort:
+        term = term.strip()
+        fld = term.lstrip("-").strip()
+        if fld == "":
+            raise ex.BadQuery(f"Empty field name in sort={sort}")
+        keys.append((fld, term.startswith("-")))
+    return keys
+
+
+# Merge the info and warnings of the status of HDRS (headers of the
+# responses to one call) into the first one.
+# RETURN: first header
+def _merge_status(hdrs):
+    hdr = hdrs[0]
+    for other in hdrs[1:]:
+        for key in ["info", "warnings"]:
+            msgs = hdr.get("status", {}).get(key)
+            if msgs is None:
+                continue
+            for msg in other.get("status", {}).get(key, []):
+                if msg not in msgs:
+                    msgs.append(msg)
+    return hdr
+
+
 class TokenAuth(AuthBase):
     """Attaches HTTP Token Authentication to the given Request object."""
 
@@ -133,6 +218,50 @@ class TokenAuth(AuthBase):
         return request
 
 
+###########################
+# ## Timing of HTTP requests
+
+# Seconds spent establishing new connections (in the current thread).
+# Connections that are reused (keep-alive) take no time to establish.
+_net = threading.local()
+
+
+class _ConnectTimer:
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _net.connect = getattr(_net, "connect", 0) + (
+            time.perf_counter() - start
+        )
+
+
+class _TimedHTTPConnection(_ConnectTimer, urllib3.connection.HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_ConnectTimer, urllib3.connection.HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimingAdapter(HTTPAdapter):
+    """Transport adapter that records time spent on new connections."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(
+            http=_TimedHTTPConnectionPool,
+            https=_TimedHTTPSConnectionPool,
+        )
+
+
 ###########################
 # ## The Client class
 
@@ -144,8 +273,12 @@ class SparclClient:  # was SparclApi()
     about the Client and Server that is usefule to Developers.
 
     Args:
-        url (:obj:`str`, optional): Base URL of SPARCL Server. Defaults
-            to 'https://astrosparcl.datalab.noirlab.edu'.
+        url (:obj:`str` or :obj:`list`, optional): Base URL of SPARCL
+            Server, or list of Base URLs of equivalent Servers (mirrors).
+            Requests go to the healthy Server with the lowest latency
+            (see check_hosts). Idempotent requests that fail are sent
+            again to the next Server. Defaults to
+            'https://astrosparcl.datalab.noirlab.edu'.
 
         verbose (:obj:`bool`, optional): Default verbosity is set to
             False for all client methods.
@@ -158,6 +291,19 @@ class SparclClient:  # was SparclApi()
             wait for server to send a response. Generally time to
             wait for first byte. Defaults to 5400.
 
+        metrics (:obj:`bool` or :class:`~sparcl.metrics.Metrics`, optional):
+            Set to True to collect metrics (request counts, latency,
+            bytes, records per second, etc.) of all calls to the Server
+            in client.metrics. Pass a Metrics instance to share it between
+            clients. Defaults to False (no metrics are collected).
+
+        hooks (:obj:`dict`, optional): Callbacks for events of the request
+            lifecycle.  dict[event] = callable or list of callables.
+            See add_hook(). Defaults to None (no hooks).
+
+        host_cooldown (float, optional): Seconds a Server that failed is
+            not used (when URL is a list). Defaults to 60.
+
     Example:
         >>> client = SparclClient()
 
@@ -178,13 +324,31 @@ class SparclClient:  # was SparclApi()
         show_curl=False,
         connect_timeout=1.1,  # seconds
         read_timeout=90 * 60,  # seconds
+        metrics=False,
+        hooks=None,
+        host_cooldown=hosts.COOLDOWN,
     ):
         """Create client instance."""
         session = requests.Session()
         self.session = session
         self.session.auth = None
-        self.rooturl = url.rstrip("/")  # eg. "http://localhost:8050"
-        self.apiurl = f"{self.rooturl}/sparc"
+        # Connection pool for all requests to the Server (see _request)
+        self._http = requests.Session()
+        self._http.mount("http://", _TimingAdapter())
+        self._http.mount("https://", _TimingAdapter())
+        self._http.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        if isinstance(metrics, Metrics):
+            self.metrics = metrics
+        else:
+            self.metrics = Metrics() if metrics else None
+        self.hooks = {event: [] for event in HOOK_EVENTS}
+        for event, callbacks in (hooks or {}).items():
+            if callable(callbacks):
+                callbacks = [callbacks]
+            for callback in callbacks:
+                self.add_hook(event, callback)
+        urls = [url] if isinstance(url, str) else list(url)
+        self.hosts = HostPool(urls, cooldown=host_cooldown)
         self.apiversion = None
         self.token = None
         self.refresh_token = None
@@ -206,14 +370,17 @@ class SparclClient:  # was SparclApi()
         if verbose:
             print(f"apiurl={self.apiurl}")
 
-        # Get API Version
-        try:
-            endpoint = f"{self.apiurl}/version/"
-            verstr = requests.get(endpoint, timeout=self.timeout).content
-        except requests.ConnectionError as err:
-            msg = f"Could not connect to {endpoint}. {str(err)}"
-            if urlparse(url).hostname in _pat_hosts:
-                msg += "Did you enable VPN?"
+        # Get API Version (and health of every host)
+        checks = self._check_hosts()
+        verstr = checks[self.rooturl]
+        if isinstance(verstr, Exception):
+            msgs = []
+            for root, err in checks.items():
+                msg = f"Could not connect to {root}/sparc/version/. {err}"
+                if urlparse(root).hostname in _pat_hosts:
+                    msg += "Did you enable VPN?"
+                msgs.append(msg)
+            msg = " ".join(msgs)
             raise ex.ServerConnectionError(msg) from None  # disable chaining
 
         self.apiversion = float(verstr)
@@ -232,7 +399,8 @@ class SparclClient:  # was SparclApi()
             raise Exception(msg)
 
         self.clientversion = client_version
-        self.fields = Fields(self.apiurl)
+        datafields = self._request("get", f"{self.apiurl}/datafields/")
+        self.fields = Fields(self.apiurl, datafields=datafields.json())
 
         ###
         ####################################################
@@ -250,6 +418,62 @@ class SparclClient:  # was SparclApi()
             f" read_timeout={self.r_timeout})"
         )
 
+    @property
+    def rooturl(self):
+        """Base URL of the Server requests are sent to (first)."""
+        return self.hosts.best  # eg. "http://localhost:8050"
+
+    @property
+    def apiurl(self):
+        return f"{self.rooturl}/sparc"
+
+    # Health check every host (concurrently). Hosts that respond are
+    # marked up (with their latency), others down.
+    # RETURN: dict[url] = version string or exception
+    def _check_hosts(self):
+        timeout = (self.c_timeout, min(self.r_timeout, HEALTH_TIMEOUT))
+
+        def check(root):
+            start = time.perf_counter()
+            try:
+                res = self._request(
+                    "get",
+                    f"{root}/sparc/version/",
+                    failover=False,
+                    timeout=timeout,
+                )
+                res.raise_for_status()
+                verstr = res.content
+                float(verstr)
+            except (requests.RequestException, ValueError) as err:
+                self.hosts.mark_down(root)
+                return err
+            self.hosts.mark_up(root, time.perf_counter() - start)
+            return verstr
+
+        if len(self.hosts) == 1:
+            return {root: check(root) for root in self.hosts.urls}
+        with ThreadPoolExecutor(max_workers=len(self.hosts)) as pool:
+            return dict(zip(self.hosts.urls, pool.map(check, self.hosts.urls)))
+
+    def check_hosts(self):
+        """Health check every Server (see the url parameter of
+        SparclClient) and measure its latency.  Requests are routed by
+        the result.  Servers that fail are otherwise only checked again
+        (by sending requests to them) after their cool down.
+
+        Returns:
+            List of dict(url, up, latency) of every Server, in the order
+            requests are sent to them.
+
+        Example:
+            >>> client = SparclClient()
+            >>> [h['up'] for h in client.check_hosts()]
+            [True]
+        """
+        self._check_hosts()
+        return self.hosts.status()
+
     def token_expired(self, renew=False):
         """
             POST http://localhost:8050/sparc/renew_token/
@@ -269,8 +493,12 @@ class SparclClient:  # was SparclApi()
 
         if expired and renew:
             url = f"{self.apiurl}/renew_token/"
-            resp = requests.post(url, json={"refresh_token": self.renew_token})
+            resp = self._request(
+                "post", url, json={"refresh_token": self.renew_token}
+            )
             resp.raise_for_status()
+            if self.metrics is not None:
+                self.metrics.token_renewals.inc()
             data = resp.json()
             #@print(f"{data=}")
             self.token = data['access']
@@ -312,10 +540,8 @@ class SparclClient:  # was SparclApi()
             password = getpass.getpass(prompt="SSO Password: ")
         url = f"{self.apiurl}/get_token/"
         # print(f'login: get_token {url=}')
-        res = requests.post(
-            url,
-            json=dict(email=email, password=password),
-            timeout=self.timeout,
+        res = self._request(
+            "post", url, json=dict(email=email, password=password)
         )
         try:
             res.raise_for_status()
@@ -366,8 +592,8 @@ class SparclClient:  # was SparclApi()
     @property
     def authorized(self):
         auth = TokenAuth(self.token, self.token_expired) if self.token else None  # noqa: E501
-        response = requests.get(
-            f"{self.apiurl}/auth_status/", auth=auth, timeout=self.timeout
+        response = self._request(
+            "get", f"{self.apiurl}/auth_status/", auth=auth
         )
         auth_status = response.json()
         #! print(f"DBG authorized: {auth_status=}")
@@ -417,7 +643,7 @@ class SparclClient:  # was SparclApi()
             dataset_list, (list, set)
         ), f"DATASET_LIST must be a list. Found {dataset_list}"
 
-        common = set(self.fields.common(dataset_list))
+        common = self.fields.available(dataset_list)
         union = self.fields.default_retrieve_fields(dataset_list=dataset_list)
         return sorted(common.intersection(union))
 
@@ -441,7 +667,7 @@ class SparclClient:  # was SparclApi()
             ['data_release', 'datasetgroup', 'dateobs', 'dateobs_center', 'dec', 'exptime', 'flux', 'instrument', 'ivar', 'mask', 'model', 'ra', 'redshift', 'redshift_err', 'redshift_warning', 'site', 'sparcl_id', 'specid', 'specprimary', 'spectype', 'survey', 'targetid', 'telescope', 'wave_sigma', 'wavelength', 'wavemax', 'wavemin']
         """  # noqa: E501
 
-        common = set(self.fields.common(dataset_list))
+        common = self.fields.available(dataset_list)
         union = self.fields.all_retrieve_fields(dataset_list=dataset_list)
         return sorted(common.intersection(union))
 
@@ -450,7 +676,7 @@ class SparclClient:  # was SparclApi()
         not registered in at least one of DATASET_LIST."""
         if dataset_list is None:
             dataset_list = self.fields.all_drs
-        all = set(self.fields.common(dataset_list=dataset_list))
+        all = self.fields.available(dataset_list=dataset_list)
         unk = set(science_fields) - all
         if len(unk) > 0:
             drs = self.fields.all_drs if dataset_list is None else dataset_list
@@ -467,16 +693,9 @@ class SparclClient:  # was SparclApi()
             science_fields, dataset_list=dataset_list
         )
 
-        if dataset_list is None:
-            dataset_list = self.fields.all_drs
         if science_fields is None:
             science_fields = self.fields.all_fields
-        common = self.fields.common_internal(dataset_list)
-        flds = set()
-        for dr in dataset_list:
-            for sn in science_fields:
-                flds.add(self.fields._internal_name(sn, dr))
-        return common.intersection(flds)
+        return set(self.fields.internal_names(science_fields, dataset_list))
 
     # Return Science Field Names (not Internal)
     def get_available_fields(self, *, dataset_list=None):
@@ -500,9 +719,223 @@ class SparclClient:  # was SparclApi()
 
         """  # noqa: E501
 
-        drs = self.fields.all_drs if dataset_list is None else dataset_list
-        every = [set(self.fields.n2o[dr]) for dr in drs]
-        return set.intersection(*every)
+        return set(self.fields.available(dataset_list))
+
+    def add_hook(self, event, callback):
+        """Call CALLBACK on every EVENT of the request lifecycle.
+        Use to attach tracing (e.g. OpenTelemetry spans) or profilers.
+
+        CALLBACK is called with one argument: a dictionary (with
+        attribute access) containing:
+
+        - event: Name of the event.
+        - call_id: Unique id of the client call (e.g. one retrieve).
+          Same for all events of the call.
+        - call: Name of client call (e.g. 'find', 'retrieve') or None.
+        - elapsed: Seconds since the start of the call.
+
+        Plus, depending on EVENT:
+
+        - request: (before each request) method, url, endpoint,
+          retry (True if the request failed and is sent again).
+        - response: (response headers received) method, url, endpoint,
+          status, connect (seconds to establish new connection),
+          ttfb (seconds to first byte), content_length (or None).
+        - error: (request failed) method, url, endpoint, error (exception).
+        - chunk: (each chunk of response body received) nbytes (of chunk),
+          bytes (received so far), content_length (or None).
+        - decode: (response body decoded) format, duration (seconds to
+          decode), records (count).
+        - wrap: (Results created) duration (seconds to rename and wrap),
+          records (count), timings (see Results.timings).
+
+        Args:
+            event (:obj:`str`): One of HOOK_EVENTS.
+
+            callback (callable): Function of one argument.
+
+        Returns:
+            CALLBACK (so it can be used as a decorator).
+
+        Example:
+            >>> client = SparclClient()
+            >>> spans = []
+            >>> _ = client.add_hook('wrap', lambda ev: spans.append(ev))
+            >>> found = client.find(limit=3)
+            >>> spans[0].call, spans[0].records
+            ('find', 3)
+        """
+        if event not in HOOK_EVENTS:
+            msg = f'Unknown hook event "{event}". Use one of: {HOOK_EVENTS}'
+            raise Exception(msg)
+        self.hooks[event].append(callback)
+        return callback
+
+    def remove_hook(self, event, callback):
+        """Stop calling CALLBACK on EVENT (see add_hook)."""
+        self.hooks[event].remove(callback)
+
+    # Call hooks of EVENT (if any) and the listener of TIMER (if any).
+    def _emit(self, event, timer, **payload):
+        callbacks = self.hooks[event]
+        if len(callbacks) == 0 and timer.listener is None:
+            return
+        info = ut._AttrDict(
+            event=event,
+            call_id=timer.id,
+            call=timer.name,
+            elapsed=timer.elapsed,
+        )
+        info.update(payload)
+        for callback in list(callbacks):
+            callback(info)
+        if timer.listener is not None:
+            timer.listener(info)
+
+    def _request(
+        self, method, url, *, timer=None, stream=False, failover=True, **kwargs
+    ):
+        """Send request to the Server. All requests from the client go
+        through here. If STREAM, the body of the response is not read
+        yet (see _read_body()).
+        TIMER (ut.PhaseTimer) gets phases: connect (establish new
+        connection) and ttfb (time to first byte of response).
+
+        When there are several hosts (and FAILOVER), a host that fails
+        is marked down, and an idempotent request is sent again to the
+        next host (see sparcl.hosts).  Only the response headers are
+        awaited, so a STREAM that fails part way is not sent again.
+        """
+        timer = ut.PhaseTimer() if timer is None else timer
+        root = self.hosts.root(url)
+        if not failover or root is None or len(self.hosts) == 1:
+            return self._send(method, url, timer, stream, **kwargs)
+
+        path = url[len(root) :]
+        order = self.hosts.order()
+        if not hosts.is_idempotent(method, url):
+            order = [root]
+        for idx, host in enumerate(order):
+            last = idx == len(order) - 1
+            try:
+                res = self._send(
+                    method, host + path, timer, stream, retry=idx > 0, **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                self.hosts.mark_down(host)
+                if last:
+                    raise
+            else:
+                if res.status_code not in hosts.FAILOVER_STATUS:
+                    return res
+                self.hosts.mark_down(host)
+                if last:
+                    return res
+                res.close()
+            if self.metrics is not None:
+                self.metrics.retries.inc(endpoint=urlparse(url).path)
+
+    def _send(self, method, url, timer, stream, retry=False, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = urlparse(url).path
+        self._emit(
+            "request",
+            timer,
+            method=method,
+            url=url,
+            endpoint=endpoint,
+            retry=retry,
+        )
+        _net.connect = 0.0
+        start = time.perf_counter()
+        try:
+            res = self._http.request(method, url, stream=stream, **kwargs)
+        except Exception as err:
+            if self.metrics is not None:
+                elapsed = time.perf_counter() - start
+                status = type(err).__name__
+                self.metrics.record_request(endpoint, status, elapsed)
+            self._emit(
+                "error",
+                timer,
+                method=method,
+                url=url,
+                endpoint=endpoint,
+                error=err,
+            )
+            raise
+        elapsed = time.perf_counter() - start
+        timer.add("connect", _net.connect)
+        timer.add("ttfb", elapsed - _net.connect)
+        length = res.headers.get("Content-Length")
+        self._emit(
+            "response",
+            timer,
+            method=method,
+            url=url,
+            endpoint=endpoint,
+            status=res.status_code,
+            connect=_net.connect,
+            ttfb=elapsed - _net.connect,
+            content_length=None if length is None else int(length),
+        )
+        if self.metrics is not None:
+            body = res.request.body
+            self.metrics.record_request(
+                endpoint,
+                res.status_code,
+                elapsed,
+                bytes_in=None if stream else len(res.content),
+                bytes_out=len(body) if body else 0,
+            )
+        return res
+
+    def _read_body(self, res, timer, fp):
+        """Read body of response RES into file FP.
+        TIMER (ut.PhaseTimer) gets phases: download and decompress,
+        and count of bytes (as transferred).
+
+        Returns:
+            File object of (decompressed) body positioned at start.
+        """
+        nbytes = 0
+        length = res.headers.get("Content-Length")
+        length = None if length is None else int(length)
+        with timer.phase("download"):
+            try:
+                for chunk in res.raw.stream(
+                    DOWNLOAD_CHUNK, decode_content=False
+                ):
+                    fp.write(chunk)
+                    nbytes += len(chunk)
+                    self._emit(
+                        "chunk",
+                        timer,
+                        nbytes=len(chunk),
+                        bytes=nbytes,
+                        content_length=length,
+                    )
+            except urllib3.exceptions.HTTPError as err:
+                msg = f"Incomplete response from {res.url}: {err}"
+                raise ex.UnknownSparcl(msg) from None
+        timer.count("bytes", nbytes)
+        if self.metrics is not None:
+            endpoint = urlparse(res.url).path
+            self.metrics.bytes_in.inc(nbytes, endpoint=endpoint)
+        fp.seek(0)
+        encoding = res.headers.get("Content-Encoding") or "identity"
+        if encoding == "identity":
+            return fp
+        if encoding not in ("gzip", "deflate"):
+            msg = (
+                f'Response from {res.url} has Content-Encoding "{encoding}".'
+                f" Expected one of: {ACCEPT_ENCODING}"
+            )
+            raise ex.UnknownSparcl(msg)
+        with timer.phase("decompress"):
+            # wbits: automatically detect gzip or zlib header
+            body = zlib.decompressobj(wbits=zlib.MAX_WBITS | 32)
+            return io.BytesIO(body.decompress(fp.read()) + body.flush())
 
     @property
     def version(self):
@@ -519,10 +952,10 @@ class SparclClient:  # was SparclApi()
             12.0
         """
 
+        if self.metrics is not None:
+            self.metrics.record_cache("version", self.apiversion is not None)
         if self.apiversion is None:
-            response = requests.get(
-                f"{self.apiurl}/version", timeout=self.timeout, cache=True
-            )
+            response = self._request("get", f"{self.apiurl}/version")
             self.apiversion = float(response.content)
         return self.apiversion
 
@@ -537,6 +970,8 @@ class SparclClient:  # was SparclApi()
         # count=False,
         # dataset_list=None,
         verbose=None,
+        progress=None,
+        max_in_list=MAX_IN_LIST,
     ):
         """Find records in the SPARCL database.
 
@@ -557,12 +992,25 @@ class SparclClient:  # was SparclApi()
             limit (:obj:`int`, optional): Maximum number of records to
                 return. Defaults to 500.
 
-            sort (:obj:`list`, optional): Comma separated list of fields
-                to sort by. Defaults to None. (no sorting)
+            sort (:obj:`str`, optional): Comma separated list of fields
+                to sort by; prefix a field with "-" for descending order
+                (e.g. "-redshift,ra"). Defaults to None. (no sorting)
 
             verbose (:obj:`bool`, optional): Set to True for in-depth return
                 statement. Defaults to False.
 
+            progress (callable, optional): Called with the progress of
+                the call (see sparcl.progress.Progress), e.g.
+                sparcl.progress.print_progress or tqdm_progress().
+                Defaults to None (no progress reporting).
+
+            max_in_list (:obj:`int`, optional): Maximum number of values
+                of a list constraint (e.g. a list of specids) sent in one
+                request.  A longer list is split into concurrent requests
+                whose records are merged (without duplicates, sorted by
+                ``sort`` if given, at most ``limit`` records).
+                Defaults to MAX_IN_LIST.
+
         Returns:
             :class:`~sparcl.Results.Found`: Contains header and records.
 
@@ -581,6 +1029,273 @@ class SparclClient:  # was SparclApi()
 
         verbose = self.verbose if verbose is None else verbose
 
+        url, qstr, outfields, constraints, sort = self._find_args(
+            outfields, constraints, limit, sort
+        )
+        searches = _split_search(constraints, max_in_list)
+
+        timer = ut.PhaseTimer("find")
+        timer.listener = as_progress(progress, pages=len(searches))
+        if len(searches) == 1:
+            sspec = dict(outfields=outfields, search=searches[0])
+            results = self._find_page(url, sspec, timer, verbose, qstr=qstr)
+        else:
+            results = self._find_split(
+                url, outfields, searches, sort, limit, timer, verbose
+            )
+        return self._wrap_found(results, timer, len(searches), verbose)
+
+    def find_cone(
+        self,
+        ra,
+        dec,
+        radius,
+        outfields=None,
+        *,
+        constraints=None,
+        limit=500,
+        sort=None,
+        bands=1,
+        verbose=None,
+        progress=None,
+    ):
+        """Find records within RADIUS degrees of a position.
+        The cone is covered by a few ra/dec boxes (split at RA=0; the
+        full range of RA when a pole is in the cone) that are found
+        concurrently.  The merged records are cut to the cone by their
+        exact angular distance.
+
+        Args:
+            ra (float): RA (degrees) of center of cone.
+
+            dec (float): Dec (degrees) of center of cone.
+
+            radius (float): Radius (degrees) of cone.
+
+            outfields (:obj:`list`, optional): List of fields to return.
+                Only CORE fields may be passed to this parameter.
+                Defaults to None, which will return only the sparcl_id
+                and _dr fields.
+
+            constraints (:obj:`dict`, optional): Other constraints (see
+                find()). Constraints on ra and dec are not allowed.
+                Defaults to None (no constraints).
+
+            limit (:obj:`int`, optional): Maximum number of records to
+                return (from each box and in total). A warning is given
+                when a box has more records (so records of the cone may
+                be missing). Defaults to 500.
+
+            sort (:obj:`str`, optional): Comma separated list of fields
+                to sort by (as for find). Defaults to None, meaning the
+                nearest record first.
+
+            bands (:obj:`int`, optional): Number of bands of declination
+                to cover the cone with (see sparcl.cone.cone_boxes).
+                Defaults to 1.
+
+            verbose (:obj:`bool`, optional): Set to True for in-depth return
+                statement. Defaults to False.
+
+            progress (callable, optional): Called with the progress of
+                the call (see sparcl.progress.Progress).
+                Defaults to None (no progress reporting).
+
+        Returns:
+            :class:`~sparcl.Results.Found`: Contains header and records.
+
+        Example:
+            >>> client = SparclClient()
+            >>> found = client.find_cone(150.1, 2.2, 0.05, ['ra', 'dec'])
+        """
+        verbose = self.verbose if verbose is None else verbose
+        constraints = dict() if constraints is None else dict(constraints)
+        if "ra" in constraints or "dec" in constraints:
+            msg = "find_cone() does not allow constraints on ra or dec."
+            raise ex.BadQuery(msg)
+        boxes = cone.cone_boxes(ra, dec, radius, bands=bands)
+
+        url, qstr, outfields, constraints, sort = self._find_args(
+            outfields, constraints, limit, sort
+        )
+        dr = list(self.fields.all_drs)[0]
+        ra_fld = self.fields._internal_name("ra", dr)
+        dec_fld = self.fields._internal_name("dec", dr)
+        search = [[k] + list(v) for k, v in constraints.items()]
+        searches = [
+            search + [[ra_fld, r1, r2], [dec_fld, d1, d2]]
+            for r1, r2, d1, d2 in boxes
+        ]
+
+        # Records within the cone (nearest first unless SORT).
+        def select(records):
+            pos = np.array(
+                [(r.get(ra_fld), r.get(dec_fld)) for r in records],
+                dtype=float,
+            ).reshape(-1, 2)
+            dist = cone.angular_distance(ra, dec, pos[:, 0], pos[:, 1])
+            keep = np.flatnonzero(dist <= radius)
+            if len(sort) == 0:
+                keep = keep[np.argsort(dist[keep], kind="stable")]
+            return [records[i] for i in keep]
+
+        timer = ut.PhaseTimer("find_cone")
+        timer.listener = as_progress(progress, pages=len(searches))
+        results = self._find_split(
+            url,
+            outfields,
+            searches,
+            sort,
+            limit,
+            timer,
+            verbose,
+            needed=[ra_fld, dec_fld],
+            select=select,
+        )
+        return self._wrap_found(results, timer, len(searches), verbose)
+
+    def crossmatch(
+        self,
+        ra,
+        dec,
+        radius,
+        *,
+        constraints=None,
+        tile=1.0,
+        nearest=True,
+        limit=10000,
+        verbose=None,
+        progress=None,
+    ):
+        """Match a catalog of positions to SPARCL records within RADIUS
+        degrees.  The targets are grouped into sky tiles; the candidate
+        records of each run of (at most TILES_PER_FIND) adjacent tiles
+        are found with one request (several run concurrently) and
+        matched with a KD-tree (requires scipy).
+
+        Args:
+            ra (array): RA (degrees) of each target.
+
+            dec (array): Dec (degrees) of each target.
+
+            radius (float): Match radius (degrees).
+
+            constraints (:obj:`dict`, optional): Other constraints on the
+                records (see find()). Constraints on ra and dec are not
+                allowed. Defaults to None (no constraints).
+
+            tile (:obj:`float`, optional): Size (degrees) of the side of
+                a sky tile. Defaults to 1.0.
+
+            nearest (:obj:`bool`, optional): Match each target only to
+                its nearest record. Set to False for every record within
+                RADIUS. Defaults to True.
+
+            limit (:obj:`int`, optional): Maximum number of candidate
+                records found for one run of tiles. A warning is given
+                when a run reaches it. Defaults to 10000.
+
+            verbose (:obj:`bool`, optional): Set to True for in-depth return
+                statement. Defaults to False.
+
+            progress (callable, optional): Called with the progress of
+                the call (see sparcl.progress.Progress).
+                Defaults to None (no progress reporting).
+
+        Returns:
+            :class:`~sparcl.crossmatch.CrossMatch`: Index arrays of
+            matched targets and records (and the sparcl_ids of records).
+
+        Example:
+            >>> client = SparclClient()
+            >>> xm = client.crossmatch([150.1, 150.2], [2.2, 2.3], 1/3600)
+            >>> got = client.retrieve(xm.matched_ids)
+        """
+        verbose = self.verbose if verbose is None else verbose
+        constraints = dict() if constraints is None else dict(constraints)
+        if "ra" in constraints or "dec" in constraints:
+            msg = "crossmatch() does not allow constraints on ra or dec."
+            raise ex.BadQuery(msg)
+        if not radius > 0:
+            raise ex.BadQuery(f"RADIUS must be positive. Got {radius}")
+        ra = np.asarray(ra, dtype=float).ravel()
+        dec = np.asarray(dec, dtype=float).ravel()
+        if ra.shape != dec.shape:
+            msg = f"RA and DEC must have the same length. Got {ra.shape}"
+            raise ex.BadQuery(msg + f" and {dec.shape}")
+
+        timer = ut.PhaseTimer("crossmatch")
+        with timer.phase("tile"):
+            tiles = xmatch.tile_targets(ra, dec, tile)
+            boxes = [
+                box
+                for idx in xmatch.group_tiles(tiles)
+                for box in xmatch.tile_boxes(ra[idx], dec[idx], radius)
+            ]
+
+        url, qstr, outfields, constraints, _ = self._find_args(
+            ["sparcl_id", "ra", "dec"], constraints, limit, None
+        )
+        id_fld, ra_fld, dec_fld = outfields
+        search = [[k] + list(v) for k, v in constraints.items()]
+        sspecs = [
+            dict(
+                outfields=outfields,
+                search=search + [[ra_fld, r1, r2], [dec_fld, d1, d2]],
+            )
+            for r1, r2, d1, d2 in boxes
+        ]
+        timer.listener = as_progress(progress, pages=max(1, len(sspecs)))
+        pages = self._find_pages(url, sspecs, timer, verbose) if sspecs else []
+
+        with timer.phase("merge"):
+            full = sum(len(page) - 1 >= limit for page in pages)
+            if full > 0:
+                msg = (
+                    f"{full} of {len(pages)} requests reached the limit of"
+                    f" {limit:,d} candidate records; some matches may be"
+                    f" missing. Use a smaller tile or a larger limit."
+                )
+                warn(msg, stacklevel=2)
+            records = [rec for page in pages for rec in page[1:]]
+            ids = np.array([rec[id_fld] for rec in records], dtype=object)
+            ids, first = np.unique(ids.astype(str), return_index=True)
+            cand_ra = np.array(
+                [records[i][ra_fld] for i in first], dtype=float
+            )
+            cand_dec = np.array(
+                [records[i][dec_fld] for i in first], dtype=float
+            )
+        with timer.phase("match"):
+            target, cand, sep = xmatch.match(
+                ra, dec, cand_ra, cand_dec, radius, nearest=nearest
+            )
+        result = xmatch.CrossMatch(ids, cand_ra, cand_dec, target, cand, sep)
+        timer.count("records", len(ids))
+        result.timings = timer.as_dict()
+        self._emit(
+            "wrap",
+            timer,
+            duration=timer.phases["match"],
+            records=len(ids),
+            timings=result.timings,
+            pages=max(1, len(sspecs)),
+        )
+        if self.metrics is not None:
+            total = result.timings["total"]
+            self.metrics.record_records("crossmatch", len(ids), total)
+        if verbose:
+            print(
+                f"Matched {len(np.unique(target)):,d} of {len(ra):,d}"
+                f" targets to {len(ids):,d} candidate records"
+                f" of {len(tiles):,d} tiles."
+            )
+        return result
+
+    # Validate find() arguments and convert to Internal field names.
+    # RETURN: url, qstr, outfields, constraints, and sort keys (see
+    # _sort_keys); all with Internal field names.
+    def _find_args(self, outfields, constraints, limit, sort):
         # Let "outfields" default to ['id']; but fld may have been renamed
         if outfields is None:
             outfields = ["sparcl_id"]
@@ -596,19 +1311,49 @@ class SparclClient:  # was SparclApi()
                 self.fields._internal_name(k, dr): v
                 for k, v in constraints.items()
             }
+        sort = _sort_keys(sort)
+        if len(sort) > 0:
+            self._validate_science_fields(
+                [fld for fld, _ in sort], dataset_list=dataset_list
+            )
+            sort = [(self.fields._internal_name(f, dr), d) for f, d in sort]
         uparams = dict(
             limit=limit,
             #! count='Y' if count else 'N'
         )
-        if sort is not None:
-            uparams["sort"] = sort
+        if len(sort) > 0:
+            uparams["sort"] = ",".join(
+                ("-" if desc else "") + fld for fld, desc in sort
+            )
         qstr = urlencode(uparams)
         url = f"{self.apiurl}/find/?{qstr}"
 
         outfields = [self.fields._internal_name(s, dr) for s in outfields]
-        search = [[k] + v for k, v in constraints.items()]
-        sspec = dict(outfields=outfields, search=search)
+        return url, qstr, outfields, constraints, sort
+
+    # Wrap RESULTS of PAGES find requests as Found.
+    def _wrap_found(self, results, timer, pages, verbose):
+        with timer.phase("rename"):
+            found = Found(results, client=self)
+        timer.count("records", found.count)
+        found.timings = timer.as_dict()
+        self._emit(
+            "wrap",
+            timer,
+            duration=timer.phases["rename"],
+            records=found.count,
+            timings=found.timings,
+            pages=pages,
+        )
+        if self.metrics is not None:
+            total = found.timings["total"]
+            self.metrics.record_records(timer.name, found.count, total)
+        if verbose:
+            print(f"Record key counts: {ut.count_values(found.records)}")
+        return found
 
+    # Send one find request. RETURN: [header, record, ...]
+    def _find_page(self, url, sspec, timer, verbose, qstr=None):
         if verbose:
             print(f"url={url} sspec={sspec}")
         if self.show_curl:
@@ -616,17 +1361,113 @@ class SparclClient:  # was SparclApi()
             print(cmd)
 
         auth = TokenAuth(self.token, self.token_expired) if self.token else None  # noqa: E501
-        res = requests.post(url, json=sspec, auth=auth, timeout=self.timeout)
+        res = self._request(
+            "post", url, timer=timer, stream=True, json=sspec, auth=auth
+        )
 
         if res.status_code != 200:
             if verbose and ("traceback" in res.json()):
                 print(f'DBG: Server traceback=\n{res.json()["traceback"]}')
             raise ex.genSparclException(res, verbose=self.verbose)
 
-        found = Found(res.json(), client=self)
+        body = self._read_body(res, timer, io.BytesIO())
+        start = time.perf_counter()
+        results = json.load(body)
+        duration = time.perf_counter() - start
+        timer.add("decode", duration)
+        self._emit(
+            "decode",
+            timer,
+            format="json",
+            duration=duration,
+            records=len(results) - 1,
+        )
+        return results
+
+    # Send one find request per SSPECS (FIND_WORKERS at a time).
+    # RETURN: list of results, one per SSPECS (in order)
+    def _find_pages(self, url, sspecs, timer, verbose):
+        workers = min(FIND_WORKERS, len(sspecs))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(
+                pool.map(
+                    lambda sspec: self._find_page(url, sspec, timer, verbose),
+                    sspecs,
+                )
+            )
+
+    # Send one find request per search of SEARCHES (concurrently) and
+    # merge their records: without duplicates, selected by SELECT (if
+    # given), sorted by SORT (keys of _find_args), at most LIMIT records.
+    # NEEDED fields are requested for SELECT (but not returned).
+    # RETURN: [header, record, ...]
+    def _find_split(  # noqa: C901
+        self,
+        url,
+        outfields,
+        searches,
+        sort,
+        limit,
+        timer,
+        verbose,
+        needed=(),
+        select=None,
+    ):
+        sort_fields = [fld for fld, _ in sort]
+        dr = list(self.fields.all_drs)[0]
+        idfld = self.fields._internal_name("sparcl_id", dr)
+        # Fields needed to merge, but not asked for
+        extra = [
+            f
+            for f in [idfld] + sort_fields + list(needed)
+            if f not in outfields
+        ]
+        extra = list(dict.fromkeys(extra))
+        sspecs = [
+            dict(outfields=outfields + extra, search=search)
+            for search in searches
+        ]
+        pages = self._find_pages(url, sspecs, timer, verbose)
+
+        with timer.phase("merge"):
+            hdr = _merge_status([page[0] for page in pages])
+            # Records beyond the limit of a request could have been
+            # selected (e.g. nearer to the center of a cone).
+            full = 0
+            if select is not None and limit is not None:
+                full = sum(len(page) - 1 >= limit for page in pages)
+            if full > 0:
+                msg = (
+                    f"{full} of {len(pages)} requests reached the limit of"
+                    f" {limit:,d} records; some records may be missing."
+                    f" Use a larger limit."
+                )
+                warn(msg, stacklevel=3)
+            records = dict()  # records[sparcl_id] = rec
+            for page in pages:
+                for rec in page[1:]:
+                    records.setdefault(rec.get(idfld), rec)
+            records = list(records.values())
+            if select is not None:
+                records = select(records)
+            # Stable sorts, last sort field first (like the Server).
+            # None is last (first when descending), as in the database.
+            for fld, desc in reversed(sort):
+                records.sort(
+                    key=lambda r: (r.get(fld) is None, r.get(fld)),
+                    reverse=desc,
+                )
+            if limit is not None:
+                records = records[: int(limit)]
+            for rec in records:
+                for fld in extra:
+                    rec.pop(fld, None)
         if verbose:
-            print(f"Record key counts: {ut.count_values(found.records)}")
-        return found
+            print(
+                f"Merged {sum(len(p) - 1 for p in pages)} records"
+                f" of {len(pages)} requests into {len(records)} records."
+            )
+        return [hdr] + records
 
     def missing(
         self, uuid_list, *, dataset_list=None, countOnly=False, verbose=False
@@ -672,7 +1513,7 @@ class SparclClient:  # was SparclApi()
         uuids = list(uuid_list)
         if verbose:
             print(f'Using url="{url}"')
-        res = requests.post(url, json=uuids, timeout=self.timeout)
+        res = self._request("post", url, json=uuids)
 
         res.raise_for_status()
         if res.status_code != 200:
@@ -725,7 +1566,7 @@ class SparclClient:  # was SparclApi()
         specids = list(specid_list)
         if verbose:
             print(f'Using url="{url}"')
-        res = requests.post(url, json=specids, timeout=self.timeout)
+        res = self._request("post", url, json=specids)
 
         res.raise_for_status()
         if res.status_code != 200:
@@ -745,7 +1586,7 @@ class SparclClient:  # was SparclApi()
             msg = f"Bad INCLUDE_LIST. Must be list. Got {include_list}"
             raise ex.BadInclude(msg)
 
-        avail_science = self.get_available_fields(dataset_list=dataset_list)
+        avail_science = self.fields.available(dataset_list)
         inc_set = set(include_list)
         unknown = inc_set.difference(avail_science)
         if len(unknown) > 0:
@@ -761,63 +1602,12 @@ class SparclClient:  # was SparclApi()
             raise ex.BadInclude(msg)
         return True
 
-    def retrieve(  # noqa: C901
-        self,
-        uuid_list,
-        *,
-        include="DEFAULT",
-        dataset_list=None,
-        limit=500,
-        verbose=None,
+    # Validate parameters of retrieve (and variants).
+    # RETURN: (url, ids) of POST to Server
+    def _retrieve_url(
+        self, uuid_list, *, include, dataset_list, limit, format, verbose
     ):
-        """Retrieve spectra records from the SPARCL database by list of
-        sparcl_ids.
-
-        Args:
-            uuid_list (:obj:`list`): List of sparcl_ids.
-
-            include (:obj:`list`, optional): List of field names to include
-                in each record. Defaults to 'DEFAULT', which will return
-                the fields tagged as 'default'.
-
-            dataset_list (:obj:`list`, optional): List of data sets from
-                which to retrieve spectra data. Defaults to None, meaning all
-                data sets hosted on the SPARCL database.
-
-            limit (:obj:`int`, optional): Maximum number of records to
-                return. Defaults to 500. Maximum allowed is 24,000.
-
-            verbose (:obj:`bool`, optional): Set to True for in-depth return
-                statement. Defaults to False.
-
-        Returns:
-            :class:`~sparcl.Results.Retrieved`: Contains header and records.
-
-        Example:
-            >>> client = SparclClient()
-            >>> ids = client.find(limit=1).ids
-            >>> inc = ['sparcl_id', 'flux', 'wavelength', 'model']
-            >>> ret = client.retrieve(uuid_list=ids, include=inc)
-            >>> type(ret.records[0].wavelength)
-            <class 'numpy.ndarray'>
-        """
-
-        # Variants for async, etc.
-        #
-        # From "performance testing" docstring
-        #    svc (:obj:`str`, optional): Defaults to 'spectras'.
-        #
-        #    format (:obj:`str`, optional): Defaults to 'pkl'.
-        #
-        #
-        #    chunk (:obj:`int`, optional): Size of chunks to break list into.
-        #        Defaults to 500.
-        #
-        # These were keyword params:
         svc = "spectras"  # retrieve, spectras
-        format = "pkl"  # 'json',
-        chunk = 500
-
         orig_dataset_list = dataset_list
         if dataset_list is None:
             dataset_list = self.fields.all_drs
@@ -825,8 +1615,6 @@ class SparclClient:  # was SparclApi()
             dataset_list, (list, set)
         ), f"DATASET_LIST must be a list. Found {dataset_list}"
 
-        verbose = self.verbose if verbose is None else verbose
-
         if (include == DEFAULT) or (include is None) or include == []:
             include_list = self.get_default_fields(dataset_list=dataset_list)
         elif include == ALL:
@@ -873,16 +1661,22 @@ class SparclClient:  # was SparclApi()
         url = f"{self.apiurl}/{svc}/?{qstr}"
         if verbose:
             print(f'Using url="{url}"')
-            ut.tic()
 
         ids = list(uuid_list) if limit is None else list(uuid_list)[:limit]
         if self.show_curl:
             cmd = ut.curl_retrieve_str(ids, self.rooturl, svc=svc, qstr=qstr)
             print(cmd)
 
+        return url, ids
+
+    # POST list of IDS to URL (retrieve and variants).
+    # RETURN: response (body not read yet)
+    def _post_ids(self, url, ids, timer, verbose=False):  # noqa: C901
         try:
             auth = TokenAuth(self.token, self.token_expired) if self.token else None  # noqa: E501
-            res = requests.post(url, json=ids, auth=auth, timeout=self.timeout)
+            res = self._request(
+                "post", url, timer=timer, stream=True, json=ids, auth=auth
+            )
         except requests.exceptions.ConnectTimeout as reCT:
             raise ex.UnknownSparcl(f"ConnectTimeout: {reCT}")
         except requests.exceptions.ReadTimeout as reRT:
@@ -907,7 +1701,7 @@ class SparclClient:  # was SparclApi()
             raise ex.UnknownSparcl(err)
 
         if verbose:
-            elapsed = ut.toc()
+            elapsed = timer.as_dict()["total"]
             print(f"Got response to post in {elapsed} seconds")
         if res.status_code != 200:
             if verbose:
@@ -916,25 +1710,153 @@ class SparclClient:  # was SparclApi()
             if verbose and ("traceback" in res.json()):
                 print(f'DBG: Server traceback=\n{res.json()["traceback"]}')
             raise ex.genSparclException(res, verbose=verbose)
+        return res
 
-        if format == "json":
-            results = res.json()
-        elif format == "pkl":
-            # Read chunked binary file (representing pickle file) from
-            # server response. Load pickle into python data structure.
-            # Python structure is list of records where first element
-            # is a header.
-            with tempfile.TemporaryFile(mode="w+b") as fp:
-                for idx, chunk in enumerate(res.iter_content(chunk_size=None)):
-                    fp.write(chunk)
-                # Position to start of file for pickle reading (load)
-                fp.seek(0)
-                results = pickle.load(fp)
+    def retrieve(  # noqa: C901
+        self,
+        uuid_list,
+        *,
+        include="DEFAULT",
+        dataset_list=None,
+        limit=500,
+        verbose=None,
+        progress=None,
+        workers=None,
+    ):
+        """Retrieve spectra records from the SPARCL database by list of
+        sparcl_ids.
+
+        Args:
+            uuid_list (:obj:`list`): List of sparcl_ids.
+
+            include (:obj:`list`, optional): List of field names to include
+                in each record. Defaults to 'DEFAULT', which will return
+                the fields tagged as 'default'.
+
+            dataset_list (:obj:`list`, optional): List of data sets from
+                which to retrieve spectra data. Defaults to None, meaning all
+                data sets hosted on the SPARCL database.
+
+            limit (:obj:`int`, optional): Maximum number of records to
+                return. Defaults to 500. Maximum allowed is 24,000.
+
+            verbose (:obj:`bool`, optional): Set to True for in-depth return
+                statement. Defaults to False.
+
+            progress (callable, optional): Called with the progress of
+                the call (see sparcl.progress.Progress), e.g.
+                sparcl.progress.print_progress or tqdm_progress().
+                Defaults to None (no progress reporting).
+
+            workers (:obj:`int`, optional): Number of processes to decode
+                records (unpickle and rename fields) with. The sparcl_ids
+                are retrieved in several requests (of at most
+                DECODE_CHUNK); each response is decoded through shared
+                memory (see sparcl.decode_pool) while the next one is
+                received, and spectra arrays are not copied between
+                processes. Worth it for many records with wide include
+                lists on a multi-core machine.
+                Defaults to None (one request, decoded in this process).
+
+        Returns:
+            :class:`~sparcl.Results.Retrieved`: Contains header and records.
+
+        Example:
+            >>> client = SparclClient()
+            >>> ids = client.find(limit=1).ids
+            >>> inc = ['sparcl_id', 'flux', 'wavelength', 'model']
+            >>> ret = client.retrieve(uuid_list=ids, include=inc)
+            >>> type(ret.records[0].wavelength)
+            <class 'numpy.ndarray'>
+        """
+
+        # Variants for async, etc.
+        #
+        # From "performance testing" docstring
+        #    svc (:obj:`str`, optional): Defaults to 'spectras'.
+        #
+        #    format (:obj:`str`, optional): Defaults to 'pkl'.
+        #
+        #
+        #    chunk (:obj:`int`, optional): Size of chunks to break list into.
+        #        Defaults to 500.
+        #
+        # These were keyword params:
+        #! svc = "spectras"  # retrieve, spectras  (see _retrieve_url)
+        format = "pkl"  # 'json',
+        #! chunk = 500
+        pooled = workers is not None and workers > 1
+
+        verbose = self.verbose if verbose is None else verbose
+        url, ids = self._retrieve_url(
+            uuid_list,
+            include=include,
+            dataset_list=dataset_list,
+            limit=limit,
+            format=format,
+            verbose=verbose,
+        )
+        timer = ut.PhaseTimer("retrieve")
+        # Requests of sparcl_ids: enough to keep WORKERS busy
+        if pooled:
+            size = -(-len(ids) // (2 * workers))  # ceiling
+            size = max(1, min(size, DECODE_CHUNK))
+            chunks = [ids[i : i + size] for i in range(0, len(ids), size)]
+        timer.listener = as_progress(
+            progress,
+            total_records=len(ids),
+            pages=len(chunks) if pooled else 1,
+        )
+
+        # Read chunked binary file (representing pickle file) from
+        # server response into a temporary file. Load pickle into python
+        # data structure. Python structure is list of records where first
+        # element is a header.
+        phase = "decode" if format == "json" else "unpickle"
+        if pooled:
+            urls = []  # of the response to each chunk
+            with decode_pool.PickleDecoder(self.fields, workers) as decoder:
+                for chunk in chunks:
+                    res = self._post_ids(url, chunk, timer, verbose=verbose)
+                    urls.append(res.url)
+                    with decode_pool.shared_file() as fp:
+                        body = self._read_body(res, timer, fp)
+                        if body is not fp:  # decompressed
+                            fp.seek(0)
+                            fp.truncate()
+                            fp.write(body.getbuffer())
+                    decoder.submit(fp.name)
+                with timer.phase(phase):
+                    parts = decoder.results()
+            for part, chunk, res_url in zip(parts, chunks, urls):
+                if len(part) == 0:
+                    msg = (
+                        f"Empty response from {res_url} to {len(chunk):,d}"
+                        f" sparcl_ids ({chunk[0]} to {chunk[-1]})."
+                    )
+                    raise ex.UnknownSparcl(msg)
+            results = [_merge_status([part[0] for part in parts])]
+            results += [rec for part in parts for rec in part[1:]]
         else:
-            results = res.json()
+            res = self._post_ids(url, ids, timer, verbose=verbose)
+            with tempfile.TemporaryFile(mode="w+b") as fp:
+                body = self._read_body(res, timer, fp)
+                with timer.phase(phase):
+                    if format == "pkl":
+                        results = pickle.load(body)
+                    else:
+                        results = json.load(body)
+        self._emit(
+            "decode",
+            timer,
+            format=format,
+            duration=timer.phases[phase],
+            records=len(results) - 1,
+        )
 
         meta = results[0]
         if verbose:
+            elapsed = timer.as_dict()["total"]
             count = len(results) - 1
             print(
                 f"Got {count} spectra in "
@@ -946,7 +1868,161 @@ class SparclClient:  # was SparclApi()
         if len(meta["status"].get("warnings", [])) > 0:
             warn(f"{'; '.join(meta['status'].get('warnings'))}", stacklevel=2)
 
-        return Retrieved(results, client=self)
+        with timer.phase("rename"):
+            renamed = pooled  # by decode_pool
+            got = Retrieved(results, client=self, renamed=renamed)
+        timer.count("records", got.count)
+        got.timings = timer.as_dict()
+        self._emit(
+            "wrap",
+            timer,
+            duration=timer.phases["rename"],
+            records=got.count,
+            timings=got.timings,
+        )
+        if self.metrics is not None:
+            total = got.timings["total"]
+            self.metrics.record_records("retrieve", got.count, total)
+        return got
+
+    def retrieve_stream(
+        self,
+        uuid_list,
+        *,
+        include="DEFAULT",
+        dataset_list=None,
+        limit=500,
+        format=framing.PKL_STREAM,
+        verbose=None,
+        progress=None,
+    ):
+        """Retrieve spectra records from the SPARCL database by list of
+        sparcl_ids as a stream. Unlike retrieve(), each record can be used
+        as soon as it has been received; before the whole response has
+        been received.
+
+        Args:
+            uuid_list (:obj:`list`): List of sparcl_ids.
+
+            include (:obj:`list`, optional): List of field names to include
+                in each record. Defaults to 'DEFAULT', which will return
+                the fields tagged as 'default'.
+
+            dataset_list (:obj:`list`, optional): List of data sets from
+                which to retrieve spectra data. Defaults to None, meaning all
+                data sets hosted on the SPARCL database.
+
+            limit (:obj:`int`, optional): Maximum number of records to
+                return. Defaults to 500. Maximum allowed is 24,000.
+
+            format (:obj:`str`, optional): Format of stream. 'pkl-stream'
+                (one length-prefixed pickle per record) or 'ndjson' (one
+                line of JSON per record; spectra fields are lists).
+                Defaults to 'pkl-stream'.
+
+            verbose (:obj:`bool`, optional): Set to True for in-depth return
+                statement. Defaults to False.
+
+            progress (callable, optional): Called with the progress of
+                the call (see sparcl.progress.Progress), e.g.
+                sparcl.progress.print_progress or tqdm_progress().
+                Defaults to None (no progress reporting).
+
+        Returns:
+            :class:`~sparcl.Results.RecordStream`: Iterator of records.
+
+        Example:
+            >>> client = SparclClient()
+            >>> ids = client.find(limit=3).ids
+            >>> stream = client.retrieve_stream(ids, include=['flux'])
+            >>> [len(rec.flux) > 0 for rec in stream]
+            [True, True, True]
+        """
+        verbose = self.verbose if verbose is None else verbose
+        decoder = framing.decoder(format)
+        url, ids = self._retrieve_url(
+            uuid_list,
+            include=include,
+            dataset_list=dataset_list,
+            limit=limit,
+            format=format,
+            verbose=verbose,
+        )
+        timer = ut.PhaseTimer("retrieve_stream")
+        timer.listener = as_progress(progress, total_records=len(ids))
+        res = self._post_ids(url, ids, timer, verbose=verbose)
+        stream = RecordStream()
+        stream._records = self._stream_records(res, timer, decoder, stream)
+        return stream
+
+    # Generate records of STREAM (RecordStream) from response RES as
+    # each frame is received.
+    def _stream_records(self, res, timer, decoder, stream):  # noqa: C901
+        length = res.headers.get("Content-Length")
+        length = None if length is None else int(length)
+        chunks = res.raw.stream(DOWNLOAD_CHUNK, decode_content=True)
+        nbytes = 0
+        try:
+            while True:
+                with timer.phase("download"):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                nbytes += len(chunk)
+                self._emit(
+                    "chunk",
+                    timer,
+                    nbytes=len(chunk),
+                    bytes=nbytes,
+                    content_length=length,
+                )
+                with timer.phase("decode"):
+                    objs = decoder.feed(chunk)
+                for obj in objs:
+                    if stream.hdr is None:
+                        stream.hdr = obj
+                        warnings = obj["status"].get("warnings", [])
+                        if len(warnings) > 0:
+                            warn(f"{'; '.join(warnings)}", stacklevel=2)
+                        continue
+                    with timer.phase("rename"):
+                        rec = science_record(obj, self.fields)
+                    if rec is None:
+                        continue
+                    if "sparcl_id" in rec:
+                        rec["sparcl_id"] = str(rec["sparcl_id"])
+                    stream.count += 1
+                    yield rec
+            decoder.close()
+        except urllib3.exceptions.HTTPError as err:
+            msg = f"Incomplete response from {res.url}: {err}"
+            raise ex.UnknownSparcl(msg) from None
+        finally:
+            res.close()
+
+        timer.count("bytes", nbytes)
+        timer.count("records", stream.count)
+        if self.metrics is not None:
+            endpoint = urlparse(res.url).path
+            self.metrics.bytes_in.inc(nbytes, endpoint=endpoint)
+        self._emit(
+            "decode",
+            timer,
+            format=decoder.format,
+            duration=timer.phases.get("decode", 0.0),
+            records=stream.count,
+        )
+        stream.timings = timer.as_dict()
+        self._emit(
+            "wrap",
+            timer,
+            duration=timer.phases.get("rename", 0.0),
+            records=stream.count,
+            timings=stream.timings,
+        )
+        if self.metrics is not None:
+            total = stream.timings["total"]
+            self.metrics.record_records("retrieve_stream", stream.count, total)
 
     def retrieve_by_specid(
         self,
@@ -958,6 +2034,7 @@ class SparclClient:  # was SparclApi()
         dataset_list=None,
         limit=500,
         verbose=False,
+        progress=None,
     ):
         """Retrieve spectra records from the SPARCL database by list of
         specids.
@@ -979,6 +2056,11 @@ class SparclClient:  # was SparclApi()
             verbose (:obj:`bool`, optional): Set to True for in-depth return
                 statement. Defaults to False.
 
+            progress (callable, optional): Called with the progress of
+                the call (see sparcl.progress.Progress), e.g.
+                sparcl.progress.print_progress or tqdm_progress().
+                Defaults to None (no progress reporting).
+
         Returns:
             :class:`~sparcl.Results.Retrieved`: Contains header and records.
 
@@ -1024,11 +2106,157 @@ class SparclClient:  # was SparclApi()
             dataset_list=dataset_list,
             limit=limit,
             verbose=verbose,
+            progress=progress,
         )
         if verbose:
             print(f"Got {res.count} records.")
+        res.timings["find"] = found.timings["total"]
+        res.timings["total"] += found.timings["total"]
         return res
 
+    def retrieve_pages(
+        self,
+        uuid_list,
+        *,
+        page=1000,
+        include="DEFAULT",
+        dataset_list=None,
+        verbose=None,
+        progress=None,
+    ):
+        """Retrieve spectra records in pages of (at most) PAGE records.
+        Unlike retrieve(), there is no limit on the total number of
+        sparcl_ids.  Only one page of records is held in memory at a time
+        (unless the caller keeps them).
+
+        Args:
+            uuid_list (:obj:`list`): List of sparcl_ids.
+
+            page (:obj:`int`, optional): Maximum number of records to
+                retrieve with each call to retrieve(). Defaults to 1000.
+                Maximum allowed is 24,000.
+
+            include (:obj:`list`, optional): List of field names to include
+                in each record. Defaults to 'DEFAULT', which will return
+                the fields tagged as 'default'.
+
+            dataset_list (:obj:`list`, optional): List of data sets from
+                which to retrieve spectra data. Defaults to None, meaning all
+                data sets hosted on the SPARCL database.
+
+            verbose (:obj:`bool`, optional): Set to True for in-depth return
+                statement. Defaults to False.
+
+            progress (callable, optional): Called with the progress of
+                all pages (see sparcl.progress.Progress), e.g.
+                sparcl.progress.print_progress or tqdm_progress().
+                Defaults to None (no progress reporting).
+
+        Returns:
+            Generator of :class:`~sparcl.Results.Retrieved`, one per page.
+
+        Example:
+            >>> client = SparclClient()
+            >>> ids = client.find(limit=5).ids
+            >>> [p.count for p in client.retrieve_pages(ids, page=2)]
+            [2, 2, 1]
+        """
+        page = min(int(page), MAX_NUM_RECORDS_RETRIEVED)
+        ids = list(uuid_list)
+        pages = -(-len(ids) // page)  # ceiling
+        progress = as_progress(progress, total_records=len(ids), pages=pages)
+        for cnt in range(0, len(ids), page):
+            page_ids = ids[cnt : cnt + page]
+            yield self.retrieve(
+                page_ids,
+                include=include,
+                dataset_list=dataset_list,
+                limit=len(page_ids),
+                verbose=verbose,
+                progress=progress,
+            )
+
+    def retrieve_to_store(
+        self,
+        uuid_list,
+        path,
+        *,
+        page=1000,
+        include="DEFAULT",
+        dataset_list=None,
+        fields=None,
+        dtype=None,
+        verbose=None,
+        progress=None,
+    ):
+        """Retrieve spectra records into a memory-mapped store on disk.
+        Spectra fields are written to one padded 2D np.memmap file per
+        field as each page of records is retrieved. Use this when the
+        spectra will not all fit in memory.
+
+        Args:
+            uuid_list (:obj:`list`): List of sparcl_ids.
+
+            path (:obj:`str`): Directory to hold the store. It must not
+                already contain a store.
+
+            page (:obj:`int`, optional): Maximum number of records to
+                retrieve with each call to retrieve(). Defaults to 1000.
+
+            include (:obj:`list`, optional): List of field names to include
+                in each record. Defaults to 'DEFAULT', which will return
+                the fields tagged as 'default'.
+
+            dataset_list (:obj:`list`, optional): List of data sets from
+                which to retrieve spectra data. Defaults to None, meaning all
+                data sets hosted on the SPARCL database.
+
+            fields (:obj:`list`, optional): Spectra fields to put in the
+                store. Defaults to None, meaning all spectra fields in
+                INCLUDE.
+
+            dtype (:obj:`str`, optional): Store floating point fields with
+                this dtype (e.g. 'float32'). Defaults to None, meaning
+                the dtype of the retrieved fields.
+
+            verbose (:obj:`bool`, optional): Set to True for in-depth return
+                statement. Defaults to False.
+
+            progress (callable, optional): Called with the progress of
+                all pages (see sparcl.progress.Progress), e.g.
+                sparcl.progress.print_progress or tqdm_progress().
+                Defaults to None (no progress reporting).
+
+        Returns:
+            :class:`~sparcl.spectra_store.SpectraStore`: Read-only store.
+                Reopen later with SpectraStore(path).
+
+        Example:
+            >>> client = SparclClient()
+            >>> ids = client.find(limit=5).ids
+            >>> inc = ['sparcl_id', 'flux', 'wavelength']
+            >>> store = client.retrieve_to_store(ids, '/tmp/s5', include=inc)
+            >>> store['flux'].shape[0]
+            5
+        """
+        verbose = self.verbose if verbose is None else verbose
+        store = SpectraStore.create(path, fields=fields, dtype=dtype)
+        try:
+            for got in self.retrieve_pages(
+                uuid_list,
+                page=page,
+                include=include,
+                dataset_list=dataset_list,
+                verbose=verbose,
+                progress=progress,
+            ):
+                count = store.append(got.records)
+                if verbose:
+                    print(f"Stored {count:,d} records in {path}")
+        finally:
+            store.close()
+        return SpectraStore(path)
+
 
 if __name__ == "__main__":
     import doctest
@@ -0,0 +1,121 @@
+"""Geometry of cone searches (used by client.find_cone).
+
+The Server only supports range constraints on ra and dec, so a cone
+(all positions within RADIUS degrees of RA, DEC) is covered by a few
+ra/dec boxes.  The records found in the boxes are then cut to the cone
+with the exact angular distance.
+
+Example:
+    >>> def show(boxes):
+    ...     return [tuple(round(v, 3) for v in box) for box in boxes]
+    >>> show(cone_boxes(10.0, 0.0, 1.0))
+    [(9.0, 11.0, -1.0, 1.0)]
+    >>> show(cone_boxes(0.5, 0.0, 1.0))
+    [(359.5, 360.0, -1.0, 1.0), (0.0, 1.5, -1.0, 1.0)]
+    >>> show(cone_boxes(45.0, 89.5, 1.0))
+    [(0.0, 360.0, 88.5, 90.0)]
+"""
+
+# Python Standard Library
+import math
+
+# External Packages
+import numpy as np
+
+# Local Packages
+import sparcl.exceptions as ex
+
+
+# Degrees added to every side of a box so it covers the cone in spite
+# of rounding errors.
+PAD = 1e-9
+
+
+# RETURN: Half width (degrees of RA) of cone at declination D.
+def _half_width(dec, radius, d):
+    dec0, r, d = math.radians(dec), math.radians(radius), math.radians(d)
+    denom = math.cos(d) * math.cos(dec0)
+    if denom <= 1e-15:
+        return 180.0  # At a pole
+    c = (math.cos(r) - math.sin(d) * math.sin(dec0)) / denom
+    if c <= -1:
+        return 180.0
+    return math.degrees(math.acos(min(1.0, c)))
+
+
+# RETURN: Largest half width (degrees of RA) of cone between
+# declinations D1 and D2.
+def _max_half_width(dec, radius, d1, d2):
+    widths = [_half_width(dec, radius, d) for d in (d1, d2)]
+    if radius < 90:
+        # Declination where the cone is widest (edge is tangent to the
+        # meridian)
+        s = math.sin(math.radians(dec)) / math.cos(math.radians(radius))
+        if abs(s) <= 1:
+            widest = math.degrees(math.asin(s))
+            if d1 <= widest <= d2:
+                widths.append(_half_width(dec, radius, widest))
+    else:
+        widths.append(180.0)
+    return max(widths)
+
+
+def _ra_ranges(ra, half):
+    if half + PAD >= 180:
+        return [(0.0, 360.0)]
+    lo, hi = ra - half - PAD, ra + half + PAD
+    if lo < 0:
+        return [(lo + 360, 360.0), (0.0, hi)]
+    if hi > 360:
+        return [(lo, 360.0), (0.0, hi - 360)]
+    return [(lo, hi)]
+
+
+def cone_boxes(ra, dec, radius, bands=1):
+    """Boxes (ranges of ra and dec) that together cover a cone.
+    A box never crosses RA=0 (it is split in two instead) and a cone
+    that contains a pole is covered by boxes with the full range of RA.
+
+    Args:
+        ra (float): RA (degrees) of center of cone.
+
+        dec (float): Dec (degrees) of center of cone.
+
+        radius (float): Radius (degrees) of cone.
+
+        bands (:obj:`int`, optional): Number of bands of declination.
+            More bands cover less area outside of the cone (for large
+            cones) at the cost of more boxes.  Defaults to 1.
+
+    Returns:
+        List of boxes: (ra_min, ra_max, dec_min, dec_max).
+    """
+    if not -90 <= dec <= 90:
+        raise ex.BadQuery(f"DEC must be in [-90, 90]. Got {dec}")
+    if not 0 < radius <= 180:
+        raise ex.BadQuery(f"RADIUS must be in (0, 180]. Got {radius}")
+    ra = ra % 360
+    dec_min = max(-90.0, dec - radius - PAD)
+    dec_max = min(90.0, dec + radius + PAD)
+    edges = np.linspace(dec_min, dec_max, int(max(1, bands)) + 1).tolist()
+
+    # Adjacent bands with the same ranges of RA are merged.
+    merged = []  # [[ra_ranges, d1, d2], ...]
+    for d1, d2 in zip(edges[:-1], edges[1:]):
+        ranges = _ra_ranges(ra, _max_half_width(dec, radius, d1, d2))
+        if merged and merged[-1][0] == ranges:
+            merged[-1][2] = d2
+        else:
+            merged.append([ranges, d1, d2])
+    return [(r1, r2, d1, d2) for ranges, d1, d2 in merged for r1, r2 in ranges]
+
+
+def angular_distance(ra1, dec1, ra2, dec2):
+    """Angular distance (degrees) between positions (degrees).
+    Any argument may be an array (e.g. of many positions)."""
+    ra1, dec1, ra2, dec2 = map(np.radians, (ra1, dec1, ra2, dec2))
+    hav = (
+        np.sin((dec2 - dec1) / 2) ** 2
+        + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2) ** 2
+    )
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(hav, 0, 1))))
@@ -0,0 +1,201 @@
+"""Cross-match of a catalog of positions against SPARCL records
+(used by client.crossmatch).
+
+Targets are grouped into sky tiles, and runs of adjacent tiles (in RA)
+into groups.  The SPARCL records in the box around the targets of each
+group (grown by the match radius) are found with one find request per
+group, and the targets are matched to these candidates with a KD-tree
+of unit vectors.  Requires the optional
+package scipy.
+
+Example:
+    >>> tiles = tile_targets([10.3, 10.5, 200.0], [5.0, 5.1, -30.0], 1.0)
+    >>> [t.tolist() for t in tiles.values()]
+    [[2], [0, 1]]
+    >>> [g.tolist() for g in group_tiles(tiles)]
+    [[2], [0, 1]]
+"""
+
+# Python Standard Library
+#   none
+
+# External Packages
+import numpy as np
+
+# Local Packages
+import sparcl.cone as cone
+
+
+# Maximum number of adjacent tiles in one group (one find request).
+TILES_PER_FIND = 16
+
+
+def radec_to_xyz(ra, dec):
+    """Unit vectors (array of shape (N, 3)) of positions (degrees)."""
+    ra = np.radians(np.asarray(ra, dtype=float))
+    dec = np.radians(np.asarray(dec, dtype=float))
+    cos_dec = np.cos(dec)
+    return np.column_stack(
+        [cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)]
+    )
+
+
+def tile_targets(ra, dec, tile):
+    """Group positions into tiles about TILE degrees on a side.
+    Tiles are bands of declination split into equal ranges of RA (fewer
+    near the poles).
+
+    RETURN: dict[(band, rabin)] = array of indices of positions
+    """
+    ra = np.asarray(ra, dtype=float) % 360
+    dec = np.asarray(dec, dtype=float)
+    nbands = max(1, int(np.ceil(180 / tile)))
+    band = np.minimum(((dec + 90) / 180 * nbands).astype(int), nbands - 1)
+    # Number of RA bins in each band (based on its widest circle)
+    lo = np.radians(-90 + np.arange(nbands) * 180 / nbands)
+    hi = np.radians(-90 + np.arange(1, nbands + 1) * 180 / nbands)
+    widest = np.where(
+        (lo < 0) & (hi > 0), 1.0, np.maximum(np.cos(lo), np.cos(hi))
+    )
+    nra = np.maximum(1, np.floor(360 * widest / tile)).astype(int)
+    rabin = np.minimum((ra / 360 * nra[band]).astype(int), nra[band] - 1)
+
+    key = band.astype(np.int64) * (int(nra.max()) + 1) + rabin
+    order = np.argsort(key, kind="stable")
+    _, starts = np.unique(key[order], return_index=True)
+    groups = np.split(order, starts[1:])
+    return {
+        (int(band[g[0]]), int(rabin[g[0]])): g for g in groups if len(g) > 0
+    }
+
+
+def group_tiles(tiles, run=TILES_PER_FIND):
+    """Group runs of (at most RUN) adjacent TILES of a band.
+    RETURN: list of arrays of indices of positions (one per group)"""
+    groups = []
+    prev = None
+    for key in sorted(tiles):
+        band, rabin = key
+        adjacent = prev is not None and prev == (band, rabin - 1)
+        if adjacent and len(groups[-1]) < run:
+            groups[-1].append(tiles[key])
+        else:
+            groups.append([tiles[key]])
+        prev = key
+    return [np.concatenate(group) for group in groups]
+
+
+def tile_boxes(ra, dec, radius):
+    """Boxes (see cone.cone_boxes) that cover every position within
+    RADIUS degrees of any of the positions RA, DEC (of one group of
+    tiles)."""
+    ra = np.asarray(ra, dtype=float) % 360
+    dec = np.asarray(dec, dtype=float)
+    dec_min = max(-90.0, float(dec.min()) - radius - cone.PAD)
+    dec_max = min(90.0, float(dec.max()) + radius + cone.PAD)
+    ra_lo, ra_hi = float(ra.min()), float(ra.max())
+    far = max(abs(dec_min), abs(dec_max))
+    if far >= 90 or ra_hi - ra_lo > 180:
+        ranges = [(0.0, 360.0)]
+    else:
+        grow = np.degrees(
+            np.arcsin(
+                min(1.0, np.sin(np.radians(radius)) / np.cos(np.radians(far)))
+            )
+        )
+        half = (ra_hi - ra_lo) / 2 + grow
+        ranges = cone._ra_ranges((ra_lo + ra_hi) / 2, half)
+    return [(r1, r2, dec_min, dec_max) for r1, r2 in ranges]
+
+
+def match(target_ra, target_dec, ra, dec, radius, nearest=True):
+    """Match targets to candidates within RADIUS degrees.
+
+    Args:
+        target_ra, target_dec (array): Positions (degrees) of targets.
+
+        ra, dec (array): Positions (degrees) of candidates.
+
+        radius (float): Match radius (degrees).
+
+        nearest (:obj:`bool`, optional): Only match each target to its
+            nearest candidate. Defaults to True.
+
+    Returns:
+        (target, candidate, separation): Arrays of index of target,
+        index of candidate, and separation (degrees) of each match;
+        ordered by target.
+    """
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        msg = "crossmatch requires scipy. Install with: pip install scipy"
+        raise Exception(msg) from None
+
+    empty = (
+        np.zeros(0, dtype=np.intp),
+        np.zeros(0, dtype=np.intp),
+        np.zeros(0),
+    )
+    if len(ra) == 0 or len(target_ra) == 0:
+        return empty
+    targets = radec_to_xyz(target_ra, target_dec)
+    tree = cKDTree(radec_to_xyz(ra, dec))
+    chord = 2 * np.sin(np.radians(radius) / 2)
+    if nearest:
+        dist, cand = tree.query(targets, k=1, distance_upper_bound=chord)
+        target = np.flatnonzero(np.isfinite(dist))
+        cand = cand[target]
+        dist = dist[target]
+    else:
+        hits = tree.query_ball_point(targets, r=chord, return_sorted=True)
+        lengths = np.fromiter((len(h) for h in hits), dtype=np.intp)
+        target = np.repeat(np.arange(len(hits)), lengths)
+        if len(target) == 0:
+            return empty
+        cand = np.concatenate([h for h in hits if len(h) > 0]).astype(np.intp)
+        dist = np.linalg.norm(targets[target] - tree.data[cand], axis=1)
+    separation = np.degrees(2 * np.arcsin(np.clip(dist / 2, 0, 1)))
+    return target.astype(np.intp), cand.astype(np.intp), separation
+
+
+class CrossMatch:
+    """Matches of a catalog of targets to SPARCL records.
+
+    Attributes:
+        ids (array): sparcl_id of every candidate record found.
+        ra, dec (array): Position of every candidate record found.
+        target (array): Index (into the catalog) of target of each match.
+        match (array): Index (into ids) of record of each match.
+        separation (array): Separation (degrees) of each match.
+        timings (dict): Timings of the call (see Results.timings).
+
+    Example:
+        >>> xm = client.crossmatch(cat_ra, cat_dec, 1/3600)  # doctest: +SKIP
+        >>> got = client.retrieve(xm.matched_ids)  # doctest: +SKIP
+    """
+
+    def __init__(self, ids, ra, dec, target, match, separation):
+        self.ids = ids
+        self.ra = ra
+        self.dec = dec
+        self.target = target
+        self.match = match
+        self.separation = separation
+        self.timings = dict()
+
+    def __repr__(self):
+        return (
+            f"CrossMatch: {len(self.target)} matches"
+            f" of {len(np.unique(self.target))} targets"
+        )
+
+    def __len__(self):
+        return len(self.target)
+
+    @property
+    def matched_ids(self):
+        """sparcl_ids of matched records (once each, in order of
+        first match)."""
+        _, first = np.unique(self.match, return_index=True)
+        return self.ids[self.match[np.sort(first)]].tolist()
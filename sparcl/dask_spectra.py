@@ -0,0 +1,332 @@
+"""Lazy Dask collections of SPARCL records and spectra.  Requires the
+optional package dask (pip install "dask[array,bag]"; add "dataframe"
+for records_dataframe).
+
+Each partition of a collection is one retrieve() of (at most) PARTITION
+sparcl_ids, run as a task when the collection is computed, so spectra
+are fetched in parallel by the Dask scheduler (threads, processes, or a
+dask.distributed cluster) and only the partitions being worked on are in
+memory.  Tasks in other processes make their own client from the urls,
+timeouts and access token of the client given (kept for the next tasks;
+at most MAX_CLIENTS per process).
+
+Example:
+    >>> found = client.find(constraints={"data_release": ["BOSS-DR16"]},
+    ...                     limit=5000)  # doctest: +SKIP
+    >>> arrays, grid = spectra_array(found, partition=500)  # doctest: +SKIP
+    >>> arrays["flux"].mean(axis=0).compute()  # doctest: +SKIP
+"""
+
+# Python Standard Library
+from collections import OrderedDict
+import importlib
+import operator
+import threading
+import weakref
+
+# External Packages
+import numpy as np
+
+# Local Packages
+import sparcl.gather_2d as g2d
+
+MAX_CLIENTS = 4  # clients made by tasks that are kept (per process)
+
+# Clients given to (or made by) tasks: _clients[_key(spec)] = client.
+# Does not keep them alive; clients made by tasks are kept by _made
+# (least recently used first).
+_clients = weakref.WeakValueDictionary()
+_made = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def _import(module):
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        msg = (
+            f"Dask collections require {module}."
+            f' Install with: pip install "dask[array,bag,dataframe]"'
+        )
+        raise Exception(msg) from None
+
+
+def partitions(ids, partition=1000):
+    """Split IDS into lists of (at most) PARTITION sparcl_ids (and no
+    more than client.MAX_NUM_RECORDS_RETRIEVED)."""
+    from sparcl.client import MAX_NUM_RECORDS_RETRIEVED
+
+    size = max(1, min(int(partition), MAX_NUM_RECORDS_RETRIEVED))
+    ids = list(ids)
+    return [ids[i : i + size] for i in range(0, len(ids), size)]
+
+
+# RETURN: (client, ids) of a Found or list of sparcl_ids
+def _source(source, client):
+    ids = getattr(source, "ids", source)
+    client = client or getattr(source, "client", None)
+    if client is None:
+        msg = "A client is needed when SOURCE is a list of sparcl_ids."
+        raise Exception(msg)
+    return client, list(ids)
+
+
+# Picklable description of CLIENT for tasks. The client itself is
+# remembered so that tasks in this process use it.
+def _client_spec(client):
+    spec = dict(
+        url=list(client.hosts.urls),
+        connect_timeout=client.c_timeout,
+        read_timeout=client.r_timeout,
+        token=client.token,
+        renew_token=getattr(client, "renew_token", None),
+        token_exp=client.token_exp,
+    )
+    with _clients_lock:
+        _clients.setdefault(_key(spec), client)
+    return spec
+
+
+def _key(spec):
+    return (
+        tuple(spec["url"]),
+        spec["token"],
+        spec["connect_timeout"],
+        spec["read_timeout"],
+    )
+
+
+def _client(spec):
+    from sparcl.client import SparclClient
+
+    key = _key(spec)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = SparclClient(
+                url=spec["url"],
+                connect_timeout=spec["connect_timeout"],
+                read_timeout=spec["read_timeout"],
+            )
+            client.token = spec["token"]
+            client.renew_token = spec["renew_token"]
+            client.token_exp = spec["token_exp"]
+            _clients[key] = client
+            _made[key] = client
+            while len(_made) > MAX_CLIENTS:
+                _made.popitem(last=False)
+        elif key in _made:
+            _made.move_to_end(key)
+    return client
+
+
+# Task: records of IDS that were found
+def _records(spec, ids, include, dataset_list):
+    got = _client(spec).retrieve(
+        ids, include=include, dataset_list=dataset_list, limit=len(ids)
+    )
+    return list(got.records)
+
+
+# Task: records of IDS (None where a sparcl_id was not found), in the
+# order of IDS.
+def _ordered(spec, ids, include, dataset_list):
+    include = sorted(set(include) | {"sparcl_id"})
+    byid = {
+        rec["sparcl_id"]: rec
+        for rec in _records(spec, ids, include, dataset_list)
+    }
+    return [byid.get(sid) for sid in ids]
+
+
+# Task: grid keys of the wavelengths of records of IDS
+def _grid_keys(spec, ids, precision, dataset_list):
+    recs = _records(spec, ids, ["wavelength"], dataset_list)
+    wls = g2d._concat_field(recs, "wavelength")
+    return np.unique(g2d._wavelength_keys(wls, precision))
+
+
+# Task: dict[field] = 2D array of FIELDS of records of IDS aligned to
+# GKEYS. Rows of records that were not found are all NaN.
+def _aligned(spec, ids, fields, gkeys, precision, dataset_list, dtype):
+    include = set(fields) | {"wavelength"}
+    recs = _ordered(spec, ids, include, dataset_list)
+    rows = [ri for ri, rec in enumerate(recs) if rec is not None]
+    found = {
+        fld: np.empty((len(rows), len(gkeys)), dtype=dtype) for fld in fields
+    }
+    g2d._align_page(
+        [recs[ri] for ri in rows], fields, gkeys, precision, found, 0
+    )
+    out = dict()
+    for fld in fields:
+        out[fld] = np.full((len(ids), len(gkeys)), np.nan, dtype=dtype)
+        out[fld][rows] = found[fld]
+    return out
+
+
+def records_bag(
+    source,
+    *,
+    client=None,
+    include="DEFAULT",
+    dataset_list=None,
+    partition=1000,
+):
+    """Lazy Dask bag of the retrieved records of SOURCE.
+
+    Args:
+        source: A :class:`~sparcl.Results.Found` or list of sparcl_ids.
+
+        client (:class:`~sparcl.client.SparclClient`, optional): Client
+            to retrieve with. Defaults to None (the client of SOURCE).
+
+        include (:obj:`list`, optional): Fields of each record (as for
+            retrieve). Defaults to 'DEFAULT'.
+
+        dataset_list (:obj:`list`, optional): Data Sets to retrieve
+            from. Defaults to None (all).
+
+        partition (:obj:`int`, optional): Number of sparcl_ids retrieved
+            by each partition (task). Defaults to 1000.
+
+    Returns:
+        :class:`dask.bag.Bag` of records (one partition per retrieve).
+    """
+    db = _import("dask.bag")
+    delayed = _import("dask").delayed
+    client, ids = _source(source, client)
+    spec = _client_spec(client)
+    parts = [
+        delayed(_records, pure=True)(spec, part, include, dataset_list)
+        for part in partitions(ids, partition)
+    ]
+    return db.from_delayed(parts)
+
+
+def records_dataframe(
+    source,
+    *,
+    client=None,
+    include="DEFAULT",
+    dataset_list=None,
+    partition=1000,
+    meta=None,
+):
+    """Lazy Dask DataFrame (one row per record) of the retrieved records
+    of SOURCE.  Best for metadata fields; spectra become object columns.
+    Arguments are as for records_bag().
+
+    Args:
+        meta (optional): Columns and dtypes of the DataFrame (see
+            dask.bag.Bag.to_dataframe). Defaults to None, meaning the
+            first partition is retrieved now to find them.
+
+    Returns:
+        :class:`dask.dataframe.DataFrame`
+    """
+    _import("dask.dataframe")
+    bag = records_bag(
+        source,
+        client=client,
+        include=include,
+        dataset_list=dataset_list,
+        partition=partition,
+    )
+    return bag.map(dict).to_dataframe(meta=meta)
+
+
+def spectra_array(
+    source,
+    fields=["flux"],
+    *,
+    client=None,
+    grid=None,
+    precision=7,
+    dataset_list=None,
+    partition=1000,
+    dtype=np.float64,
+):
+    """Lazy Dask arrays of spectra FIELDS of the records of SOURCE,
+    aligned to a common wavelength grid (as gather_2d.align_pages).
+
+    Args:
+        source: A :class:`~sparcl.Results.Found` or list of sparcl_ids.
+
+        fields (:obj:`list`, optional): Spectra fields to align.
+            Defaults to ["flux"].
+
+        client (:class:`~sparcl.client.SparclClient`, optional): Client
+            to retrieve with. Defaults to None (the client of SOURCE).
+
+        grid (:obj:`numpy.ndarray`, optional): Wavelength grid to align
+            to. Defaults to None, meaning the wavelengths of every record
+            are retrieved now (in parallel, with the default scheduler)
+            to compute the grid.
+
+        precision (:obj:`int`, optional): Number of decimal places of
+            wavelengths of the grid. Defaults to 7.
+
+        dataset_list (:obj:`list`, optional): Data Sets to retrieve
+            from. Defaults to None (all).
+
+        partition (:obj:`int`, optional): Number of sparcl_ids (rows)
+            retrieved by each partition (chunk). Defaults to 1000.
+
+        dtype (optional): dtype of the arrays. Defaults to np.float64.
+
+    Returns:
+        tuple containing:
+        - ar_dict(dict): Dask arrays of shape (len(ids), len(grid))
+              keyed by Field Name. Row i is the record of sparcl_id i
+              (all NaN if it was not found). Arrays of the same chunk
+              share one retrieve when computed together.
+        - grid(ndarray): 1D numpy array containing wavelength values.
+    """
+    dask = _import("dask")
+    da = _import("dask.array")
+    client, ids = _source(source, client)
+    spec = _client_spec(client)
+    parts = partitions(ids, partition)
+    fields = list(fields)
+
+    if grid is None:
+        keys = [
+            dask.delayed(_grid_keys, pure=True)(
+                spec, part, precision, dataset_list
+            )
+            for part in parts
+        ]
+        (keys,) = dask.compute(keys)
+        gkeys = np.unique(np.concatenate(keys)) if keys else np.zeros(0)
+        gkeys = gkeys.astype(np.int64)
+    else:
+        gkeys = g2d._wavelength_keys(grid, precision)
+        if np.any(np.diff(gkeys) <= 0):
+            msg = (
+                f'The "grid" must be strictly increasing at the given'
+                f' "precision" ({precision}).'
+            )
+            raise Exception(msg)
+
+    blocks = [
+        dask.delayed(_aligned, pure=True)(
+            spec, part, fields, gkeys, precision, dataset_list, dtype
+        )
+        for part in parts
+    ]
+    adict = dict()
+    for fld in fields:
+        chunks = [
+            da.from_delayed(
+                dask.delayed(operator.getitem)(blk, fld),
+                shape=(len(part), len(gkeys)),
+                dtype=dtype,
+            )
+            for blk, part in zip(blocks, parts)
+        ]
+        if chunks:
+            adict[fld] = da.concatenate(chunks, axis=0)
+        else:
+            adict[fld] = da.zeros((0, len(gkeys)), dtype=dtype)
+    return adict, g2d._grid_wavelengths(gkeys, precision)
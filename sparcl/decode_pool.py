@@ -0,0 +1,272 @@
+"""Decode retrieved records in a pool of processes (used by
+client.retrieve(workers=N)).
+
+A response body is written to a file in shared memory (/dev/shm when
+available).  Either a pickled list of header and records (the 'pkl'
+format of the Server; PickleDecoder decodes one file per request) or a
+framed record stream (see sparcl.framing; decode() splits it into runs
+of frames).  Each worker process unpickles directly from the mapped file
+and renames the fields of its records (Internal to Science field names).
+It returns the records pickled with protocol 5: the data of arrays (e.g.
+flux) is not pickled with the record but written (out-of-band) to a
+second shared file, in the space of the input it came from.  The parent
+maps that file and unpickles the records with their arrays as views of
+the mapping, so spectra are never copied between processes.
+"""
+
+# Python Standard Library
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import os
+import pickle
+import tempfile
+
+# External Packages
+#   none
+
+# Local Packages
+import sparcl.exceptions as ex
+from sparcl.framing import _length
+from sparcl.Results import science_record
+
+
+# Directory for shared files: memory backed if possible.
+SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# Fields of the client (set in each worker process by _init)
+_fields = None
+
+
+def shared_file():
+    """New (empty) temporary file in shared memory. Caller removes it."""
+    return tempfile.NamedTemporaryFile(
+        prefix="sparcl-", dir=SHM_DIR, delete=False
+    )
+
+
+def frame_spans(buf):
+    """(start, end) of the payload of every frame in BUF (pkl-stream)."""
+    spans = []
+    pos = 0
+    size = len(buf)
+    while pos < size:
+        if size - pos < _length.size:
+            break
+        (length,) = _length.unpack_from(buf, pos)
+        start = pos + _length.size
+        if start + length > size:
+            break
+        spans.append((start, start + length))
+        pos = start + length
+    if pos != size:
+        msg = (
+            f"Record stream ended in the middle of a frame"
+            f" ({size - pos} bytes left over after {len(spans)} frames)."
+        )
+        raise ex.UnknownSparcl(msg)
+    return spans
+
+
+def _init(fields):
+    global _fields
+    _fields = fields
+
+
+def _map(path, access):
+    with open(path, "r+b" if access == mmap.ACCESS_WRITE else "rb") as fp:
+        return mmap.mmap(fp.fileno(), 0, access=access)
+
+
+# Pickle REC with the data of its arrays copied to OUTBUF, from CURSOR
+# up to END (the rest are pickled in-band).
+# RETURN: (pickle, [(offset, nbytes), ...]), new cursor
+def _dumps(rec, outbuf, cursor, end):
+    buffers = []
+
+    def out_of_band(pbuf):
+        nonlocal cursor
+        raw = pbuf.raw()
+        if cursor + raw.nbytes > end:
+            return True  # Does not fit: pickle in-band
+        outbuf[cursor : cursor + raw.nbytes] = raw
+        buffers.append((cursor, raw.nbytes))
+        cursor += raw.nbytes
+        return False
+
+    data = pickle.dumps(rec, protocol=5, buffer_callback=out_of_band)
+    return (data, buffers), cursor
+
+
+# Worker: decode frames of SPANS of IN_PATH.
+# RETURN: list of (pickle, [(offset, nbytes), ...]); one per frame.
+# Frame 0 (the header) is not renamed.
+def _decode(in_path, out_path, spans):
+    inbuf = _map(in_path, mmap.ACCESS_READ)
+    outbuf = _map(out_path, mmap.ACCESS_WRITE)
+    view = memoryview(inbuf)
+    res = []
+    try:
+        for start, end in spans:
+            rec = pickle.loads(view[start:end])
+            if start > _length.size:  # Not the header
+                rec = science_record(rec, _fields)
+            # Arrays go in the space of their frame
+            frame, _ = _dumps(rec, outbuf, start, end)
+            res.append(frame)
+    finally:
+        view.release()
+        inbuf.close()
+        outbuf.close()
+    return res
+
+
+# Worker: decode the pickled list of header and records in IN_PATH.
+# RETURN: list of (pickle, [(offset, nbytes), ...]); header first.
+def _decode_pickle(in_path, out_path):
+    inbuf = _map(in_path, mmap.ACCESS_READ)
+    outbuf = _map(out_path, mmap.ACCESS_WRITE)
+    view = memoryview(inbuf)
+    try:
+        results = pickle.loads(view)
+    finally:
+        view.release()
+        inbuf.close()
+    res = []
+    cursor = 0
+    try:
+        for idx, rec in enumerate(results):
+            if idx > 0:  # Not the header
+                rec = science_record(rec, _fields)
+            frame, cursor = _dumps(rec, outbuf, cursor, len(outbuf))
+            res.append(frame)
+    finally:
+        outbuf.close()
+    return res
+
+
+# Unpickle DECODED (from a worker) with their arrays in OUT_PATH.
+def _load(out_path, decoded):
+    # Private (copy-on-write) mapping: arrays are writable, and the
+    # mapping outlives the (removed) file.
+    outbuf = memoryview(_map(out_path, mmap.ACCESS_COPY))
+    return [
+        pickle.loads(
+            data, buffers=[outbuf[off : off + num] for off, num in bufs]
+        )
+        for data, bufs in decoded
+    ]
+
+
+def _remove(*paths):
+    for name in paths:
+        if name is not None:
+            try:
+                os.remove(name)
+            except OSError:
+                pass  # e.g. Windows does not remove a mapped file
+
+
+def decode(path, fields, workers, chunks=None):
+    """Decode the pkl-stream in file PATH with WORKERS processes.
+
+    Args:
+        path (:obj:`str`): File (in shared memory) holding the stream.
+            It is removed.
+
+        fields (:class:`~sparcl.fields.Fields`): Fields of client.
+
+        workers (:obj:`int`): Number of processes.
+
+        chunks (:obj:`int`, optional): Number of runs of frames to
+            split the stream into. Defaults to 4 per worker.
+
+    Returns:
+        List of header and records (with Science field names).
+        Arrays of records are (copy-on-write) views of shared memory.
+    """
+    out_path = None
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return []
+        inbuf = _map(path, mmap.ACCESS_READ)
+        try:
+            spans = frame_spans(inbuf)
+        finally:
+            inbuf.close()
+        with shared_file() as out:
+            out_path = out.name
+            out.truncate(size)  # Sparse; pages are used when written
+        chunks = chunks or 4 * workers
+        step = max(1, -(-len(spans) // chunks))  # ceiling
+        runs = [spans[i : i + step] for i in range(0, len(spans), step)]
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(runs)),
+            initializer=_init,
+            initargs=(fields,),
+        ) as pool:
+            futures = [
+                pool.submit(_decode, path, out_path, run) for run in runs
+            ]
+            decoded = [frame for fut in futures for frame in fut.result()]
+        return _load(out_path, decoded)
+    finally:
+        _remove(path, out_path)
+
+
+class PickleDecoder:
+    """Decode pickled responses ('pkl' format: a list of header and
+    records) with a pool of processes.  Submit each response (in a file
+    in shared memory) as soon as it has been received; it is decoded
+    while the next one is received.
+
+    Args:
+        fields (:class:`~sparcl.fields.Fields`): Fields of client.
+
+        workers (:obj:`int`): Number of processes.
+
+    Example:
+        >>> with PickleDecoder(client.fields, 4) as decoder:
+        ...     decoder.submit(path)  # doctest: +SKIP
+        ...     parts = decoder.results()  # doctest: +SKIP
+    """
+
+    def __init__(self, fields, workers):
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init, initargs=(fields,)
+        )
+        self._jobs = []  # (in_path, out_path, future)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, path):
+        """Decode file PATH (in shared memory). It is removed on close."""
+        out_path = fut = None
+        size = os.path.getsize(path)
+        if size > 0:
+            with shared_file() as out:
+                out_path = out.name
+                out.truncate(size)  # Sparse; pages are used when written
+            fut = self._pool.submit(_decode_pickle, path, out_path)
+        self._jobs.append((path, out_path, fut))
+
+    def results(self):
+        """List of decoded responses, in the order submitted.  Each is a
+        list of header and records (with Science field names), or empty
+        for an empty response.  Arrays of records are (copy-on-write)
+        views of shared memory."""
+        return [
+            [] if fut is None else _load(out_path, fut.result())
+            for _, out_path, fut in self._jobs
+        ]
+
+    def close(self):
+        """Stop the pool and remove the files."""
+        self._pool.shutdown()
+        for path, out_path, _ in self._jobs:
+            _remove(path, out_path)
+        self._jobs = []
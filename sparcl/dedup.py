@@ -0,0 +1,137 @@
+"""Resolve duplicate records (the same object in several Data Sets, or
+observed more than once).
+
+Records are duplicates when they have the same value of every field of
+BY (e.g. targetid) or, given a RADIUS, lie within RADIUS of each other.
+One record of each group of duplicates is kept: the first that has a
+true value of the fields of PREFER (e.g. specprimary), else the first.
+Groups are found with NumPy sorts (argsort, unique) instead of loops
+over records, so Found records can be resolved before their spectra are
+retrieved.
+
+Example:
+    >>> recs = [
+    ...     dict(targetid=7, specprimary=False),
+    ...     dict(targetid=8, specprimary=True),
+    ...     dict(targetid=7, specprimary=True),
+    ... ]
+    >>> keep_mask(recs).tolist()
+    [False, True, True]
+"""
+
+# Python Standard Library
+#   none
+
+# External Packages
+import numpy as np
+
+# Local Packages
+import sparcl.exceptions as ex
+
+
+# RETURN: values of FIELD of every record (as an object array)
+def _column(records, field):
+    missing = [i for i, rec in enumerate(records) if field not in rec]
+    if len(missing) > 0:
+        msg = (
+            f'Dedup needs field "{field}" in every record'
+            f" ({len(missing)} records do not have it)."
+            f" Include it in the outfields of find()."
+        )
+        raise ex.UnknownField(msg)
+    return np.array([rec[field] for rec in records], dtype=object)
+
+
+# RETURN: integer label of each value; equal values have equal labels
+# and every None has a label of its own.
+def _labels(values):
+    labels = np.arange(len(values)) + len(values)  # for None
+    known = np.array([v is not None for v in values], dtype=bool)
+    if known.any():
+        _, inverse = np.unique(values[known], return_inverse=True)
+        labels[known] = inverse.ravel()
+    return labels
+
+
+# RETURN: group label of every record; linked by distance < RADIUS
+# (degrees) as well as by LABELS.
+def _join_near(labels, ra, dec, radius):
+    try:
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+        from scipy.spatial import cKDTree
+    except ImportError:
+        msg = "dedup by radius requires scipy. Install with: pip install scipy"
+        raise Exception(msg) from None
+    from sparcl.crossmatch import radec_to_xyz
+
+    num = len(labels)
+    pos = np.isfinite(ra) & np.isfinite(dec)
+    idx = np.flatnonzero(pos)
+    tree = cKDTree(radec_to_xyz(ra[idx], dec[idx]))
+    chord = 2 * np.sin(np.radians(radius) / 2)
+    pairs = tree.query_pairs(chord, output_type="ndarray")
+    near = idx[pairs].reshape(-1, 2)
+    # Link consecutive members of each group of LABELS
+    order = np.argsort(labels, kind="stable")
+    same = labels[order][1:] == labels[order][:-1]
+    linked = np.column_stack([order[:-1][same], order[1:][same]])
+    edges = np.concatenate([near, linked])
+    graph = coo_matrix(
+        (np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(num, num)
+    )
+    _, groups = connected_components(graph, directed=False)
+    return groups
+
+
+def group_labels(records, by=("targetid",), radius=None):
+    """Group label (int) of every record; duplicates share a label.
+
+    Args:
+        records (:obj:`list`): Records (dictionaries).
+
+        by (:obj:`list`, optional): Fields whose values (all of them)
+            identify an object. Defaults to ("targetid",).
+
+        radius (float, optional): Records (with ra and dec) within
+            RADIUS degrees of each other are also duplicates (requires
+            scipy). Defaults to None.
+
+    Returns:
+        Array of group labels.
+    """
+    num = len(records)
+    if len(by) == 0:
+        labels = np.arange(num)
+    else:
+        columns = np.stack([_labels(_column(records, f)) for f in by])
+        _, labels = np.unique(columns, axis=1, return_inverse=True)
+        labels = labels.ravel()
+    if radius is not None and num > 1:
+        ra = _column(records, "ra").astype(float)
+        dec = _column(records, "dec").astype(float)
+        labels = _join_near(labels, ra, dec, radius)
+    return labels
+
+
+def keep_mask(records, by=("targetid",), radius=None, prefer=("specprimary",)):
+    """Mask (bool array) of records to keep: one of each group of
+    duplicates (see group_labels).  The record kept is the first with a
+    true value of every field of PREFER (tried in order), else the
+    first of its group.
+    """
+    num = len(records)
+    keep = np.zeros(num, dtype=bool)
+    if num == 0:
+        return keep
+    labels = group_labels(records, by=by, radius=radius)
+    # Sort by group, then preference, then position (last key first).
+    keys = [np.arange(num)]
+    for field in reversed(list(prefer)):
+        values = _column(records, field)
+        keys.append(~np.array([bool(v) for v in values], dtype=bool))
+    keys.append(labels)
+    order = np.lexsort(keys)
+    _, first = np.unique(labels[order], return_index=True)
+    keep[order[first]] = True
+    return keep
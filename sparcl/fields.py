@@ -7,24 +7,31 @@ from collections import defaultdict
 # External Packages
 import requests
 
+# Local Packages
+import sparcl.exceptions as ex
 
-def validate_fields(datafields):
+
+# Maximum number of memoized results kept by Fields.
+MEMO_SIZE = 1024
+
+
+# RETURN: o2n[DR][InternalName] => ScienceName  (one pass over DATAFIELDS)
+def _o2n(datafields):
+    o2n = defaultdict(dict)
+    for df in datafields:
+        o2n[df["data_release"]][df["origdp"]] = df["newdp"]
+    return dict(o2n)
+
+
+def validate_fields(datafields, o2n=None):
     # datafields is simply:
     #   DataField.objects.all().values(*atts)
 
-    drs = set([df["data_release"] for df in datafields])
     core = {
         df["origdp"]: df["newdp"] for df in datafields if df["storage"] == "C"
     }
 
-    o2n = {
-        dr: {
-            df["origdp"]: df["newdp"]
-            for df in datafields
-            if df["data_release"] == dr
-        }
-        for dr in drs
-    }
+    o2n = _o2n(datafields) if o2n is None else o2n
 
     for dr, df in o2n.items():
         #  1-1 mapping origdp <-> newdp across all DR
@@ -51,55 +58,58 @@ def validate_fields(datafields):
 
 
 class Fields:  # Derived from a single query
-    """Lookup of Field Names"""
+    """Lookup of Field Names.
+
+    All lookups are built in one pass over the DataField table.  Each
+    Data Set is given a bit; each field has a bitmask of the Data Sets
+    that contain it (and of those that tag it as default or all).  Results
+    for a list of Data Sets are memoized (keyed by its bitmask), so
+    validation of a request does not scan the table again.
+    """
 
-    def __init__(self, apiurl):
+    def __init__(self, apiurl, datafields=None):
         # [rec, ...]
         # where rec is dict containing keys:
         # 'data_release', 'origdp', 'newdp', 'storage', 'default', 'all'
-        datafields = requests.get(f"{apiurl}/datafields/").json()
-
-        validate_fields(datafields)
-
-        dr_list = set(df["data_release"] for df in datafields)
-
+        if datafields is None:
+            datafields = requests.get(f"{apiurl}/datafields/").json()
         self.datafields = datafields
+
         # o2n[DR][InternalName] => ScienceName
-        self.o2n = {
-            dr: {
-                df["origdp"]: df["newdp"]
-                for df in datafields
-                if df["data_release"] == dr
-            }
-            for dr in dr_list
-        }
         # n2o[DR][ScienceName] => InternalName
-        self.n2o = {
-            dr: {
-                df["newdp"]: df["origdp"]
-                for df in datafields
-                if df["data_release"] == dr
+        # attrs[DR][ScienceName] => dict[storage,default,all]
+        self.o2n = defaultdict(dict)
+        self.n2o = defaultdict(dict)
+        self.attrs = defaultdict(dict)
+        # Bitmask (of DataSets) for each field name
+        self._dr_bit = dict()  # _dr_bit[DR] => int (single bit)
+        self._science_mask = defaultdict(int)  # [ScienceName] => mask
+        self._internal_mask = defaultdict(int)  # [InternalName] => mask
+        self._attr_mask = dict(default=defaultdict(int), all=defaultdict(int))
+        for df in datafields:
+            dr, orig, new = df["data_release"], df["origdp"], df["newdp"]
+            bit = self._dr_bit.setdefault(dr, 1 << len(self._dr_bit))
+            self.o2n[dr][orig] = new
+            self.n2o[dr][new] = orig
+            self.attrs[dr][new] = {
+                "storage": df["storage"],
+                "default": df["default"],
+                "all": df["all"],
             }
-            for dr in dr_list
-        }
-        self.all_drs = dr_list
-        self.all_fields = set([df["newdp"] for df in datafields])
-        self.datafields = datafields
+            self._science_mask[new] |= bit
+            self._internal_mask[orig] |= bit
+            for attr, masks in self._attr_mask.items():
+                if df[attr]:
+                    masks[new] |= bit
+        self.o2n = dict(self.o2n)
+        self.n2o = dict(self.n2o)
+        self.attrs = dict(self.attrs)
 
-        # Per DataRelease: get Storage, Default, All for each (user) fieldname
-        # dr_attrs[DR][newdp] => dict[storage,default,all]
-        self.attrs = {
-            dr: {
-                df["newdp"]: {
-                    "storage": df["storage"],
-                    "default": df["default"],
-                    "all": df["all"],
-                }
-                for df in datafields
-                if df["data_release"] == dr
-            }
-            for dr in dr_list
-        }
+        validate_fields(datafields, o2n=self.o2n)
+
+        self.all_drs = set(self._dr_bit)
+        self.all_fields = set(self._science_mask)
+        self._memo = dict()  # _memo[(name, mask, ...)] => result
 
     @property
     def all_datasets(self):
@@ -112,42 +122,89 @@ class Fields:  # Derived from a single query
         #!return self.n2o[dataset][science_name]
         return self.n2o[dataset].get(science_name)
 
-    def filter_fields(self, attr, dataset_list):
-        fields = set()
+    # RETURN: bitmask of DATASET_LIST (or All datasets if None)
+    def _mask(self, dataset_list):
+        if dataset_list is None:
+            dataset_list = self.all_drs
+        mask = 0
         for dr in dataset_list:
-            for k, v in self.attrs[dr].items():
-                if v.get(attr):
-                    fields.add(k)
-        return fields
+            if dr not in self._dr_bit:
+                msg = (
+                    f"Unknown Data Set: {dr}. "
+                    f"Known Data Sets are: {sorted(self.all_drs)}"
+                )
+                raise ex.UnkDr(msg)
+            mask |= self._dr_bit[dr]
+        return mask
+
+    def _remember(self, key, value):
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[key] = value
+        return value
+
+    # RETURN: frozenset of names in FIELD_MASKS that are in ALL (if EVERY)
+    # or ANY of DATASET_LIST.
+    def _select(self, name, field_masks, dataset_list, every):
+        mask = self._mask(dataset_list)
+        key = (name, mask)
+        if key in self._memo:
+            return self._memo[key]
+        if every:
+            sel = [f for f, m in field_masks.items() if m & mask == mask]
+        else:
+            sel = [f for f, m in field_masks.items() if m & mask]
+        return self._remember(key, frozenset(sel))
+
+    def filter_fields(self, attr, dataset_list):
+        """Fields with ATTR (default, all) in any of DATASET_LIST"""
+        if attr in self._attr_mask:
+            masks = self._attr_mask[attr]
+        else:
+            masks = defaultdict(int)
+            for dr, bit in self._dr_bit.items():
+                for f, v in self.attrs[dr].items():
+                    if v.get(attr):
+                        masks[f] |= bit
+        return self._select(attr, masks, dataset_list, every=False)
 
     def default_retrieve_fields(self, dataset_list=None):
-        if dataset_list is None:
-            dataset_list = self.all_drs
         return self.filter_fields("default", dataset_list)
 
     def all_retrieve_fields(self, dataset_list=None):
-        if dataset_list is None:
-            dataset_list = self.all_drs
         return self.filter_fields("all", dataset_list)
 
+    def available(self, dataset_list=None):
+        """Fields (Science names) common to DATASET_LIST (or All datasets
+        if None) as a frozenset."""
+        return self._select(
+            "common", self._science_mask, dataset_list, every=True
+        )
+
     def common(self, dataset_list=None):
         """Fields common to DATASET_LIST (or All datasets if None)"""
-        if dataset_list is None:
-            dataset_list = self.all_drs
-        return sorted(
-            set.intersection(
-                *[set(self.n2o[dr].keys()) for dr in dataset_list]
-            )
-        )
+        return sorted(self.available(dataset_list))
 
     def common_internal(self, dataset_list=None):
         """Fields common to DATASET_LIST (or All datasets if None)"""
-        if dataset_list is None:
-            dataset_list = self.all_drs
-        return set.intersection(
-            *[set(self.o2n[dr].keys()) for dr in dataset_list]
+        return self._select(
+            "common_internal", self._internal_mask, dataset_list, every=True
         )
 
+    def internal_names(self, science_fields, dataset_list=None):
+        """Internal names of SCIENCE_FIELDS (in any of DATASET_LIST)
+        that are common to all of DATASET_LIST."""
+        mask = self._mask(dataset_list)
+        key = ("internal_names", mask, frozenset(science_fields))
+        if key in self._memo:
+            return self._memo[key]
+        names = set()
+        for dr, bit in self._dr_bit.items():
+            if bit & mask:
+                names.update(self.n2o[dr].get(sn) for sn in key[2])
+        common = self.common_internal(dataset_list)
+        return self._remember(key, common.intersection(names))
+
     # There is probably an algorithm to partition ELEMENTS into
     # the _minumum_ number of SETS such that the union of all SETS
     # contains all ELEMENTS. For now, parition by Data Set (when used).
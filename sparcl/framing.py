@@ -0,0 +1,117 @@
+"""Framed record streams.
+
+A pickled list of records cannot be used until its last byte has been
+received.  A framed stream sends every record (the first is the header)
+as its own frame, so each record can be decoded as soon as its frame is
+complete.  Two formats are supported:
+
+- "pkl-stream": Each frame is an 8 byte (big-endian, unsigned) length
+  followed by that many bytes of one pickled record.
+- "ndjson": Each frame is one line of JSON (metadata only; arrays are
+  sent as lists).
+
+Example:
+    >>> payload = b"".join(encode_frames([{"a": 1}, {"b": 2}]))
+    >>> decoder = FrameDecoder()
+    >>> decoder.feed(payload[:5]) + decoder.feed(payload[5:])
+    [{'a': 1}, {'b': 2}]
+"""
+
+# Python Standard Library
+import json
+import pickle
+import struct
+
+# External Packages
+#   none
+
+# Local Packages
+import sparcl.exceptions as ex
+
+
+PKL_STREAM = "pkl-stream"
+NDJSON = "ndjson"
+FORMATS = [PKL_STREAM, NDJSON]
+
+_length = struct.Struct(">Q")
+
+
+def encode_frames(objs, format=PKL_STREAM):
+    """Generate one frame (bytes) per object of OBJS."""
+    for obj in objs:
+        if format == NDJSON:
+            # Arrays (e.g. numpy) are sent as lists.
+            line = json.dumps(obj, default=lambda o: o.tolist())
+            yield line.encode() + b"\n"
+        else:
+            data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+            yield _length.pack(len(data)) + data
+
+
+class FrameDecoder:
+    """Incrementally decode frames of a "pkl-stream".
+    Feed bytes as they are received; get back the objects of every frame
+    completed so far."""
+
+    format = PKL_STREAM
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0  # Number of frames decoded
+
+    def feed(self, data):
+        """Add DATA (bytes) to stream. RETURN: list of decoded objects."""
+        self.buffer += data
+        objs = []
+        pos = 0
+        size = len(self.buffer)
+        while size - pos >= _length.size:
+            (length,) = _length.unpack_from(self.buffer, pos)
+            end = pos + _length.size + length
+            if end > size:
+                break
+            objs.append(pickle.loads(self.buffer[pos + _length.size : end]))
+            pos = end
+        del self.buffer[:pos]
+        self.frames += len(objs)
+        return objs
+
+    def close(self):
+        """Check that the stream ended on a frame boundary."""
+        if len(self.buffer) > 0:
+            msg = (
+                f"Record stream ended in the middle of a frame"
+                f" ({len(self.buffer)} bytes left over after"
+                f" {self.frames} frames)."
+            )
+            raise ex.UnknownSparcl(msg)
+
+
+class NdjsonDecoder(FrameDecoder):
+    """Incrementally decode frames (lines) of an "ndjson" stream."""
+
+    format = NDJSON
+
+    def feed(self, data):
+        self.buffer += data
+        end = self.buffer.rfind(b"\n") + 1
+        if end == 0:
+            return []
+        objs = [
+            json.loads(line)
+            for line in bytes(self.buffer[:end]).splitlines()
+            if line.strip()
+        ]
+        del self.buffer[:end]
+        self.frames += len(objs)
+        return objs
+
+
+def decoder(format):
+    """Return decoder for FORMAT (one of FORMATS)."""
+    if format == PKL_STREAM:
+        return FrameDecoder()
+    elif format == NDJSON:
+        return NdjsonDecoder()
+    msg = f'Unknown stream format "{format}". Use one of: {FORMATS}'
+    raise ex.BadQuery(msg)
@@ -7,136 +7,210 @@
 #   Also: https://docs.python.org/3/library/decimal.html#floating-point-notes
 #
 from decimal import Decimal
+import os
+import tempfile
 
 #
 import numpy as np
 
 #
-import sparcl.client
-
-
-# Map every wavelength of every record to index (ri,wi)
-# where
-#   ri: Record Index
-#   wi: Window Index (offset of wavelength in WINDOW)
-#   window: ordered list of wavelengths that include ALL unique
-#           wavelengths in all records
-#! def rec_woffset(records, window):
-#!     ar = np.ones([len(records), len(window)])
-#!     for ri, r in enumerate(records):
-#!         for wl in r.wavelength:
-#!             try:
-#!                 wi = window.index(wl)
-#!             except:
-#!                 continue
-#!             ar[ri,wi] = wl
-#!     return ar
-
-
-def _wavelength_offsets(records):
-    # sorted list of wavelengths from ALL records
-    window = sorted(
-        set(records[0].wavelength).union(*[r.wavelength for r in records[1:]])
+from sparcl.spectra_store import SpectraStore
+from sparcl.resample_spectra import _grid_key
+
+
+# Wavelengths are quantized to PRECISION decimal places by representing
+# each as an integer KEY: round(wavelength * 10**precision).  Rounding
+# is "half to even" applied to the exact binary value of the float
+# (same as Decimal(wl).quantize()).  Grids are sorted unique KEYS.
+def _wavelength_keys(wavelengths, precision):
+    wls = np.asarray(wavelengths, dtype=np.float64)
+    scaled = wls * 10.0**precision
+    if len(scaled) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if np.abs(scaled).max() >= 2**52:
+        # Too many digits to do exactly with floats.
+        places = Decimal(10) ** -precision
+        return np.array(
+            [int(Decimal(w).quantize(places).scaleb(precision)) for w in wls],
+            dtype=np.int64,
+        )
+    keys = np.rint(scaled)
+    # Product above may be inexact. Fix values that are near a tie.
+    near = np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(scaled)
+    if near.any():
+        places = Decimal(10) ** -precision
+        keys[near] = [
+            int(Decimal(w).quantize(places).scaleb(precision))
+            for w in wls[near]
+        ]
+    return keys.astype(np.int64)
+
+
+def _grid_wavelengths(grid, precision):
+    """Float wavelengths of grid KEYS."""
+    return grid / 10.0**precision
+
+
+# Layout of a field that has a vector value in every record when all of
+# the vectors are concatenated into one 1D array.
+#   lengths[ri]: Length of vector in record RI
+#   starts[ri]: Index into concatenated array of first value of RI
+def _layout(records, field="wavelength"):
+    lengths = np.fromiter(
+        (len(r[field]) for r in records), dtype=np.int64, count=len(records)
     )
-    # offsets[ri] = index into WINDOW
-    offsets = {
-        ri: window.index(rec.wavelength[0]) for ri, rec in enumerate(records)
-    }
-    return (window, offsets)
-
-
-def _validate_wavelength_alignment(records, window, offsets, precision=None):
-    PLACES = Decimal(10) ** -precision if precision is not None else None
-    #! print(f'DBG: PLACES={PLACES}')
-    # Given an exact wavelength match between first wl (wavelength) in a rec
-    # and the wl at its offset of WINDOW, ensure all the remaning wls
-    # in rec match the next N wls of WINDOW.
-    for ri, rec in enumerate(records):
-        for wi, rwl in enumerate(rec.wavelength):  # wi=recwavelengthIndex
-            if precision is None:
-                recwl = Decimal(rwl)
-            else:
-                recwl = Decimal(rwl).quantize(PLACES)
-            wwl = window[offsets[ri] + wi]
-            #! msg = (f'Wavelength in '
-            #!        f'Record[{ri}][{wi}] ({recwl}) does not match '
-            #!        f'Window[{offsets[ri]+wi} = offset[{ri}]={offsets[ri]} '
-            #!        f'+ {wi}]  ({wwl})'
-            #!        )
-            #! assert recwl == wwl, msg
-            if recwl != wwl:
-                msg = (
-                    f"The spectra cannot be aligned with the given"
-                    f' "precision" parameter ({precision}).'
-                    f" Try lowering the precision value."
-                )
-                raise Exception(msg)
+    starts = np.zeros(len(records), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    return lengths, starts
 
 
-# We want to align a bunch of records by wavelength into a single
-# 2d numpy array (record vs wavelength).  In general, we
-# are not guaranteed that this is possible -- even if using only
-# records from a single DataSet. So validate it first.
-# (If not valid, allowing wavelength slop might help.)
-def _align_wavelengths(records):
-    window, offsets = _wavelength_offsets(records)
-    _validate_wavelength_alignment(records, window, offsets)
-    ar = np.ones([len(records), len(window)])
-    for ri, r in enumerate(records):
-        for wi, wl in enumerate(r.wavelength):
-            ar[ri, offsets[ri + wi]] = wl  # @@@WRONG!!! We want FLUX
-    return ar
-
-
-def _tt1(numrecs=20, dr="BOSS-DR16"):
-    client = sparcl.client.SparclClient()
-    found = client.find(constraints=dict(data_release=[dr]), limit=numrecs)
-    got = client.retrieve(found.ids)
-    records = got.records
-    window, offsets = _wavelength_offsets(records)
-    print(f"Built window len={len(window)}; offsets={offsets}")
-    # return records, window, offsets
-    ar = _align_wavelengths(records)
-    return ar
+def _concat_field(records, field):
+    if len(records) == 0:
+        return np.zeros(0)
+    return np.concatenate([np.asarray(r[field]) for r in records])
+
+
+# offsets[ri] = index into GRID of first wavelength of record RI
+def _record_offsets(grid, keys, lengths, starts):
+    offsets = np.zeros(len(lengths), dtype=np.int64)
+    nonempty = lengths > 0
+    offsets[nonempty] = np.searchsorted(grid, keys[starts[nonempty]])
+    return offsets
 
 
 # precision:: number of decimal places
 # "records" must contain "wavelength" field.
+# RETURN: grid(sorted unique KEYS), offsets(ri)=index into GRID, keys
+#   where KEYS are all wavelength keys of all records concatenated.
 def _wavelength_grid_offsets(records, precision=11):
-    PLACES = Decimal(10) ** -precision
-
-    # set of wavelengths from ALL records. Quantized to precision
-    gset = set()  # Grid SET
-    for r in records:
-        gset.update([Decimal(w).quantize(PLACES) for w in r.wavelength])
-    grid = sorted(gset)  # 1D sorted list of wavelengths (bigger than any rec)
-    #! print(f'DBG grid({len(grid)})[:10]={grid[:10]}')
-    # offsets[ri] = index into GRID
-    offsets = {
-        ri: grid.index(Decimal(rec.wavelength[0]).quantize(PLACES))
-        for ri, rec in enumerate(records)
-    }
-    return (grid, offsets)
-
-
-# return 2D numpy array of FLUX values that is aligned to wavelength GRID.
-# GRID is generally wider than flux for single record. Pad with NaN.
-def _flux_grid(records, grid, offsets, precision=None):
-    _validate_wavelength_alignment(records, grid, offsets, precision=precision)
-    ar = np.full([len(records), len(grid)], np.nan)
-    for ri, r in enumerate(records):
-        for fi, flux in enumerate(r.flux):
-            ar[ri, offsets[ri] + fi] = flux
-    return ar
+    keys = _wavelength_keys(_concat_field(records, "wavelength"), precision)
+    lengths, starts = _layout(records)
+    grid = np.unique(keys)  # sorted (bigger than any rec)
+    offsets = _record_offsets(grid, keys, lengths, starts)
+    return (grid, offsets, keys)
+
+
+# Index into the 2D grid array of every value of every record.
+# Values are "scattered" into the grid array using this index.
+def _grid_index(lengths, offsets):
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.zeros(len(lengths), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    cols = offsets[rows] + (np.arange(len(rows)) - starts[rows])
+    return rows, cols
+
+
+# Given an exact wavelength match between first wl (wavelength) in a rec
+# and the wl at its offset of GRID, ensure all the remaning wls
+# in rec match the next N wls of GRID.
+def _validate_wavelength_alignment(keys, grid, cols, precision=None):
+    if (len(cols) > 0 and cols.max() >= len(grid)) or np.any(
+        grid[np.minimum(cols, len(grid) - 1)] != keys
+    ):
+        msg = (
+            f"The spectra cannot be aligned with the given"
+            f' "precision" parameter ({precision}).'
+            f" Try lowering the precision value."
+        )
+        raise Exception(msg)
 
 
 # RETURN 2D nparray(records,wavelengthGrid) = fieldValue
-def _field_grid(records, fieldName, grid, offsets, precision=None):
-    ar = np.full([len(records), len(grid)], np.nan)
-    for ri, r in enumerate(records):
-        for fi, fieldValue in enumerate(r[fieldName]):
-            ar[ri, offsets[ri] + fi] = fieldValue
-    return ar  # (wavelengthGrid, records)
+# Pad with NaN where a record has no value for a grid wavelength.
+# If OUT is given, fill rows ROW0... of it instead of a new array.
+def _field_grid(records, fieldName, ngrid, index, out=None, row0=0):
+    rows, cols = index
+    values = _concat_field(records, fieldName)
+    if len(values) != len(rows):
+        msg = (
+            f'Spectra field "{fieldName}" does not have the same number'
+            f" of values as wavelength in every record."
+        )
+        raise Exception(msg)
+    if out is None:
+        ar = np.full([len(records), ngrid], np.nan)
+    else:
+        ar = out[row0 : row0 + len(records)]
+        ar[:] = np.nan
+    ar[rows, cols] = values
+    return ar  # (records, wavelengthGrid)
+
+
+class NotRegularSampling(Exception):
+    """Wavelengths are not on a regular (linear or log-linear) grid."""
+
+
+LINEAR = "linear"  # fixed step in wavelength (e.g. DESI arms)
+LOGLINEAR = "log-linear"  # fixed step in log10(wavelength) (e.g. SDSS, BOSS)
+
+
+# Return (KIND, STEP) if WAVELENGTH is sampled with a fixed step in
+# wavelength (LINEAR) or log10(wavelength) (LOGLINEAR). Every
+# wavelength must be within TOLERANCE pixels of the regular grid.
+# Return None if sampling is not regular.
+def _sampling(wavelength, tolerance):
+    wls = np.asarray(wavelength, dtype=np.float64)
+    if len(wls) < 2 or np.any(wls <= 0):
+        return None
+    idx = np.arange(len(wls))
+    for kind, vals in ((LINEAR, wls), (LOGLINEAR, np.log10(wls))):
+        step = (vals[-1] - vals[0]) / (len(vals) - 1)
+        if step <= 0:
+            continue
+        if np.abs(vals - (vals[0] + step * idx)).max() <= tolerance * step:
+            return kind, step
+    return None
+
+
+# Grid aware alignment. Sampling (kind and step) is detected from the
+# first record of each Data Set (_dr). All Data Sets must share one
+# sampling. The offset of each record into the grid is computed from
+# its first wavelength: round((first - gridStart) / step).
+# RETURN: grid wavelengths, (rows, cols) index (see _grid_index)
+def _regular_grid_index(records, tolerance=0.01):
+    wls = _concat_field(records, "wavelength").astype(np.float64)
+    lengths, starts = _layout(records)
+    if np.any(lengths == 0):
+        raise NotRegularSampling("Some records have no wavelengths.")
+
+    first = dict()  # first[dr] = index of first record of DR
+    for ri, rec in enumerate(records):
+        first.setdefault(rec.get("_dr"), ri)
+    samplings = dict()
+    for dr, ri in first.items():
+        samp = _sampling(records[ri]["wavelength"], tolerance)
+        if samp is None:
+            msg = (
+                f"Wavelengths of Data Set {dr} are not sampled on a linear"
+                f" or log-linear grid (tolerance={tolerance} pixels)."
+            )
+            raise NotRegularSampling(msg)
+        samplings[dr] = samp
+    kind, step = samplings[records[0].get("_dr")]
+    maxlen = lengths.max()
+    for dr, (dkind, dstep) in samplings.items():
+        if dkind != kind or abs(dstep - step) * maxlen > tolerance * step:
+            msg = (
+                f"Data Sets do not share a sampling. "
+                f"Got (kind, step): {samplings}"
+            )
+            raise NotRegularSampling(msg)
+
+    vals = np.log10(wls) if kind == LOGLINEAR else wls
+    firstvals = vals[starts]
+    origin = firstvals.min()
+    pos = (firstvals - origin) / step
+    offsets = np.rint(pos).astype(np.int64)
+    rows, cols = _grid_index(lengths, offsets)
+    if np.abs(vals - (origin + step * cols)).max() > tolerance * step:
+        msg = (
+            f"Wavelengths are not within {tolerance} pixels of a common"
+            f" {kind} grid with step={step}."
+        )
+        raise NotRegularSampling(msg)
+    gvals = origin + step * np.arange((offsets + lengths).max())
+    grid = 10**gvals if kind == LOGLINEAR else gvals
+    return grid, (rows, cols)
 
 
 # RETURN 2D nparray(fields,wavelengthGrid) = fieldValue
@@ -166,7 +240,14 @@ def _validate_spectra_fields(records, fields):
 
 # TOP level: Intended for access from Jupyter NOTEBOOK.
 # Align spectra related field from records into one array using quantization.
-def align_records(records, fields=["flux", "wavelength"], precision=7):
+def align_records(
+    records,
+    fields=["flux", "wavelength"],
+    precision=7,
+    *,
+    mode="unique",
+    tolerance=0.01,
+):
     """Align given spectra-type fields to a common wavelength grid.
 
     Args:
@@ -181,6 +262,19 @@ def align_records(records, fields=["flux", "wavelength"], precision=7):
             quantizing wavelengths into a grid.
             DEFAULT=7
 
+        mode (:obj:`str`, optional): How to find the common grid.
+            'unique': grid of all unique (quantized) wavelengths.
+            'regular': spectra are sampled with a fixed step in
+            log10(wavelength) (e.g. SDSS, BOSS) or wavelength (e.g. DESI
+            arms). Offsets into the grid are computed from the first
+            wavelength of each record; PRECISION is not used.
+            'auto': 'regular' if possible, else 'unique'.
+            DEFAULT='unique'
+
+        tolerance (:obj:`float`, optional): For 'regular' mode, the maximum
+            allowed difference (in pixels) between a wavelength and the
+            regular grid. DEFAULT=0.01
+
     Returns:
         tuple containing:
         - ar_dict(dict): Dictionary of 2D numpy arrays keyed by Field Name.
@@ -212,17 +306,365 @@ def align_records(records, fields=["flux", "wavelength"], precision=7):
         )
         raise Exception(msg)
 
+    if mode not in ("unique", "regular", "auto"):
+        msg = f'MODE must be "unique", "regular" or "auto". Got: {mode}'
+        raise Exception(msg)
+
     #! _validate_spectra_fields(records, fields)
-    grid, offsets = _wavelength_grid_offsets(records, precision=precision)
-    _validate_wavelength_alignment(records, grid, offsets, precision=precision)
+    if mode in ("regular", "auto"):
+        try:
+            wavelengths, index = _regular_grid_index(records, tolerance)
+        except NotRegularSampling:
+            if mode == "regular":
+                raise
+            mode = "unique"
+    if mode == "unique":
+        grid, offsets, keys = _wavelength_grid_offsets(
+            records, precision=precision
+        )
+        lengths, _ = _layout(records)
+        index = _grid_index(lengths, offsets)
+        _validate_wavelength_alignment(
+            keys, grid, index[1], precision=precision
+        )
+        wavelengths = _grid_wavelengths(grid, precision)
 
-    # One slice for each field; each slice a 2darray(wavelength, record)=fldVal
+    # One slice for each field; each slice a 2darray(record, wavelength)=fldVal
     adict = dict()
     for fld in fields:
-        ar = _field_grid(records, fld, grid, offsets, precision=None)
-        adict[fld] = ar
+        adict[fld] = _field_grid(records, fld, len(wavelengths), index)
+
+    return adict, wavelengths
+
+
+# Group PAGES into lists of records.  Each element of PAGES may be
+# a Retrieved, a list of records, or a single record (dict).  Single
+# records are collected into lists of (at most) PAGE_SIZE records.
+def _iter_pages(pages, page_size=1000):
+    buf = []
+    for item in pages:
+        if isinstance(item, dict):
+            buf.append(item)
+            if len(buf) >= page_size:
+                yield buf
+                buf = []
+        else:
+            if len(buf) > 0:
+                yield buf
+                buf = []
+            yield getattr(item, "records", item)
+    if len(buf) > 0:
+        yield buf
+
+
+# Align one page of records into rows ROW0... of arrays in OUT (dict).
+def _align_page(records, fields, grid, precision, out, row0):
+    keys = _wavelength_keys(_concat_field(records, "wavelength"), precision)
+    lengths, starts = _layout(records)
+    offsets = _record_offsets(grid, keys, lengths, starts)
+    index = _grid_index(lengths, offsets)
+    _validate_wavelength_alignment(keys, grid, index[1], precision=precision)
+    for fld in fields:
+        _field_grid(records, fld, len(grid), index, out=out[fld], row0=row0)
+
+
+# Records from rows of a SpectraStore (in blocks of PAGE_SIZE)
+def _store_pages(store, fields, page_size=1000):
+    lengths = {fld: store.field_lengths(fld) for fld in fields}
+    for r0 in range(0, len(store), page_size):
+        r1 = min(r0 + page_size, len(store))
+        blocks = {fld: store[fld][r0:r1] for fld in fields}
+        yield [
+            {fld: blocks[fld][ri, : lengths[fld][r0 + ri]] for fld in fields}
+            for ri in range(r1 - r0)
+        ]
+
+
+def _output_arrays(out, fields, shape, dtype):
+    if out is None:
+        return {fld: np.empty(shape, dtype=dtype) for fld in fields}
+    if isinstance(out, (str, os.PathLike)):
+        os.makedirs(out, exist_ok=True)
+        return {
+            fld: np.lib.format.open_memmap(
+                os.path.join(out, f"{fld}.npy"),
+                mode="w+",
+                dtype=dtype,
+                shape=shape,
+            )
+            for fld in fields
+        }
+    for fld in fields:
+        ar = out.get(fld)
+        if ar is None or ar.shape[0] < shape[0] or ar.shape[1] != shape[1]:
+            msg = (
+                f'The "out" array for field "{fld}" must have shape'
+                f" (>={shape[0]}, {shape[1]}). "
+                f"Got {None if ar is None else ar.shape}"
+            )
+            raise Exception(msg)
+    return out
+
+
+def align_pages(  # noqa: C901
+    pages,
+    fields=["flux", "wavelength"],
+    precision=7,
+    *,
+    grid=None,
+    out=None,
+    dtype=np.float64,
+    numrecs=None,
+    page_size=1000,
+    spill_dir=None,
+):
+    """Align spectra-type fields to a common wavelength grid one page of
+    records at a time. Unlike align_records(), all the records do not
+    need to be in memory at once and the result may be written to
+    preallocated or memory-mapped arrays.
+
+    Args:
+        pages (iterable): Pages of records such as the Retrieved
+            objects from client.retrieve_pages(), lists of records, or
+            individual records.  The keys of records are Science Field
+            Names.
+
+        fields (:obj:`list`, optional): List of Science Field Names of
+            spectra related fields to align and include in the results.
+            DEFAULT=['flux', 'wavelength']
+
+        precision (:obj:`int`, optional): Number of decimal points to use for
+            quantizing wavelengths into a grid.
+            DEFAULT=7
+
+        grid (:obj:`numpy.ndarray`, optional): Wavelength grid to align
+            to (e.g. from a previous call).  DEFAULT=None; the grid is
+            computed from the records.  If PAGES is a list it is read twice
+            (once to compute the grid), otherwise pages are spilled to
+            a temporary memory-mapped store while the grid is computed.
+
+        out (optional): Where to put the aligned arrays. One of:
+            None (DEFAULT) to allocate new arrays;
+            a dictionary of preallocated 2D arrays keyed by Field Name;
+            a directory name in which to create one memory-mapped
+            "<field>.npy" file per field (reopen with np.load(mmap_mode='r')).
+
+        dtype (optional): dtype of allocated arrays. DEFAULT=np.float64.
+            Use np.float32 to halve memory.
+
+        numrecs (:obj:`int`, optional): Number of records in PAGES.
+            Required when GRID is given, PAGES is not a list,
+            and OUT is a directory.
+
+        page_size (:obj:`int`, optional): Number of individual records
+            grouped into one page. DEFAULT=1000
+
+        spill_dir (:obj:`str`, optional): Directory in which to create the
+            temporary store used to spill pages. DEFAULT=None (system
+            temporary directory).
+
+    Returns:
+        tuple containing:
+        - ar_dict(dict): Dictionary of 2D numpy arrays keyed by Field Name.
+              Each array is shape: (numRecs, numGridWavelengths)
+        - grid(ndarray): 1D numpy array containing wavelength values.
+
+    Example:
+        >>> client = sparcl.client.SparclClient()
+        >>> specflds = ['wavelength', 'flux']
+        >>> found = client.find(constraints={"data_release": ['BOSS-DR16']},
+        ...                     limit=50)
+        >>> pages = client.retrieve_pages(found.ids, page=20, include=specflds)
+        >>> ar_dict, grid = align_pages(pages, out='/tmp/aligned',
+        ...                             dtype=np.float32)
+        >>> ar_dict['flux'].shape[0]
+        50
+    """
+    if "wavelength" not in fields:
+        msg = (
+            f'You must provide "wavelength" in the list provided'
+            f' in the "fields" paramter.  Got: {fields}'
+        )
+        raise Exception(msg)
+
+    with tempfile.TemporaryDirectory(dir=spill_dir) as tmpdir:
+        if grid is not None:
+            gkeys = _wavelength_keys(grid, precision)
+            if np.any(np.diff(gkeys) <= 0):
+                msg = (
+                    f'The "grid" must be strictly increasing at the given'
+                    f' "precision" ({precision}).'
+                )
+                raise Exception(msg)
+            source = pages
+        elif isinstance(pages, (list, tuple)):
+            gkeys = np.zeros(0, dtype=np.int64)
+            for recs in _iter_pages(pages, page_size):
+                wls = _concat_field(recs, "wavelength")
+                gkeys = np.union1d(gkeys, _wavelength_keys(wls, precision))
+            source = pages
+        else:
+            # Spill pages to disk while computing grid.
+            gkeys = np.zeros(0, dtype=np.int64)
+            store = SpectraStore.create(
+                os.path.join(tmpdir, "spill"),
+                fields=sorted(set(fields)),
+                capacity=page_size,
+            )
+            with store:
+                for recs in _iter_pages(pages, page_size):
+                    wls = _concat_field(recs, "wavelength")
+                    gkeys = np.union1d(gkeys, _wavelength_keys(wls, precision))
+                    store.append(recs)
+            store = SpectraStore(store.path)
+            numrecs = len(store)
+            source = _store_pages(store, fields, page_size)
+
+        if numrecs is None and isinstance(source, (list, tuple)):
+            numrecs = sum(len(p) for p in _iter_pages(source, page_size))
+
+        if numrecs is None:
+            # Unknown number of records; collect aligned pages.
+            if isinstance(out, (str, os.PathLike)):
+                msg = '"numrecs" must be given when "out" is a directory.'
+                raise Exception(msg)
+            blocks = []
+            for recs in _iter_pages(source, page_size):
+                page_out = _output_arrays(
+                    None, fields, (len(recs), len(gkeys)), dtype
+                )
+                _align_page(recs, fields, gkeys, precision, page_out, 0)
+                blocks.append(page_out)
+            adict = {
+                fld: np.concatenate([b[fld] for b in blocks]) for fld in fields
+            }
+            return adict, _grid_wavelengths(gkeys, precision)
+
+        adict = _output_arrays(out, fields, (numrecs, len(gkeys)), dtype)
+        row0 = 0
+        for recs in _iter_pages(source, page_size):
+            _align_page(recs, fields, gkeys, precision, adict, row0)
+            row0 += len(recs)
+        for ar in adict.values():
+            if isinstance(ar, np.memmap):
+                ar.flush()
+        adict = {fld: adict[fld][:row0] for fld in fields}
+    return adict, _grid_wavelengths(gkeys, precision)
 
-    return adict, np.array([float(x) for x in grid])
+
+###############################################################################
+# Merge spectrograph arms (e.g. DESI b, r, z) into one spectrum.
+
+ARMS = ["b_", "r_", "z_"]  # Prefix of Science Field Names of each arm
+
+
+# Wavelengths of the merged arms, and the column of every pixel of
+# each arm in the merged arrays. Arms must share wavelengths where
+# they overlap (to PRECISION).
+def _arm_index(wavelengths, precision):
+    keys = [_wavelength_keys(wl, precision) for wl in wavelengths]
+    grid, first = np.unique(np.concatenate(keys), return_index=True)
+    cols = [np.searchsorted(grid, k) for k in keys]
+    return np.concatenate(wavelengths)[first], cols
+
+
+# 2D array of FIELD of records IDX.
+def _stack(records, idx, field, dtype=np.float64):
+    return np.array([records[ri][field] for ri in idx], dtype=dtype)
+
+
+def merge_arms(records, arms=ARMS, precision=4):
+    """Merge the spectra of multiple spectrograph arms (e.g. DESI b, r, z)
+    of each record into a single spectrum. Where arms overlap, flux is the
+    ivar weighted mean of the arms, ivar is the sum of the arms, and mask
+    is the bitwise AND of the arms.
+
+    Records that have the same wavelengths in every arm are merged
+    together with 2D array operations. The mapping from each arm to the
+    merged wavelengths is computed once for each such group.
+
+    Args:
+        records (list): List of dictionaries (e.g. Retrieved.records).
+            Each must contain "<arm>wavelength", "<arm>flux" and
+            "<arm>ivar" (and optionally "<arm>mask") for every arm.
+
+        arms (:obj:`list`, optional): Prefix of the Science Field Names
+            of each arm. DEFAULT=['b_', 'r_', 'z_']
+
+        precision (:obj:`int`, optional): Number of decimal places used
+            to decide if wavelengths of two arms are the same.
+            DEFAULT=4
+
+    Returns:
+        List of records (in the same order as RECORDS) with the arm
+        fields replaced by "wavelength", "flux", "ivar" (and "mask").
+        The spectra of records that were merged together are rows of
+        shared 2D arrays.
+
+    Example:
+        >>> client = sparcl.client.SparclClient()
+        >>> found = client.find(constraints={"data_release": ['DESI-EDR']},
+        ...                     limit=20)
+        >>> inc = [f'{a}{f}' for a in ARMS
+        ...        for f in ['wavelength', 'flux', 'ivar']]
+        >>> got = client.retrieve(found.ids, include=inc)  # doctest: +SKIP
+        >>> merged = merge_arms(got.records)  # doctest: +SKIP
+    """
+    records = getattr(records, "records", records)
+    armflds = [f"{a}{f}" for a in arms for f in ["wavelength", "flux"]]
+    for fld in armflds:
+        if any(fld not in rec for rec in records):
+            msg = f'Every record must contain the "{fld}" field.'
+            raise Exception(msg)
+
+    # groups[(gridKey, ...)] = [recordIndex, ...]
+    groups = dict()
+    for ri, rec in enumerate(records):
+        key = tuple(_grid_key(rec[f"{a}wavelength"]) for a in arms)
+        groups.setdefault(key, []).append(ri)
+
+    merged = [None] * len(records)
+    for idx in groups.values():
+        rec0 = records[idx[0]]
+        wavelengths = [
+            np.asarray(rec0[f"{a}wavelength"], dtype=np.float64) for a in arms
+        ]
+        grid, cols = _arm_index(wavelengths, precision)
+        shape = (len(idx), len(grid))
+        wsum = np.zeros(shape)  # Sum of ivar
+        fsum = np.zeros(shape)  # Sum of ivar * flux
+        usum = np.zeros(shape)  # Sum of flux
+        count = np.zeros(len(grid))  # Number of arms covering each pixel
+        has_mask = all(f"{a}mask" in rec0 for a in arms)
+        mask = np.full(shape, -1, dtype=np.int64) if has_mask else None
+        for arm, col in zip(arms, cols):
+            flux = _stack(records, idx, f"{arm}flux")
+            if f"{arm}ivar" in rec0:
+                ivar = _stack(records, idx, f"{arm}ivar")
+            else:
+                ivar = np.zeros_like(flux)
+            wsum[:, col] += ivar
+            fsum[:, col] += ivar * flux
+            usum[:, col] += flux
+            count[col] += 1
+            if has_mask:
+                mask[:, col] &= _stack(records, idx, f"{arm}mask", np.int64)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            flux = np.where(wsum > 0, fsum / wsum, usum / count)
+
+        for row, ri in enumerate(idx):
+            rec = records[ri]
+            newrec = type(rec)(
+                (k, v) for k, v in rec.items() if not k.startswith(tuple(arms))
+            )
+            newrec["wavelength"] = grid
+            newrec["flux"] = flux[row]
+            newrec["ivar"] = wsum[row]
+            if has_mask:
+                newrec["mask"] = mask[row]
+            merged[ri] = newrec
+    return merged
 
 
 # with np.printoptions(threshold=np.inf, linewidth=210,
@@ -0,0 +1,128 @@
+"""Equivalent SPARCL Servers (mirrors) that a client can send requests
+to (used by SparclClient when given a list of urls).
+
+Hosts are health checked with the version endpoint, which also measures
+their latency.  Requests go to the healthy host with the lowest latency.
+A host that fails (connection error, timeout, or a gateway/unavailable
+status) is marked down for COOLDOWN seconds, and idempotent requests are
+sent again to the next host.  When every host is down they are tried
+anyway, soonest back up first.
+
+Example:
+    >>> pool = HostPool(["http://a.example", "http://b.example"])
+    >>> pool.mark_up("http://b.example", 0.02)
+    >>> pool.mark_up("http://a.example", 0.09)
+    >>> pool.order()
+    ['http://b.example', 'http://a.example']
+    >>> pool.mark_down("http://b.example")
+    >>> pool.order()
+    ['http://a.example', 'http://b.example']
+"""
+
+# Python Standard Library
+import threading
+import time
+
+# External Packages
+#   none
+
+# Local Packages
+#   none
+
+
+COOLDOWN = 60  # seconds a failed host is not used (unless all are down)
+SMOOTHING = 0.3  # weight of newest latency in (exponential) moving average
+
+# Responses with these statuses mean the host (not the request) failed.
+FAILOVER_STATUS = (502, 503, 504)
+
+# Endpoints that only read, so POST requests to them may be sent again.
+# (GET requests always may.)
+IDEMPOTENT_POSTS = ("find", "spectras", "missing", "missing_specids")
+
+
+def is_idempotent(method, url):
+    """True if request METHOD of URL may be sent again (to any host)."""
+    if method.lower() in ("get", "head", "options"):
+        return True
+    path = url.split("?", 1)[0].rstrip("/")
+    return path.rsplit("/", 1)[-1] in IDEMPOTENT_POSTS
+
+
+class HostPool:
+    """Base urls of equivalent Servers, with their health and latency.
+
+    Args:
+        urls (:obj:`list`): Base URLs (e.g. 'https://host:port').
+
+        cooldown (float, optional): Seconds a failed host is not used.
+            Defaults to COOLDOWN.
+    """
+
+    def __init__(self, urls, cooldown=COOLDOWN):
+        self.urls = [url.rstrip("/") for url in urls]
+        if len(self.urls) == 0:
+            raise Exception("At least one url of a SPARCL Server is needed.")
+        self.cooldown = cooldown
+        self.latency = {url: None for url in self.urls}  # seconds
+        self.down_until = {url: 0.0 for url in self.urls}  # monotonic
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"HostPool({self.order()})"
+
+    def __len__(self):
+        return len(self.urls)
+
+    def is_up(self, url):
+        return self.down_until[url] <= time.monotonic()
+
+    def order(self):
+        """URLs in the order to try them: healthy hosts by latency
+        (unmeasured last, in given order), then hosts that are down."""
+        now = time.monotonic()
+        with self._lock:
+            up = [u for u in self.urls if self.down_until[u] <= now]
+            down = [u for u in self.urls if self.down_until[u] > now]
+            up.sort(
+                key=lambda u: (self.latency[u] is None, self.latency[u] or 0)
+            )
+            down.sort(key=lambda u: self.down_until[u])
+        return up + down
+
+    @property
+    def best(self):
+        """URL of the host requests are sent to first."""
+        return self.order()[0]
+
+    def root(self, url):
+        """The base url (of the pool) that URL starts with, or None."""
+        for root in self.urls:
+            if url == root or url.startswith(root + "/"):
+                return root
+        return None
+
+    def mark_up(self, url, latency=None):
+        """Host URL is healthy.  LATENCY (seconds) of a health check
+        updates its moving average."""
+        with self._lock:
+            self.down_until[url] = 0.0
+            if latency is not None:
+                prev = self.latency[url]
+                self.latency[url] = (
+                    latency
+                    if prev is None
+                    else SMOOTHING * latency + (1 - SMOOTHING) * prev
+                )
+
+    def mark_down(self, url):
+        """Host URL failed: do not use it for COOLDOWN seconds."""
+        with self._lock:
+            self.down_until[url] = time.monotonic() + self.cooldown
+
+    def status(self):
+        """List of dict(url, up, latency) of every host, in order."""
+        return [
+            dict(url=url, up=self.is_up(url), latency=self.latency[url])
+            for url in self.order()
+        ]
@@ -0,0 +1,279 @@
+"""Client-wide metrics of calls to the SPARCL Server.
+
+Counters and histograms (in the style of Prometheus) aggregated over
+every call made by one (or more) clients.  Metrics are opt-in; when they
+are not enabled the client does no extra work.  They can be exported as
+a dict snapshot or in Prometheus text exposition format.
+
+Example:
+    >>> client = sparcl.client.SparclClient(metrics=True)
+    >>> found = client.find(limit=10)
+    >>> snap = client.metrics.snapshot()
+    >>> snap['sparcl_records_total'][0]['value']
+    10.0
+    >>> print(client.metrics.prometheus())  # doctest: +SKIP
+"""
+
+# Python Standard Library
+from bisect import bisect_left
+import threading
+
+# External Packages
+#   none
+
+# Local Packages
+#   none
+
+
+# Upper bounds (seconds) of latency histogram buckets.
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300,
+)  # fmt: skip
+# Upper bounds (records/second) of throughput histogram buckets.
+RATE_BUCKETS = (10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _label_str(key, extra=()):
+    pairs = list(key) + list(extra)
+    if len(pairs) == 0:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _num(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing value for each combination of labels.
+
+    Args:
+        name (:obj:`str`): Metric name (e.g. sparcl_requests_total).
+
+        help (:obj:`str`): Description of metric.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = dict()  # _values[labelKey] = value
+        self._lock = threading.Lock()
+
+    def inc(self, num=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + num
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [dict(labels=dict(key), value=val) for key, val in items]
+
+    def prometheus(self):
+        with self._lock:
+            items = list(self._values.items())
+        lines = []
+        for key, val in sorted(items):
+            lines.append(f"{self.name}{_label_str(key)} {_num(val)}")
+        return lines
+
+
+class Histogram:
+    """Distribution of observed values for each combination of labels.
+    Counts values in buckets given by their upper bounds.
+
+    Args:
+        name (:obj:`str`): Metric name (e.g. sparcl_request_seconds).
+
+        help (:obj:`str`): Description of metric.
+
+        buckets (:obj:`list`): Increasing upper bounds of buckets.
+            A bucket for +Inf is always added.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = dict()  # _values[labelKey] = [counts, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * len(self.buckets), 0.0)
+            )
+            counts[idx] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(_label_key(labels), ([0], 0.0))
+            return sum(counts)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    # RETURN: list of (labelKey, cumulativeCounts, sum)
+    def _cumulative(self):
+        with self._lock:
+            items = [(k, list(c), s) for k, (c, s) in self._values.items()]
+        res = []
+        for key, counts, total in sorted(items):
+            for i in range(1, len(counts)):
+                counts[i] += counts[i - 1]
+            res.append((key, counts, total))
+        return res
+
+    def snapshot(self):
+        return [
+            dict(
+                labels=dict(key),
+                buckets=dict(zip(self.buckets, counts)),
+                sum=total,
+                count=counts[-1],
+            )
+            for key, counts, total in self._cumulative()
+        ]
+
+    def prometheus(self):
+        lines = []
+        for key, counts, total in self._cumulative():
+            for le, num in zip(self.buckets, counts):
+                labels = _label_str(key, [("le", _num(le))])
+                lines.append(f"{self.name}_bucket{labels} {num}")
+            lines.append(f"{self.name}_sum{_label_str(key)} {_num(total)}")
+            lines.append(f"{self.name}_count{_label_str(key)} {counts[-1]}")
+        return lines
+
+
+class Metrics:
+    """Registry of all metrics collected by SparclClient.
+    One instance may be shared by several clients.
+
+    Example:
+        >>> metrics = Metrics()
+        >>> metrics.record_request('/sparc/find/', 200, 0.02, bytes_out=90)
+        >>> metrics.requests.value(endpoint='/sparc/find/', status='200')
+        1.0
+    """
+
+    def __init__(
+        self, latency_buckets=LATENCY_BUCKETS, rate_buckets=RATE_BUCKETS
+    ):
+        self.requests = Counter(
+            "sparcl_requests_total",
+            "Requests to the Server by endpoint and status",
+        )
+        self.latency = Histogram(
+            "sparcl_request_seconds",
+            "Seconds until response headers are received, by endpoint",
+            buckets=latency_buckets,
+        )
+        self.bytes_in = Counter(
+            "sparcl_received_bytes_total",
+            "Bytes of response bodies received, by endpoint",
+        )
+        self.bytes_out = Counter(
+            "sparcl_sent_bytes_total",
+            "Bytes of request bodies sent, by endpoint",
+        )
+        self.records = Counter(
+            "sparcl_records_total",
+            "Records returned, by client method",
+        )
+        self.rate = Histogram(
+            "sparcl_records_per_second",
+            "Records per second of each call, by client method",
+            buckets=rate_buckets,
+        )
+        self.retries = Counter(
+            "sparcl_retries_total",
+            "Requests that were retried, by endpoint",
+        )
+        self.token_renewals = Counter(
+            "sparcl_token_renewals_total",
+            "Renewals of expired access tokens",
+        )
+        self.cache = Counter(
+            "sparcl_cache_requests_total",
+            "Lookups of client caches, by cache and result (hit, miss)",
+        )
+
+    @property
+    def all(self):
+        """All metrics (Counter and Histogram instances)."""
+        return [
+            val
+            for val in vars(self).values()
+            if isinstance(val, (Counter, Histogram))
+        ]
+
+    def record_request(
+        self, endpoint, status, seconds, bytes_in=None, bytes_out=0
+    ):
+        """Record one request to ENDPOINT (path of URL).
+        STATUS is HTTP status code or the name of the exception raised."""
+        labels = dict(endpoint=endpoint)
+        self.requests.inc(status=str(status), **labels)
+        self.latency.observe(seconds, **labels)
+        if bytes_out:
+            self.bytes_out.inc(bytes_out, **labels)
+        if bytes_in is not None:
+            self.bytes_in.inc(bytes_in, **labels)
+
+    def record_records(self, method, count, seconds):
+        """Record COUNT records returned by client METHOD in SECONDS."""
+        self.records.inc(count, method=method)
+        if seconds > 0:
+            self.rate.observe(count / seconds, method=method)
+
+    def record_cache(self, cache, hit):
+        self.cache.inc(cache=cache, result="hit" if hit else "miss")
+
+    def reset(self):
+        for metric in self.all:
+            metric.reset()
+
+    def snapshot(self):
+        """Return dict[metricName] = list of values (one per label set)."""
+        return {metric.name: metric.snapshot() for metric in self.all}
+
+    def prometheus(self):
+        """Return all metrics in Prometheus text exposition format."""
+        lines = []
+        for metric in self.all:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.prometheus())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,200 @@
+"""Progress reporting for long client calls (e.g. retrieve of many
+records, or retrieve_pages).
+
+A progress callback is called (with a dictionary of the current state)
+when the request for a page is sent, when the Server starts to respond,
+on every chunk of the response received, and when the page has been
+decoded and wrapped.  A page that stays in the "waiting" stage is a slow
+Server; a page that stops receiving chunks in the "downloading" stage is
+a stalled connection.
+
+Example:
+    >>> client = sparcl.client.SparclClient()
+    >>> ids = client.find(limit=5000).ids
+    >>> got = client.retrieve(ids, progress=print_progress)
+    >>> got = client.retrieve(ids, progress=tqdm_progress())  # needs tqdm
+"""
+
+# Python Standard Library
+import threading
+import time
+
+# External Packages
+#   none (tqdm is optional; used by tqdm_progress)
+
+# Local Packages
+from sparcl.utils import _AttrDict
+
+
+class Progress:
+    """Track progress of one client call (that may send several requests,
+    one per page) and report it to CALLBACK.
+
+    Args:
+        callback (callable): Called with one argument; a dictionary
+            (with attribute access) containing:
+
+            - stage: waiting (for Server to respond), downloading,
+              decoding, or done.
+            - page: Number of current page (starting at 1).
+            - pages: Total number of pages.
+            - bytes: Bytes received of current page.
+            - content_length: Bytes in response of current page (or None).
+            - total_bytes: Bytes received of all pages.
+            - records: Records received (all pages done so far).
+            - total_records: Records requested (or None).
+            - elapsed: Seconds since start.
+            - rate: Bytes/second received (all pages).
+            - fraction: Fraction of the call done (or None if unknown).
+            - eta: Estimated seconds remaining (or None if unknown).
+
+        total_records (:obj:`int`, optional): Number of records requested.
+            Defaults to None (unknown).
+
+        pages (:obj:`int`, optional): Number of pages (requests).
+            Defaults to 1.
+    """
+
+    def __init__(self, callback, total_records=None, pages=1):
+        self.callback = callback
+        self.total_records = total_records
+        self.pages = pages
+        self.start = time.perf_counter()
+        self.stage = "waiting"
+        self.page = 0
+        self.pages_done = 0
+        self.bytes = 0
+        self.content_length = None
+        self.total_bytes = 0
+        self.records = 0
+        self._lock = threading.Lock()  # Requests of a call may be concurrent
+
+    # Fraction of the whole call that is done (or None if unknown).
+    def _fraction(self):
+        page_fraction = 0.0
+        if self.stage == "done":
+            return 1.0
+        if self.content_length:
+            page_fraction = min(1.0, self.bytes / self.content_length)
+        elif self.pages_done == 0:
+            return None
+        return min(1.0, (self.pages_done + page_fraction) / max(1, self.pages))
+
+    def state(self):
+        elapsed = time.perf_counter() - self.start
+        fraction = self._fraction()
+        eta = None
+        if fraction is not None and fraction > 0:
+            eta = elapsed * (1 - fraction) / fraction
+        return _AttrDict(
+            stage=self.stage,
+            page=self.page,
+            pages=self.pages,
+            bytes=self.bytes,
+            content_length=self.content_length,
+            total_bytes=self.total_bytes,
+            records=self.records,
+            total_records=self.total_records,
+            elapsed=elapsed,
+            rate=self.total_bytes / elapsed if elapsed > 0 else 0.0,
+            fraction=fraction,
+            eta=eta,
+        )
+
+    def __call__(self, event):
+        """Update state with EVENT (see SparclClient.add_hook) and
+        report the new state."""
+        with self._lock:
+            self._update(event)
+
+    def _update(self, event):
+        name = event.event
+        if name == "request":
+            if not event.get("retry"):  # A retry is the same page
+                self.page = min(self.page + 1, self.pages)
+            self.stage = "waiting"
+            self.bytes = 0
+            self.content_length = None
+        elif name == "response":
+            self.stage = "downloading"
+            self.content_length = event.content_length
+        elif name == "chunk":
+            self.bytes = event.bytes
+            self.total_bytes += event.nbytes
+        elif name == "decode":
+            self.stage = "decoding"
+        elif name == "wrap":
+            self.records += event.records
+            # One wrap may cover several pages (e.g. a split find)
+            self.pages_done += event.get("pages", 1)
+            self.bytes = 0
+            self.content_length = None
+            if self.pages_done >= self.pages:
+                self.stage = "done"
+        else:
+            return
+        self.callback(self.state())
+
+
+def as_progress(progress, total_records=None, pages=1):
+    """Return PROGRESS as a Progress instance (or None).
+    PROGRESS may be None, a Progress instance, or a callback."""
+    if progress is None or isinstance(progress, Progress):
+        return progress
+    return Progress(progress, total_records=total_records, pages=pages)
+
+
+def print_progress(state):
+    """Progress callback that prints one line per page stage change."""
+    if state.stage == "downloading" and state.bytes > 0:
+        return  # Do not print every chunk
+    eta = "?" if state.eta is None else f"{state.eta:.0f}s"
+    print(
+        f"page {state.page}/{state.pages} {state.stage:<11}"
+        f" records={state.records:,d}"
+        f" bytes={state.total_bytes:,d}"
+        f" elapsed={state.elapsed:.1f}s eta={eta}"
+    )
+
+
+def tqdm_progress(**kwargs):
+    """Return a progress callback that shows a tqdm progress bar of bytes
+    received. The bar shows the current page and stage so a slow Server
+    (waiting) can be told from a stalled connection (downloading).
+    Requires the optional package tqdm.
+
+    Args:
+        **kwargs: Passed to tqdm.tqdm().
+
+    Returns:
+        Progress callback.
+    """
+    try:
+        from tqdm.auto import tqdm
+    except ImportError:
+        msg = "tqdm_progress() requires tqdm. Install with: pip install tqdm"
+        raise Exception(msg) from None
+
+    kwargs.setdefault("unit", "B")
+    kwargs.setdefault("unit_scale", True)
+    bar = tqdm(total=None, **kwargs)
+
+    def callback(state):
+        if state.fraction:
+            # Estimated total bytes of all pages
+            total = int(state.total_bytes / state.fraction)
+            bar.total = max(total, state.total_bytes)
+        bar.update(state.total_bytes - bar.n)
+        bar.set_postfix(
+            page=f"{state.page}/{state.pages}",
+            stage=state.stage,
+            records=state.records,
+            refresh=False,
+        )
+        if state.stage == "done":
+            bar.total = bar.n
+            bar.close()
+        else:
+            bar.refresh()
+
+    return callback
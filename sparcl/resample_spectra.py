@@ -1,8 +1,18 @@
-# NOT INTENDED FOR PUBLIC USE!
-#
+"""Resample spectra related fields of records onto a new wavelength grid.
+"""
+
 # See:
 #   https://spectres.readthedocs.io/en/latest/
+#   https://arxiv.org/pdf/1705.05165.pdf
+#
+# Python Standard Library
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
 import math
+import threading
+
+# External Packages
 import spectres
 import numpy as np
 
@@ -10,25 +20,287 @@ import numpy as np
 import sparcl.client
 
 
+# Key identifying a wavelength grid. Records with the same key share
+# an identical input grid (and can be resampled together).
+def _grid_key(wavelength):
+    wls = np.ascontiguousarray(wavelength, dtype=np.float64)
+    return (len(wls), hashlib.sha1(wls.tobytes()).hexdigest())
+
+
+# RETURN: dict[gridKey] = list of record indices
+def _grid_groups(records):
+    groups = defaultdict(list)
+    for ri, rec in enumerate(records):
+        groups[_grid_key(rec["wavelength"])].append(ri)
+    return dict(groups)
+
+
+# Convert inverse variance to uncertainty (sigma).  Where IVAR is zero
+# (or negative) the uncertainty is infinite.
+def _ivar_to_err(ivar):
+    ivar = np.asarray(ivar, dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        return np.where(ivar > 0, 1 / np.sqrt(np.maximum(ivar, 0)), np.inf)
+
+
+def _err_to_ivar(err):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(np.isfinite(err) & (err > 0), 1 / err**2, 0.0)
+
+
+# Maximum number of rebinning matrices kept by _rebin_matrix()
+REBIN_CACHE_SIZE = 32
+_rebin_cache = OrderedDict()  # LRU. key=(inGridKey, outGridKey)
+_rebin_lock = threading.Lock()
+
+
+# Same bin edges and widths as spectres uses.
+def _make_bins(wavs):
+    edges = np.empty(len(wavs) + 1)
+    edges[0] = wavs[0] - (wavs[1] - wavs[0]) / 2
+    edges[-1] = wavs[-1] + (wavs[-1] - wavs[-2]) / 2
+    edges[1:-1] = (wavs[1:] + wavs[:-1]) / 2
+    return edges, np.diff(edges)
+
+
+class _RebinMatrix:
+    """Sparse (CSR) flux conserving rebinning matrix from input grid
+    WAVELENGTH to NEW_GRID. Row j holds the fraction of each input pixel
+    that falls into output bin j. Rows for output bins not fully covered
+    by the input grid are not stored (they get the fill value).
+    """
+
+    def __init__(self, wavelength, new_grid):
+        old_edges, old_widths = _make_bins(wavelength)
+        new_edges, _ = _make_bins(new_grid)
+        lo, hi = new_edges[:-1], new_edges[1:]
+        self.shape = (len(new_grid), len(wavelength))
+        self.rows = np.flatnonzero(
+            (lo >= old_edges[0]) & (hi <= old_edges[-1])
+        )
+        lo, hi = lo[self.rows], hi[self.rows]
+        # First and last input pixel partially covered by each output bin
+        start = np.searchsorted(old_edges[1:], lo, side="right")
+        stop = np.searchsorted(old_edges[1:], hi, side="left")
+        counts = stop - start + 1
+        self.indptr = np.zeros(len(self.rows) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+        first, last = self.indptr[:-1], self.indptr[1:] - 1
+        self.indices = np.arange(self.indptr[-1]) - np.repeat(
+            first - start, counts
+        )
+        weights = old_widths[self.indices]
+        span = counts > 1
+        weights[first[span]] *= (old_edges[start + 1] - lo)[span] / (
+            old_widths[start]
+        )[span]
+        weights[last[span]] *= (hi - old_edges[stop])[span] / (
+            old_widths[stop]
+        )[span]
+        weights /= np.repeat(np.add.reduceat(weights, first), counts)
+        # Output bin entirely inside one input pixel
+        weights[first[~span]] = 1.0
+        self.weights = weights
+
+    def dot(self, values, fill=np.nan, weights=None):
+        """Apply matrix to every row of 2D array VALUES."""
+        weights = self.weights if weights is None else weights
+        out = np.full((values.shape[0], self.shape[0]), fill, dtype=float)
+        if len(self.rows) > 0:
+            out[:, self.rows] = np.add.reduceat(
+                values[:, self.indices] * weights, self.indptr[:-1], axis=1
+            )
+        return out
+
+    def rebin(self, fluxes, ivar=None, fill=np.nan):
+        """Rebin 2D arrays. Same results as _resample_block()."""
+        result = {f: self.dot(ar, fill=fill) for f, ar in fluxes.items()}
+        if ivar is not None:
+            with np.errstate(divide="ignore"):
+                var = np.where(ivar > 0, 1 / np.maximum(ivar, 0), np.inf)
+            new_var = self.dot(var, fill=np.inf, weights=self.weights**2)
+            result["ivar"] = _err_to_ivar(np.sqrt(new_var))
+        return result
+
+
+# RETURN: _RebinMatrix. The matrix for a (input, output) grid pair is
+# built once and kept in an LRU cache of REBIN_CACHE_SIZE entries.
+def _rebin_matrix(wavelength, new_grid):
+    key = (_grid_key(wavelength), _grid_key(new_grid))
+    with _rebin_lock:
+        if key in _rebin_cache:
+            _rebin_cache.move_to_end(key)
+            return _rebin_cache[key]
+    matrix = _RebinMatrix(
+        np.asarray(wavelength, dtype=np.float64),
+        np.asarray(new_grid, dtype=np.float64),
+    )
+    with _rebin_lock:
+        _rebin_cache[key] = matrix
+        while len(_rebin_cache) > REBIN_CACHE_SIZE:
+            _rebin_cache.popitem(last=False)
+    return matrix
+
+
+# Resample one block of spectra that share input grid WAVELENGTH.
+# FLUXES: dict[field] = 2D array (numRecs, numPixels)
+# IVAR: 2D array for "flux" or None
+# RETURN: dict[field] = 2D array (numRecs, len(new_grid))
+def _resample_block(wavelength, new_grid, fluxes, ivar=None, fill=np.nan):
+    fields = list(fluxes.keys())
+    stack = np.stack([fluxes[f] for f in fields])  # (nfld, nrec, npix)
+    if ivar is None:
+        new = spectres.spectres(
+            new_grid, wavelength, stack, fill=fill, verbose=False
+        )
+        new_err = None
+    else:
+        errs = np.zeros_like(stack)
+        errs[fields.index("flux")] = _ivar_to_err(ivar)
+        new, new_err = spectres.spectres(
+            new_grid,
+            wavelength,
+            stack,
+            spec_errs=errs,
+            fill=fill,
+            verbose=False,
+        )
+    result = {f: new[i] for i, f in enumerate(fields)}
+    if new_err is not None:
+        result["ivar"] = _err_to_ivar(new_err[fields.index("flux")])
+    return result
+
+
+# Unit of work for resample_records(). Top level function so it can
+# be used in a process pool.
+# MATRIX: _RebinMatrix or None (use spectres)
+def _resample_task(args):
+    matrix, wavelength, new_grid, fluxes, ivar, fill = args
+    if matrix is None:
+        return _resample_block(wavelength, new_grid, fluxes, ivar, fill)
+    return matrix.rebin(fluxes, ivar, fill)
+
+
+def resample_records(
+    records,
+    new_grid,
+    fields=("flux", "ivar"),
+    *,
+    fill=np.nan,
+    method="matrix",
+    processes=None,
+    chunk=5000,
+):
+    """Resample spectra related fields of records onto a new wavelength
+    grid. Flux is conserved. Uncertainties (ivar) are propagated.
+    Records that share an identical input wavelength grid are resampled
+    together with one (vectorized) call to spectres.
+
+    Args:
+        records (list): List of dictionaries (e.g. Retrieved.records).
+            The keys are Science Field Names. Every record must contain
+            "wavelength" and all of FIELDS.
+
+        new_grid (:obj:`numpy.ndarray`): 1D array of wavelengths (bin
+            centers) to resample onto.
+
+        fields (:obj:`list`, optional): Science Field Names of flux-like
+            fields (e.g. flux, model, sky) to resample. If "ivar" is
+            included, it is propagated from the uncertainty of "flux"
+            (which must also be included).
+            DEFAULT=('flux', 'ivar')
+
+        fill (:obj:`float`, optional): Value of flux-like fields outside of
+            the wavelength range of a record. (ivar is zero there.)
+            DEFAULT=np.nan
+
+        method (:obj:`str`, optional): 'matrix' to build a sparse
+            rebinning matrix once per unique pair of (input, output) grids
+            and apply it to all records that share the input grid.
+            Matrices are cached (see REBIN_CACHE_SIZE) so repeated
+            resampling onto the same grid does not rebuild them.
+            'spectres' to call spectres for each block of records.
+            DEFAULT='matrix'
+
+        processes (:obj:`int`, optional): Number of worker processes to
+            use. DEFAULT=None; resample in this process.
+
+        chunk (:obj:`int`, optional): Maximum number of records resampled
+            in one call to spectres (one task for worker processes).
+            DEFAULT=5000
+
+    Returns:
+        tuple containing:
+        - ar_dict(dict): Dictionary of 2D numpy arrays keyed by Field Name.
+              Each array is shape: (numRecs, len(new_grid))
+        - grid(ndarray): 1D numpy array of new wavelength values.
+
+    Example:
+        >>> client = sparcl.client.SparclClient()
+        >>> found = client.find(constraints={"data_release": ['BOSS-DR16']},
+        ...                     limit=20)
+        >>> inc = ['wavelength', 'flux', 'ivar']
+        >>> got = client.retrieve(found.ids, include=inc)
+        >>> new_grid = np.arange(4000, 9000, 2.0)
+        >>> ar_dict, grid = resample_records(got.records, new_grid)
+        >>> ar_dict['ivar'].shape
+        (20, 2500)
+    """
+    new_grid = np.asarray(new_grid, dtype=np.float64)
+    fields = list(fields)
+    if "ivar" in fields and "flux" not in fields:
+        msg = 'To propagate "ivar", "flux" must also be in FIELDS.'
+        raise Exception(msg)
+    if method not in ("matrix", "spectres"):
+        msg = f'METHOD must be "matrix" or "spectres". Got "{method}"'
+        raise Exception(msg)
+    flux_fields = [f for f in fields if f != "ivar"]
+    records = getattr(records, "records", records)
+
+    tasks = []  # (record indices, task args)
+    for ridx in _grid_groups(records).values():
+        wavelength = np.asarray(records[ridx[0]]["wavelength"], np.float64)
+        matrix = (
+            _rebin_matrix(wavelength, new_grid) if method == "matrix" else None
+        )
+        for cnt in range(0, len(ridx), chunk):
+            idx = ridx[cnt : cnt + chunk]
+            fluxes = {
+                f: np.array([records[ri][f] for ri in idx], dtype=np.float64)
+                for f in flux_fields
+            }
+            ivar = (
+                np.array([records[ri]["ivar"] for ri in idx])
+                if "ivar" in fields
+                else None
+            )
+            tasks.append(
+                (idx, (matrix, wavelength, new_grid, fluxes, ivar, fill))
+            )
+
+    args = [targs for _, targs in tasks]
+    if processes is None or processes <= 1 or len(tasks) <= 1:
+        results = list(map(_resample_task, args))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_resample_task, args))
+
+    adict = {f: np.empty((len(records), len(new_grid))) for f in fields}
+    for (idx, _), res in zip(tasks, results):
+        for f in fields:
+            adict[f][idx] = res[f]
+    return adict, new_grid
+
+
 # Per paper, should be able to pass all flux in one call to spectres
 # https://arxiv.org/pdf/1705.05165.pdf
 # Perhaps users would rather the bins uniform (1,5,20 Angstroms?)
 def _resample_flux(records, wavstep=1):
     smallest = math.floor(min([min(r.wavelength) for r in records]))
     largest = math.ceil(max([max(r.wavelength) for r in records]))
-
-    #!wrange = largest - smallest
-    # new_wavs = np.fro<mfunction(lambda i: i + smallest, (wrange,), dtype=int)
-    # flux_2d = np.ones([len(records), wrange])
-
     new_wavs = np.array(range(smallest, largest + 1, wavstep))
-    flux_2d = np.full([len(records), len(new_wavs)], None, dtype=float)
-
-    for idx, rec in enumerate(records):
-        flux_2d[idx] = spectres.spectres(
-            new_wavs, rec.wavelength, rec.flux, verbose=False
-        )
-    return flux_2d, new_wavs
+    adict, new_wavs = resample_records(records, new_wavs, fields=["flux"])
+    return adict["flux"], new_wavs
 
 
 def _tt0(numrecs=20):
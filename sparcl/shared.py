@@ -0,0 +1,230 @@
+"""Spectra of retrieved records in shared memory, for pools of worker
+processes (e.g. multiprocessing or concurrent.futures).
+
+Passing records to workers pickles every array to every worker.  A
+SharedSpectra copies the arrays once into a multiprocessing.shared_memory
+block; the handle itself pickles to a few hundred bytes and workers get
+NumPy views of the block.
+
+Example:
+    >>> got = client.retrieve(ids, include=['flux', 'wavelength'])
+    >>> with got.to_shared() as spectra:
+    ...     with ProcessPoolExecutor() as pool:
+    ...         fits = list(pool.map(fit, [spectra] * len(spectra),
+    ...                              range(len(spectra))))
+    >>> def fit(spectra, idx):
+    ...     flux = spectra.array('flux', idx)  # view, not a copy
+    ...     ...
+"""
+
+# Python Standard Library
+from multiprocessing.shared_memory import SharedMemory
+import weakref
+
+# External Packages
+import numpy as np
+
+# Local Packages
+#   none
+
+
+ALIGN = 64  # bytes; alignment of each array region in the block
+
+# Blocks that could not be closed (arrays still view them).  They are
+# kept mapped (until exit) instead of being closed by garbage collection.
+_lingering = []
+
+
+def _aligned(num):
+    return -(-num // ALIGN) * ALIGN
+
+
+# Before Python 3.13 an attached block is registered with the resource
+# tracker, which removes it when the tracker exits.  Processes started by
+# multiprocessing share the tracker of the owner, so this is harmless for
+# its workers; other processes should not attach before Python 3.13.
+def _attach(name):
+    try:
+        return SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return SharedMemory(name=name)
+
+
+def _release(shm, owner):
+    if owner:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+    try:
+        shm.close()
+    except BufferError:
+        _lingering.append(shm)
+
+
+class SharedSpectra:
+    """Handle of spectra (arrays) of records in one shared memory block.
+    The process that creates it owns the block: the block is removed when
+    the owner calls release() (or leaves a with-block, or the handle is
+    garbage collected).  Pickled copies (e.g. sent to workers) attach to
+    the block when first used and only detach.  Before Python 3.13,
+    only processes started by multiprocessing (e.g. a pool of the owner)
+    should attach.
+
+    Use create() (or Retrieved.to_shared()) to make one.
+
+    Attributes:
+        name (str): Name of the shared memory block.
+        count (int): Number of records.
+        fields (list): Names of the fields held.
+    """
+
+    def __init__(self, name, count, layout, shm=None, owner=False):
+        self.name = name
+        self.count = count
+        # layout[field] = (dtype, data offset, index offset)
+        self.layout = layout
+        self.owner = owner
+        self._shm = shm
+        self._finalizer = None
+        if shm is not None:
+            self._finalizer = weakref.finalize(self, _release, shm, owner)
+
+    @classmethod
+    def create(cls, records, fields=None):
+        """Copy the arrays of FIELDS of RECORDS to a new shared block.
+
+        Args:
+            records (:obj:`list`): Records (dictionaries).
+
+            fields (:obj:`list`, optional): Fields to copy. Defaults to
+                None, meaning every field holding an array (or list).
+
+        Returns:
+            :class:`SharedSpectra` (owner of the block).
+        """
+        if fields is None:
+            fields = sorted(
+                set(
+                    fld
+                    for rec in records
+                    for fld, val in rec.items()
+                    if isinstance(val, (np.ndarray, list))
+                )
+            )
+        count = len(records)
+        layout = dict()
+        size = 0
+        plan = []  # (field, dtype, offsets, lengths)
+        for fld in fields:
+            arrays = [rec.get(fld) for rec in records]
+            arrays = [None if a is None else np.asarray(a) for a in arrays]
+            present = [a for a in arrays if a is not None]
+            if len(present) == 0:
+                continue
+            dtype = np.result_type(*present)
+            lengths = np.array(
+                [-1 if a is None else a.size for a in arrays], dtype=np.int64
+            )
+            offsets = np.concatenate(
+                [[0], np.cumsum(np.maximum(lengths, 0))[:-1]]
+            ).astype(np.int64)
+            index_off = size
+            size = _aligned(size + 2 * count * 8)
+            data_off = size
+            size = _aligned(size + int(lengths.clip(0).sum()) * dtype.itemsize)
+            layout[fld] = (dtype.str, data_off, index_off)
+            plan.append((fld, arrays, offsets, lengths))
+
+        shm = SharedMemory(create=True, size=max(1, size))
+        spectra = cls(shm.name, count, layout, shm=shm, owner=True)
+        for fld, arrays, offsets, lengths in plan:
+            index = spectra._index(fld)
+            index[:, 0] = offsets
+            index[:, 1] = lengths
+            data = spectra._data(fld)
+            for arr, off, num in zip(arrays, offsets, lengths):
+                if num > 0:
+                    data[off : off + num] = arr.ravel()
+        return spectra
+
+    def __repr__(self):
+        return (
+            f"SharedSpectra: {self.count} records of {self.fields}"
+            f" in {self.name}"
+        )
+
+    def __len__(self):
+        return self.count
+
+    # Pickle only what is needed to attach
+    def __getstate__(self):
+        return dict(name=self.name, count=self.count, layout=self.layout)
+
+    def __setstate__(self, state):
+        self.__init__(state["name"], state["count"], state["layout"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    @property
+    def fields(self):
+        return list(self.layout)
+
+    @property
+    def shm(self):
+        """The shared memory block (attached when first used)."""
+        if self._shm is None:
+            self._shm = _attach(self.name)
+            self._finalizer = weakref.finalize(
+                self, _release, self._shm, False
+            )
+        return self._shm
+
+    # RETURN: array[count, 2] of (offset, length) of each record
+    def _index(self, field):
+        _, _, index_off = self.layout[field]
+        return np.ndarray(
+            (self.count, 2),
+            dtype=np.int64,
+            buffer=self.shm.buf,
+            offset=index_off,
+        )
+
+    def _data(self, field):
+        dtype, data_off, _ = self.layout[field]
+        index = self._index(field)
+        total = int(index[:, 1].clip(0).sum())
+        return np.ndarray(
+            (total,), dtype=dtype, buffer=self.shm.buf, offset=data_off
+        )
+
+    def array(self, field, idx):
+        """Array of FIELD of record IDX as a view of shared memory (or
+        None if the record does not have it). Writes are seen by every
+        process."""
+        dtype, data_off, _ = self.layout[field]
+        off, num = self._index(field)[idx]
+        if num < 0:
+            return None
+        dtype = np.dtype(dtype)
+        return np.ndarray(
+            (int(num),),
+            dtype=dtype,
+            buffer=self.shm.buf,
+            offset=data_off + int(off) * dtype.itemsize,
+        )
+
+    def record(self, idx):
+        """Dictionary of arrays (views) of all fields of record IDX."""
+        return {fld: self.array(fld, idx) for fld in self.layout}
+
+    def release(self):
+        """Detach from the block, and remove it if this is the owner.
+        Arrays (views) must not be used afterwards."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._shm = None
@@ -0,0 +1,432 @@
+"""Memory-mapped store of spectra fields for out-of-core analysis.
+
+A store is a directory containing one padded 2D ``np.memmap`` file per
+spectra field (shape: numRecords x numPixels), a length index giving
+the number of valid pixels of each field in each row (fields such as the
+arms of DESI spectra may differ in length), and the scalar (metadata)
+fields of every record.  Records can be appended a page at a time (as
+they are retrieved) and the store can be reopened later without
+access to the SPARCL Server.
+
+Example:
+    >>> client = sparcl.client.SparclClient()
+    >>> found = client.find(constraints={"data_release": ['BOSS-DR16']},
+    ...                     limit=20)
+    >>> store = client.retrieve_to_store(found.ids, '/tmp/boss20',
+    ...                                  include=['flux', 'wavelength'])
+    >>> store['flux'].shape[0]
+    20
+    >>> SpectraStore('/tmp/boss20')['wavelength'][3, :5]  # doctest: +SKIP
+"""
+
+# Python Standard Library
+import json
+import os
+import os.path
+
+# External Packages
+import numpy as np
+
+# Local Packages
+import sparcl.exceptions as ex
+
+
+STORE_VERSION = 2  # 1: one length per row (same for every field)
+STORE_FILE = "store.json"  # Description of store (fields, shape, dtypes)
+RECORDS_FILE = "records.jsonl"  # Scalar fields. One JSON record per line.
+LENGTHS_FILE = "lengths.dat"  # Number of valid pixels of each field/row
+PIXEL_QUANTUM = 128  # Round width of rows up to a multiple of this
+
+
+def _is_vector(value):
+    return isinstance(value, (np.ndarray, list, tuple))
+
+
+def _pad_value(dtype):
+    return np.nan if np.issubdtype(dtype, np.floating) else 0
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _round_up(num, quantum=PIXEL_QUANTUM):
+    return quantum * -(-num // quantum)
+
+
+class SpectraStore:
+    """Spectra fields of many records held in memory-mapped files.
+
+    Use :meth:`create` to make a new (empty) store and
+    :meth:`append` to add records to it.  Use ``SpectraStore(path)``
+    to reopen an existing store.
+
+    Args:
+        path (:obj:`str`): Directory containing the store.
+
+        mode (:obj:`str`, optional): 'r' to open read-only, 'r+' to
+            allow appending more records. Defaults to 'r'.
+
+    Example:
+        >>> store = SpectraStore('/tmp/boss20')  # doctest: +SKIP
+        >>> flux = store['flux'][:5]  # only these rows are paged in
+    """
+
+    def __init__(self, path, mode="r"):
+        if mode not in ("r", "r+"):
+            raise ValueError(f"MODE must be 'r' or 'r+'. Got {mode}")
+        descfile = os.path.join(path, STORE_FILE)
+        if not os.path.exists(descfile):
+            msg = f"Directory {path} does not contain a spectra store."
+            raise ex.NoRecords(msg)
+        with open(descfile) as fp:
+            desc = json.load(fp)
+        self.path = path
+        self.mode = mode
+        self.fields = desc["fields"]
+        self.dtypes = {f: np.dtype(dt) for f, dt in desc["dtypes"].items()}
+        self.npix = desc["npix"]
+        self.count = desc["count"]
+        self.version = desc.get("version", 1)
+        self.capacity = desc["capacity"] if mode == "r+" else self.count
+        self._records = None
+        self._map()
+
+    def __repr__(self):
+        return (
+            f"SpectraStore({self.path}): {self.count} records,"
+            f" fields={self.fields}, npix={self.npix}"
+        )
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, field):
+        """Memory-mapped 2D array (numRecords, numPixels) of FIELD."""
+        if field not in self._arrays:
+            msg = (
+                f"Field {field} is not in store. "
+                f"Available fields are: {self.fields}"
+            )
+            raise ex.UnknownField(msg)
+        return self._arrays[field][: self.count]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @classmethod
+    def create(
+        cls, path, *, fields=None, npix=None, dtype=None, capacity=1024
+    ):
+        """Create a new empty store in directory PATH.
+
+        Args:
+            path (:obj:`str`): Directory to create. It must not already
+                contain a store.
+
+            fields (:obj:`list`, optional): Spectra fields to store.
+                Defaults to None, meaning all vector valued fields of the
+                first records appended.
+
+            npix (:obj:`int`, optional): Width of each row. Defaults to
+                None, meaning the longest spectrum of the first records
+                appended (rounded up). Rows are widened as needed.
+
+            dtype (:obj:`str`, optional): Store floating point fields
+                with this dtype (e.g. 'float32'). Defaults to None,
+                meaning the dtype of the first records appended.
+
+            capacity (:obj:`int`, optional): Number of rows to
+                initially allocate. Files grow as needed. Defaults to 1024.
+
+        Returns:
+            :class:`~sparcl.spectra_store.SpectraStore` opened for append.
+        """
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, STORE_FILE)):
+            msg = f"Directory {path} already contains a spectra store."
+            raise FileExistsError(msg)
+        desc = dict(
+            version=STORE_VERSION,
+            fields=list(fields or []),
+            dtypes=dict(),
+            npix=npix or 0,
+            count=0,
+            capacity=0,
+            float_dtype=None if dtype is None else np.dtype(dtype).str,
+            initial_capacity=capacity,
+        )
+        with open(os.path.join(path, STORE_FILE), "w") as fp:
+            json.dump(desc, fp)
+        open(os.path.join(path, RECORDS_FILE), "w").close()
+        return cls(path, mode="r+")
+
+    @property
+    def _ncols(self):
+        """Number of columns of the length index."""
+        return len(self.fields) if self.version >= 2 else 1
+
+    @property
+    def lengths(self):
+        """Number of valid (unpadded) pixels in each row (of its
+        longest field). See field_lengths()."""
+        if self._ncols == 0:
+            return np.zeros(self.count, dtype=np.int64)
+        return self._lengths[: self.count].max(axis=1)
+
+    def field_lengths(self, field):
+        """Number of valid (unpadded) pixels of FIELD in each row."""
+        if field not in self.fields:
+            msg = (
+                f"Field {field} is not in store. "
+                f"Available fields are: {self.fields}"
+            )
+            raise ex.UnknownField(msg)
+        col = self.fields.index(field) if self._ncols > 1 else 0
+        return self._lengths[: self.count, col]
+
+    @property
+    def records(self):
+        """List of scalar (non-spectra) fields of each record."""
+        if self._records is None:
+            with open(os.path.join(self.path, RECORDS_FILE)) as fp:
+                self._records = [
+                    json.loads(line) for line, _ in zip(fp, range(self.count))
+                ]
+        return self._records
+
+    def check(self, *, fields=None, dtype=None):
+        """Raise ValueError unless the store holds FIELDS (if given) and
+        its floating point fields have DTYPE (if given)."""
+        if fields is not None and len(self.fields) > 0:
+            if sorted(set(fields)) != sorted(self.fields):
+                msg = (
+                    f"Store {self.path} holds fields {self.fields}."
+                    f" Got fields={list(fields)}"
+                )
+                raise ValueError(msg)
+        if dtype is None:
+            return
+        if len(self.dtypes) == 0:
+            stored = self._desc().get("float_dtype")
+            floats = [] if stored is None else [np.dtype(stored)]
+        else:
+            floats = [
+                dt
+                for dt in self.dtypes.values()
+                if np.issubdtype(dt, np.floating)
+            ]
+        if any(dt != np.dtype(dtype) for dt in floats):
+            msg = (
+                f"Store {self.path} holds floating point fields as"
+                f" {sorted(set(str(dt) for dt in floats))}."
+                f" Got dtype={dtype}"
+            )
+            raise ValueError(msg)
+
+    def _desc(self):
+        with open(os.path.join(self.path, STORE_FILE)) as fp:
+            return json.load(fp)
+
+    def _write_desc(self, **kwargs):
+        desc = self._desc()
+        desc.update(kwargs)
+        tmpfile = os.path.join(self.path, STORE_FILE + ".tmp")
+        with open(tmpfile, "w") as fp:
+            json.dump(desc, fp)
+        os.replace(tmpfile, os.path.join(self.path, STORE_FILE))
+
+    def _fieldfile(self, field):
+        return os.path.join(self.path, f"{field}.dat")
+
+    def _map(self):
+        """(Re)create memmap objects for all files in the store."""
+        mmode = self.mode
+        rows = self.capacity if mmode == "r+" else self.count
+        self._arrays = dict()
+        if self.npix == 0 or rows == 0:
+            for fld in self.fields:
+                dt = self.dtypes.get(fld, np.float64)
+                self._arrays[fld] = np.empty((0, self.npix), dtype=dt)
+            self._lengths = np.empty((0, self._ncols), dtype=np.int64)
+            return
+        for fld in self.fields:
+            self._arrays[fld] = np.memmap(
+                self._fieldfile(fld),
+                dtype=self.dtypes[fld],
+                mode=mmode,
+                shape=(rows, self.npix),
+            )
+        self._lengths = np.memmap(
+            os.path.join(self.path, LENGTHS_FILE),
+            dtype=np.int64,
+            mode=mmode,
+            shape=(rows, self._ncols),
+        )
+
+    def _unmap(self):
+        for ar in self._arrays.values():
+            if isinstance(ar, np.memmap):
+                ar.flush()
+        if isinstance(self._lengths, np.memmap):
+            self._lengths.flush()
+        self._arrays = dict()
+        self._lengths = None
+
+    def _resize_file(self, filename, nbytes, *, rows, npix, itemsize):
+        """Grow FILENAME to NBYTES. Widen rows if NPIX changed."""
+        if (npix == self.npix) or (self.count == 0):
+            with open(filename, "ab") as fp:
+                fp.truncate(nbytes)
+            return
+        # Widen: copy existing rows, a block at a time, into new file.
+        tmpfile = filename + ".tmp"
+        with open(tmpfile, "wb") as fp:
+            fp.truncate(nbytes)
+        dtype = np.dtype(f"V{itemsize}")
+        old = np.memmap(filename, dtype=dtype, mode="r")
+        old = old[: self.count * self.npix].reshape(self.count, self.npix)
+        new = np.memmap(tmpfile, dtype=dtype, mode="r+", shape=(rows, npix))
+        block = max(1, (64 * 2**20) // max(1, npix * itemsize))
+        for r0 in range(0, self.count, block):
+            r1 = min(r0 + block, self.count)
+            new[r0:r1, : self.npix] = old[r0:r1]
+        new.flush()
+        del old, new
+        os.replace(tmpfile, filename)
+
+    def _grow(self, rows, npix):
+        """Make room for ROWS rows of NPIX pixels in every file."""
+        if rows <= self.capacity and npix <= self.npix:
+            return
+        rows = max(rows, self.capacity)
+        npix = max(npix, self.npix)
+        old_npix = self.npix
+        self._unmap()
+        for fld in self.fields:
+            itemsize = self.dtypes[fld].itemsize
+            self._resize_file(
+                self._fieldfile(fld),
+                rows * npix * itemsize,
+                rows=rows,
+                npix=npix,
+                itemsize=itemsize,
+            )
+            if npix > old_npix and self.count > 0:
+                # Pad new columns of existing rows.
+                ar = np.memmap(
+                    self._fieldfile(fld),
+                    dtype=self.dtypes[fld],
+                    mode="r+",
+                    shape=(rows, npix),
+                )
+                ar[: self.count, old_npix:] = _pad_value(self.dtypes[fld])
+                ar.flush()
+                del ar
+        with open(os.path.join(self.path, LENGTHS_FILE), "ab") as fp:
+            fp.truncate(rows * self._ncols * np.dtype(np.int64).itemsize)
+        self.capacity = rows
+        self.npix = npix
+        self._write_desc(capacity=rows, npix=npix)
+        self._map()
+
+    def _setup(self, records):
+        """Determine fields and dtypes from first records appended."""
+        desc = self._desc()
+        rec0 = records[0]
+        if len(self.fields) == 0:
+            self.fields = sorted(k for k, v in rec0.items() if _is_vector(v))
+        float_dtype = desc.get("float_dtype")
+        for fld in self.fields:
+            if fld not in rec0:
+                msg = (
+                    f"Field {fld} is not in records. "
+                    f"Fields available are: {sorted(rec0.keys())}"
+                )
+                raise ex.UnknownField(msg)
+            dt = np.asarray(rec0[fld]).dtype
+            if float_dtype is not None and np.issubdtype(dt, np.floating):
+                dt = np.dtype(float_dtype)
+            self.dtypes[fld] = dt
+        self._write_desc(
+            fields=self.fields,
+            dtypes={f: dt.str for f, dt in self.dtypes.items()},
+        )
+
+    def append(self, records):
+        """Add RECORDS (list of dict, or Retrieved) to the end of store.
+
+        Args:
+            records (:obj:`list`): Records to add. Each record must
+                contain all of the spectra fields of the store. Fields
+                may have different lengths (e.g. arms of DESI spectra).
+
+        Returns:
+            Number of records in the store after append.
+        """
+        if self.mode != "r+":
+            raise PermissionError(f"Store {self.path} is opened read-only.")
+        records = getattr(records, "records", records)
+        if len(records) == 0:
+            return self.count
+        if len(self.dtypes) == 0:
+            self._setup(records)
+
+        lengths = np.array(
+            [[len(rec[fld]) for fld in self.fields] for rec in records],
+            dtype=np.int64,
+        ).reshape(len(records), len(self.fields))
+        if self._ncols == 1 and np.any(lengths != lengths[:, :1]):
+            msg = (
+                f"Store {self.path} (version {self.version}) holds one"
+                f" length per row. Every field of a record must have the"
+                f" same length."
+            )
+            raise ValueError(msg)
+        width = int(lengths.max()) if lengths.size else 0
+        if width > self.npix:
+            width = _round_up(width)
+        rows = self.count + len(records)
+        if rows > self.capacity:
+            rows = max(
+                rows,
+                2 * self.capacity,
+                self._desc().get("initial_capacity", 0),
+            )
+        self._grow(rows, width)
+
+        r0 = self.count
+        r1 = r0 + len(records)
+        for fld in self.fields:
+            ar = self._arrays[fld]
+            ar[r0:r1] = _pad_value(self.dtypes[fld])
+            for ri, rec in enumerate(records, start=r0):
+                val = rec[fld]
+                ar[ri, : len(val)] = val
+        self._lengths[r0:r1] = lengths[:, : self._ncols]
+
+        with open(os.path.join(self.path, RECORDS_FILE), "a") as fp:
+            for rec in records:
+                scalars = {k: v for k, v in rec.items() if not _is_vector(v)}
+                fp.write(json.dumps(scalars, default=_json_default) + "\n")
+        self.count = r1
+        self._records = None
+        self._write_desc(count=self.count)
+        return self.count
+
+    def flush(self):
+        """Write any changes in memory-mapped arrays to disk."""
+        for ar in self._arrays.values():
+            if isinstance(ar, np.memmap):
+                ar.flush()
+        if isinstance(self._lengths, np.memmap):
+            self._lengths.flush()
+
+    def close(self):
+        """Flush and release memory-mapped files."""
+        self._unmap()
@@ -1,5 +1,6 @@
 # Python Standard Library
-from abc import ABC, abstractmethod
+from abc import ABC
+from collections import defaultdict
 import copy
 
 #!from pprint import pformat
@@ -15,6 +16,10 @@ from astropy.nddata import InverseVariance
 
 # Local Packages
 import sparcl.exceptions as ex
+from sparcl.utils import _AttrDict
+from sparcl.spectra_store import _is_vector
+from sparcl.resample_spectra import _grid_key
+from sparcl.gather_2d import _wavelength_grid_offsets, _grid_wavelengths
 
 
 """It would be much better if this were abstracted and easier to
@@ -60,15 +65,123 @@ class Convert(ABC):
     and selected data record type.
     """
 
-    @abstractmethod
-    def to_numpy(self, record, o2nLUT):
-        newrec = copy.deepcopy(record)
-        return newrec
-
-    @abstractmethod
-    def to_spectrum1d(self, record, o2nLUT):
-        newrec = copy.deepcopy(record)
-        return newrec
+    # Prefixes of Science Field Names of each set of spectra in a
+    # record. e.g. DESI spectra may have "b_", "r_", "z_" arms.
+    arms = [""]
+    flux_unit = u.Unit("1e-17 erg cm-2 s-1 AA-1")
+    wavelength_unit = u.AA
+
+    # Internal Field Names of spectra fields (in order) for to_numpy()
+    arflds = []
+
+    def spectra_fields(self, records, o2nLUT):
+        """Science Field Names of spectra fields in RECORDS."""
+        rec0 = records[0]
+        fields = [o2nLUT[f] for f in self.arflds if o2nLUT.get(f) in rec0]
+        if len(fields) == 0:
+            fields = sorted(k for k, v in rec0.items() if _is_vector(v))
+        return fields
+
+    def to_numpy(  # noqa: C901
+        self,
+        records,
+        o2nLUT,
+        *,
+        fields=None,
+        dtype=np.float64,
+        align=False,
+        precision=7,
+    ):
+        """Convert RECORDS (all of the same Data Set) to one contiguous
+        3D array (numRecords, numFields, numPixels) and a table of the
+        scalar fields of each record.
+
+        The array is allocated once and filled directly from the values
+        in the records. If ALIGN, column j of every record is the same
+        wavelength (see sparcl.gather_2d.align_records()), otherwise
+        spectra are left justified and padded.
+        Padding is NaN (or 0 for integer DTYPE).
+        """
+        sci = set(o2nLUT.values())
+        if fields is None:
+            fields = self.spectra_fields(records, o2nLUT)
+        if align:
+            fields = [f for f in fields if f != "wavelength"]
+            grid, offsets, _ = _wavelength_grid_offsets(records, precision)
+            npix = len(grid)
+        else:
+            offsets = np.zeros(len(records), dtype=np.int64)
+            npix = max(len(rec[f]) for rec in records for f in fields)
+        lengths = np.array(
+            [[len(rec[f]) for f in fields] for rec in records], dtype=np.int64
+        ).reshape(len(records), len(fields))
+        if align and np.any(lengths != lengths[:, :1]):
+            msg = (
+                "To align, every spectra field must have the same"
+                " number of values as wavelength in each record."
+            )
+            raise Exception(msg)
+
+        fill = np.nan if np.issubdtype(dtype, np.floating) else 0
+        cube = np.full((len(records), len(fields), npix), fill, dtype=dtype)
+        for ri, rec in enumerate(records):
+            off = offsets[ri]
+            for fi, fld in enumerate(fields):
+                cube[ri, fi, off : off + lengths[ri, fi]] = rec[fld]
+
+        # Scalar fields as a numpy record array (one row per record)
+        names = [
+            k
+            for k, v in records[0].items()
+            if (k in sci or k == "_dr") and not _is_vector(v)
+        ]
+        meta = np.rec.fromarrays(
+            [np.array([rec.get(k) for rec in records]) for k in names],
+            names=names,
+        )
+        result = _AttrDict(
+            cube=cube,
+            fields=fields,
+            lengths=lengths,
+            offsets=offsets,
+            meta=meta,
+        )
+        if align:
+            result["wavelength"] = _grid_wavelengths(grid, precision)
+        return result
+
+    def to_spectrum1d(self, records, o2nLUT, arm=""):
+        """Convert RECORDS (all with the same wavelength grid of ARM) to
+        a single multi-row Spectrum1D (one row per record).
+        Units are applied once to the 2D arrays."""
+        sci = set(o2nLUT.values())
+        wavelength = np.asarray(records[0][f"{arm}wavelength"])
+        flux = np.array([rec[f"{arm}flux"] for rec in records])
+        kwargs = dict(
+            spectral_axis=wavelength * self.wavelength_unit,
+            flux=flux * self.flux_unit,
+        )
+        if f"{arm}ivar" in records[0]:
+            kwargs["uncertainty"] = InverseVariance(
+                np.array([rec[f"{arm}ivar"] for rec in records]),
+                unit=self.flux_unit**-2,
+            )
+        if f"{arm}mask" in records[0]:
+            kwargs["mask"] = (
+                np.array([rec[f"{arm}mask"] for rec in records]) != 0
+            )
+        if all(rec.get("redshift") is not None for rec in records):
+            kwargs["redshift"] = np.array([rec["redshift"] for rec in records])
+        # Scalar (non-spectra) fields of each record
+        meta = [
+            {
+                k: v
+                for k, v in rec.items()
+                if (k in sci or k == "_dr") and not _is_vector(v)
+            }
+            for rec in records
+        ]
+        return Spectrum1D(**kwargs, meta=dict(records=meta))
 
 
 #!    @abstractmethod
@@ -78,75 +191,28 @@ class Convert(ABC):
 
 
 class NoopConvert(Convert):
-    def to_numpy(self, record, o2nLUT):
-        return record
+    def to_numpy(self, records, o2nLUT, **kwargs):
+        return records
 
-    def to_spectrum1d(self, record, o2nLUT):
-        return record
+    def to_spectrum1d(self, records, o2nLUT, arm=""):
+        return records
 
     def to_pandas(self, record, o2nLUT):
         return record
 
 
 class SdssDr16(Convert):
-    def to_numpy(self, record, o2nLUT):
-        """Convert FitsFile record to a structure that uses Numpy"""
-        arflds = [
-            "spectra.coadd.and_mask",
-            "spectra.coadd.flux",
-            "spectra.coadd.ivar",
-            "spectra.coadd.loglam",
-            "spectra.coadd.model",
-            "spectra.coadd.or_mask",
-            "spectra.coadd.sky",
-            "spectra.coadd.wdisp",
-        ]
-        lofl = [record[o2nLUT[f]] for f in arflds if f in o2nLUT]
-        newrec = dict(nparr=np.array(lofl))
-        for orig, new in o2nLUT.items():
-            if orig in arflds:
-                continue
-            if new in record:
-                newrec[new] = record[new]
-        return newrec
-
-    # Sdss
-    def to_spectrum1d(self, record, o2nLUT):
-        arflds = [
-            "red_shift",
-            "spectra.coadd.flux",
-            "spectra.coadd.ivar",
-            "spectra.coadd.loglam",
-            "spectra.coadd.and_mask",
-        ]
-
-        loglam = record[o2nLUT["spectra.coadd.loglam"]]
-        flux = record[o2nLUT["spectra.coadd.flux"]]
-        ivar = record[o2nLUT["spectra.coadd.ivar"]]
-        and_mask = record[o2nLUT["spectra.coadd.and_mask"]]
-
-        wavelength = (10 ** np.array(loglam)) * u.AA
-        flux = np.array(flux) * 10**-17 * u.Unit("erg cm-2 s-1 AA-1")
-        ivar = InverseVariance(np.array(ivar))
-        z = record.get("red_shift")
-
-        newrec = dict(
-            # flux, uncertainty, wavevelength, mask(and), redshift
-            spec1d=Spectrum1D(
-                spectral_axis=wavelength,
-                flux=flux,
-                uncertainty=ivar,
-                redshift=z,
-                mask=and_mask,
-            ),
-        )
-        for orig, new in o2nLUT.items():
-            if orig in arflds:
-                continue
-            if new in record:
-                newrec[new] = record[new]
-
-        return newrec
+    # Internal Field Names of spectra fields (in order) for to_numpy()
+    arflds = [
+        "spectra.coadd.and_mask",
+        "spectra.coadd.flux",
+        "spectra.coadd.ivar",
+        "spectra.coadd.loglam",
+        "spectra.coadd.model",
+        "spectra.coadd.or_mask",
+        "spectra.coadd.sky",
+        "spectra.coadd.wdisp",
+    ]
 
 
 #!    def to_pandas(self, record, o2nLUT):
@@ -172,64 +238,17 @@ class SdssDr16(Convert):
 
 
 class BossDr16(Convert):
-    def to_numpy(self, record, o2nLUT):
-        arflds = [
-            "spectra.coadd.AND_MASK",
-            "spectra.coadd.FLUX",
-            "spectra.coadd.IVAR",
-            "spectra.coadd.LOGLAM",
-            "spectra.coadd.MODEL",
-            "spectra.coadd.OR_MASK",
-            "spectra.coadd.SKY",
-            "spectra.coadd.WDISP",
-        ]
-        lofl = [record[o2nLUT[f]] for f in arflds if f in o2nLUT]
-        newrec = dict(nparr=np.array(lofl))
-        for orig, new in o2nLUT.items():
-            # Don't carry over the fields used to build the new datatype.
-            # This would be duplication since their content is already
-            # in the new datatype.
-            if orig in arflds:
-                continue
-            if new in record:
-                newrec[new] = record[new]
-        return newrec
-
-    # BOSS
-    def to_spectrum1d(self, record, o2nLUT):
-        arflds = [
-            "red_shift",
-            "spectra.coadd.FLUX",
-            "spectra.coadd.IVAR",
-            "spectra.coadd.LOGLAM",
-            "spectra.coadd.AND_MASK",
-        ]
-        loglam = record[o2nLUT["spectra.coadd.LOGLAM"]]
-        flux = record[o2nLUT["spectra.coadd.FLUX"]]
-        ivar = record[o2nLUT["spectra.coadd.IVAR"]]
-        and_mask = record[o2nLUT["spectra.coadd.AND_MASK"]]
-
-        wavelength = (10 ** np.array(loglam)) * u.AA
-        flux = np.array(flux) * 10**-17 * u.Unit("erg cm-2 s-1 AA-1")
-        ivar = InverseVariance(np.array(ivar))
-        z = record.get("red_shift")
-
-        newrec = dict(
-            # flux, uncertainty, wavelength, mask(and), redshift
-            spec1d=Spectrum1D(
-                spectral_axis=wavelength,
-                flux=flux,
-                uncertainty=ivar,
-                redshift=z,
-                mask=and_mask,
-            ),
-        )
-        for orig, new in o2nLUT.items():
-            if orig in arflds:
-                continue
-            if new in record:
-                newrec[new] = record[new]
-        return newrec
+    # Internal Field Names of spectra fields (in order) for to_numpy()
+    arflds = [
+        "spectra.coadd.AND_MASK",
+        "spectra.coadd.FLUX",
+        "spectra.coadd.IVAR",
+        "spectra.coadd.LOGLAM",
+        "spectra.coadd.MODEL",
+        "spectra.coadd.OR_MASK",
+        "spectra.coadd.SKY",
+        "spectra.coadd.WDISP",
+    ]
 
 
 #!    def to_pandas(self, record, o2nLUT): # BOSS
@@ -255,109 +274,22 @@ class BossDr16(Convert):
 
 
 class Desi(Convert):
-    def to_numpy(self, record, o2nLUT):
-        arflds = [
-            "spectra.b_flux",
-            "spectra.b_ivar",
-            "spectra.b_mask",
-            "spectra.b_wavelength",
-            "spectra.r_flux",
-            "spectra.r_ivar",
-            "spectra.r_mask",
-            "spectra.r_wavelength",
-            "spectra.z_flux",
-            "spectra.z_ivar",
-            "spectra.z_mask",
-            "spectra.z_wavelength",
-        ]
-        lofl = [record[o2nLUT[f]] for f in arflds if f in o2nLUT]
-        newrec = dict(nparr=np.array(lofl))
-        for orig, new in o2nLUT.items():
-            if orig in arflds:
-                continue
-            if new in record:
-                newrec[new] = record[new]
-        return newrec
-
-    def to_spectrum1d(self, record, o2nLUT):  # Desi
-        arflds = [
-            "red_shift",
-            "spectra.b_flux",
-            "spectra.b_ivar",
-            "spectra.b_mask",
-            "spectra.b_wavelength",
-            "spectra.r_flux",
-            "spectra.r_ivar",
-            "spectra.r_mask",
-            "spectra.r_wavelength",
-            "spectra.z_flux",
-            "spectra.z_ivar",
-            "spectra.z_mask",
-            "spectra.z_wavelength",
-        ]
-
-        z = record.get("red_shift")
-
-        # _b
-        wavelength_b = record[o2nLUT["spectra.b_wavelength"]]
-        flux_b = record[o2nLUT["spectra.b_flux"]]
-        ivar_b = record[o2nLUT["spectra.b_ivar"]]
-        mask_b = record[o2nLUT["spectra.b_mask"]]
-        # Define units
-        wavelength_b = np.array(wavelength_b) * u.AA
-        flux_b = np.array(flux_b) * 10**-17 * u.Unit("erg cm-2 s-1 AA-1")
-        ivar_b = InverseVariance(np.array(ivar_b))
-
-        # _r
-        wavelength_r = record[o2nLUT["spectra.r_wavelength"]]
-        flux_r = record[o2nLUT["spectra.r_flux"]]
-        ivar_r = record[o2nLUT["spectra.r_ivar"]]
-        mask_r = record[o2nLUT["spectra.r_mask"]]
-        # Define units
-        wavelength_r = np.array(wavelength_r) * u.AA
-        flux_r = np.array(flux_r) * 10**-17 * u.Unit("erg cm-2 s-1 AA-1")
-        ivar_r = InverseVariance(np.array(ivar_r))
-
-        # _z
-        wavelength_z = record[o2nLUT["spectra.z_wavelength"]]
-        flux_z = record[o2nLUT["spectra.z_flux"]]
-        ivar_z = record[o2nLUT["spectra.z_ivar"]]
-        mask_z = record[o2nLUT["spectra.z_mask"]]
-        # Define units
-        wavelength_z = np.array(wavelength_z) * u.AA
-        flux_z = np.array(flux_z) * 10**-17 * u.Unit("erg cm-2 s-1 AA-1")
-        ivar_z = InverseVariance(np.array(ivar_z))
-
-        newrec = dict(
-            # flux, uncertainty, wavevelength, mask, redshift
-            b_spec1d=Spectrum1D(
-                spectral_axis=wavelength_b,
-                flux=flux_b,
-                uncertainty=ivar_b,
-                redshift=z,
-                mask=mask_b,
-            ),
-            r_spec1d=Spectrum1D(
-                spectral_axis=wavelength_r,
-                flux=flux_r,
-                uncertainty=ivar_r,
-                redshift=z,
-                mask=mask_r,
-            ),
-            z_spec1d=Spectrum1D(
-                spectral_axis=wavelength_z,
-                flux=flux_z,
-                uncertainty=ivar_z,
-                redshift=z,
-                mask=mask_z,
-            ),
-        )
-        for orig, new in o2nLUT.items():
-            if orig in arflds:
-                continue
-            if new in record:
-                newrec[new] = record[new]
-        return newrec
+    arms = ["", "b_", "r_", "z_"]
+    # Internal Field Names of spectra fields (in order) for to_numpy()
+    arflds = [
+        "spectra.b_flux",
+        "spectra.b_ivar",
+        "spectra.b_mask",
+        "spectra.b_wavelength",
+        "spectra.r_flux",
+        "spectra.r_ivar",
+        "spectra.r_mask",
+        "spectra.r_wavelength",
+        "spectra.z_flux",
+        "spectra.z_ivar",
+        "spectra.z_mask",
+        "spectra.z_wavelength",
+    ]
 
 
 class DesiDenali(Desi):
@@ -374,17 +306,13 @@ diLUT = {
     "BOSS-DR16": BossDr16(),
     "DESI-denali": DesiDenali(),
     "DESI-everest": DesiEverest(),
+    "DESI-EDR": Desi(),
+    "DESI-DR1": Desi(),
     #'Unknown': NoopConvert(),
 }
 
 
-def convert(record, rtype, client, include, verbose=False):
-    if rtype is None:
-        return record
-
-    dr = record["_dr"]
-
-    # Validate parameters
+def _converter(dr):
     if dr not in diLUT:
         allowed = ", ".join(list(diLUT.keys()))
         msg = (
@@ -393,26 +321,140 @@ def convert(record, rtype, client, include, verbose=False):
             f" Available Data Sets are: {allowed}."
         )
         raise ex.UnkDr(msg)
-
-    drin = diLUT.get(dr, NoopConvert())
-
-    o2nLUT = copy.copy(client.orig2newLUT[dr])  # orig2newLUT[dr][orig] = new
-    o2nLUT["_dr"] = "_dr"
-    #!n2oLUT = client.new2origLUT[dr]
+    return diLUT[dr]
+
+
+# Group records that can go in the same multi-row data structure.
+# RETURN: dict[(dr, arm, gridKey)] = list of record indices
+def _spectra_groups(records):
+    groups = defaultdict(list)
+    for ri, rec in enumerate(records):
+        dr = rec["_dr"]
+        for arm in _converter(dr).arms:
+            wavelength = rec.get(f"{arm}wavelength")
+            if wavelength is None:
+                continue
+            groups[(dr, arm, _grid_key(wavelength))].append(ri)
+    return dict(groups)
+
+
+def convert(  # noqa: C901
+    records,
+    rtype,
+    client,
+    include=None,
+    verbose=False,
+    *,
+    fields=None,
+    dtype=np.float64,
+    align=False,
+):
+    """Convert records (e.g. from client.retrieve()) to RTYPE.
+
+    For 'spectrum1d', records are grouped by Data Set and wavelength
+    grid. Each group becomes a single Spectrum1D with 2D flux (one row
+    per record) sharing one spectral axis.
+
+    For 'numpy', records are grouped by Data Set. Each group becomes one
+    contiguous 3D array (numRecords, numFields, numPixels) plus a record
+    array of the scalar fields of each record.  The 3D array can be
+    saved with numpy.save() and later memory-mapped with
+    numpy.load(filename, mmap_mode='r').
+
+    Args:
+        records (:class:`~sparcl.Results.Retrieved`): Records to convert.
+            A list of records (dictionaries) may also be used.
+
+        rtype (:obj:`str`): One of 'json', 'numpy', 'spectrum1d'.
+
+        client (:class:`~sparcl.client.SparclClient`): Client used to
+            get the records.
+
+        include (:obj:`list`, optional): Unused. Defaults to None.
+
+        verbose (:obj:`bool`, optional): Defaults to False.
+
+        fields (:obj:`list`, optional): For 'numpy', spectra fields (in
+            order) of the 3D array. Defaults to None, meaning all spectra
+            fields in the records.
+
+        dtype (:obj:`str`, optional): For 'numpy', dtype of the 3D array.
+            Defaults to np.float64.
+
+        align (:obj:`bool`, optional): For 'numpy', put values with the
+            same wavelength in the same column (and return the wavelength
+            of each column) instead of left justifying each spectrum.
+            Defaults to False.
+
+    Returns:
+        For 'spectrum1d': list of dictionaries, one per group, with keys:
+        '_dr', 'arm' (e.g. "b_" for DESI arms, else ""), 'index'
+        (positions of the group's records in RECORDS), and 'spec1d'.
+        The scalar fields of each record are in spec1d.meta['records'].
+        For 'numpy': dictionary keyed by Data Set. Each value is a
+        dictionary with keys: 'cube' (3D array), 'fields' (of axis 1),
+        'lengths' (number of values per record and field), 'offsets'
+        (first column of each record), 'meta' (record array of scalar
+        fields), 'index' (positions of the Data Set's records in
+        RECORDS), and 'wavelength' (if ALIGN).
+        For 'json': the records.
+
+    Example:
+        >>> client = sparcl.client.SparclClient()
+        >>> found = client.find(constraints={"data_release": ['BOSS-DR16']},
+        ...                     limit=20)
+        >>> got = client.retrieve(found.ids, include=['flux', 'wavelength'])
+        >>> groups = convert(got, 'spectrum1d', client)
+        >>> groups[0].spec1d.flux.shape  # doctest: +SKIP
+        (20, 4648)
+        >>> cubes = convert(got, 'numpy', client)
+        >>> cubes['BOSS-DR16'].cube.shape  # doctest: +SKIP
+        (20, 2, 4648)
+    """
+    records = getattr(records, "records", records)
+    if rtype is None or rtype == "json":
+        return records
+
+    o2n = dict()  # o2n[dr][InternalName] = ScienceName
+    for dr in set(rec["_dr"] for rec in records):
+        _converter(dr)  # Validate
+        o2n[dr] = copy.copy(client.fields.o2n[dr])
+        o2n[dr]["_dr"] = "_dr"
+    #!n2oLUT = client.fields.n2o[dr]
     #!required = set(client.required[dr])
     #!if include is not None:
     #!    nuke = set(n2oLUT.keys()).difference(required.union(include))
     #!    for new in nuke:
     #!        del o2nLUT[n2oLUT[new]]
 
-    if rtype == "json":
-        return record
-    elif rtype == "numpy":
-        return drin.to_numpy(record, o2nLUT)
-    elif rtype == "pandas":
-        return drin.to_pandas(record, o2nLUT)
+    if rtype == "numpy":
+        dr_index = defaultdict(list)  # dr_index[dr] = [recordIndex, ...]
+        for ri, rec in enumerate(records):
+            dr_index[rec["_dr"]].append(ri)
+        cubes = dict()
+        for dr, idx in dr_index.items():
+            cubes[dr] = _converter(dr).to_numpy(
+                [records[ri] for ri in idx],
+                o2n[dr],
+                fields=fields,
+                dtype=dtype,
+                align=align,
+            )
+            cubes[dr]["index"] = idx
+            if verbose:
+                shape = cubes[dr].cube.shape
+                print(f"Converted {len(idx)} {dr} records to {shape}")
+        return cubes
     elif rtype == "spectrum1d":
-        return drin.to_spectrum1d(record, o2nLUT)
+        groups = list()
+        for (dr, arm, _), idx in _spectra_groups(records).items():
+            spec1d = _converter(dr).to_spectrum1d(
+                [records[ri] for ri in idx], o2n[dr], arm=arm
+            )
+            groups.append(_AttrDict(_dr=dr, arm=arm, index=idx, spec1d=spec1d))
+            if verbose:
+                print(f"Converted {len(idx)} {dr} records to {spec1d.shape}")
+        return groups
     else:
         raise Exception(f"Unknown record type ({rtype})")
     return None
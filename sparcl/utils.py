@@ -1,5 +1,7 @@
 # Python library
+from contextlib import contextmanager
 import datetime
+import threading
 import time
 import socket
 import itertools
@@ -48,30 +50,100 @@ class _AttrDict(dict):
         for key in self.keys():
             self[key] = from_nested_dict(self[key])
 
+    # Unpickle as an _AttrDict (whose __dict__ is itself).
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+
+# Start time of tic() for each thread (so concurrent calls do not clobber)
+_tictoc = threading.local()
+
 
 def tic():
     """Start tracking elapsed time. Works in conjunction with toc().
+    Each thread tracks its own start time.
 
     Args:
        None.
     Returns:
        Elapsed time.
     """
-    tic.start = time.perf_counter()
+    _tictoc.start = time.perf_counter()
 
 
 def toc():
-    """Return elapsed time since previous tic().
+    """Return elapsed time since previous tic() (in the same thread).
 
     Args:
        None.
     Returns:
        Elapsed time since previous tic().
     """
-    elapsed_seconds = time.perf_counter() - tic.start
+    elapsed_seconds = time.perf_counter() - _tictoc.start
     return elapsed_seconds  # fractional
 
 
+# Unique id of each PhaseTimer (next() is atomic)
+_timer_ids = itertools.count(1)
+
+
+class PhaseTimer:
+    """Accumulate elapsed time of named phases of one call (e.g.
+    download, unpickle). Use one instance per call. A call that sends
+    concurrent requests shares its instance between threads; the time
+    of a phase is then summed over the requests.
+
+    Args:
+        name (:obj:`str`, optional): Name of the call (e.g. retrieve).
+
+    Example:
+        >>> timer = PhaseTimer()
+        >>> with timer.phase("decode"):
+        ...     _ = sum(range(10))
+        >>> sorted(timer.as_dict().keys())
+        ['decode', 'total']
+    """
+
+    def __init__(self, name=None):
+        self.id = next(_timer_ids)
+        self.name = name
+        self.start = time.perf_counter()
+        self.phases = dict()  # phases[name] = seconds
+        self.counts = dict()  # e.g. bytes, records
+        self.listener = None  # Called with every event of the call
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Add elapsed time of the with-block to phase NAME."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    @property
+    def elapsed(self):
+        """Seconds since creation."""
+        return time.perf_counter() - self.start
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, num):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + num
+
+    def as_dict(self):
+        """Phases (seconds), counts, and total seconds since creation."""
+        return dict(
+            **self.phases,
+            **self.counts,
+            total=self.elapsed,
+        )
+
+
 def here_now():
     """Used to track info for benchmark. Probably OBE?
 
@@ -33,9 +33,10 @@
 #  usrpw='' serverurl=https://astrosparcl.datalab.noirlab.edu/ python -m unittest tests.tests_api  # noqa: E501
 
 # Python library
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import contextmanager
 import unittest
-from unittest import skip, skipUnless, skipIf
+from unittest import mock, skip, skipUnless, skipIf
 import datetime
 import requests
 
@@ -52,20 +53,43 @@ from urllib.parse import urlparse
 #!from unittest.mock import MagicMock, create_autospec
 import os
 import io
+import importlib.util
+import pickle
+import gc
+from multiprocessing.shared_memory import SharedMemory
+import tempfile
 
 # External Packages
 import numpy
+import spectres
 import logging
 import sys
 import warnings
 
 # Local Packages
-from tests.utils import tic, toc
+from tests.utils import tic, toc, synthetic_records, synthetic_desi_records
 import tests.expected_pat as exp
 import sparcl.exceptions as ex
 import sparcl.gather_2d as sg
 import sparcl.client
 import sparcl.gather_2d
+import sparcl.resample_spectra as rs
+from sparcl.spectra_store import SpectraStore
+from sparcl.benchmarks.bench_align import ref_align_records
+from sparcl.benchmarks.fake_server import FakeSparclServer, DATASETS
+import sparcl.benchmarks.fake_server as fake_server
+from sparcl.fields import Fields
+from sparcl.utils import _AttrDict
+from sparcl.metrics import Metrics
+import sparcl.framing as framing
+import sparcl.cone as cone
+import sparcl.dedup as dedup
+import sparcl.decode_pool as decode_pool
+
+try:
+    import sparcl.type_conversion as tc  # needs specutils, astropy
+except ImportError:
+    tc = None
 
 #! import sparcl.utils as ut
 
@@ -718,6 +742,1105 @@ class AlignRecordsTest(unittest.TestCase):
             # shape = ar_dict['flux'].shape
 
 
+class AlignRecordsLocalTest(unittest.TestCase):
+    """Test align_records with synthetic records (does not need a Server)"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.records = synthetic_records(15, npix=400)
+        cls.specflds = ["wavelength", "flux", "ivar", "mask"]
+
+    def test_align_same_as_reference(self):
+        """Vectorized result is identical to original algorithm."""
+        for precision in [4, 7, 11]:
+            ar_dict, grid = sg.align_records(
+                self.records, fields=self.specflds, precision=precision
+            )
+            ref_dict, ref_grid = ref_align_records(
+                self.records, fields=self.specflds, precision=precision
+            )
+            numpy.testing.assert_array_equal(grid, ref_grid)
+            for fld in self.specflds:
+                numpy.testing.assert_array_equal(ar_dict[fld], ref_dict[fld])
+
+    def test_align_bad_precision(self):
+        """Error if wavelengths do not fall on a common grid."""
+        records = synthetic_records(3, npix=400)
+        records[1]["wavelength"] = records[1]["wavelength"] * 1.00003
+        with self.assertRaises(Exception):
+            sg.align_records(records, precision=7)
+
+    def test_align_regular(self):
+        """Grid aware mode gives same arrays as unique wavelength mode."""
+        ar_dict, grid = sg.align_records(self.records, fields=self.specflds)
+        rg_dict, rg_grid = sg.align_records(
+            self.records, fields=self.specflds, mode="regular"
+        )
+        numpy.testing.assert_allclose(rg_grid, grid, rtol=1e-10)
+        for fld in ["flux", "ivar", "mask"]:
+            numpy.testing.assert_array_equal(rg_dict[fld], ar_dict[fld])
+
+    def test_align_regular_linear(self):
+        """Linear sampling (like DESI arms) is detected."""
+        records = [
+            dict(_dr="DESI-EDR", wavelength=3600 + 0.8 * (k + numpy.arange(9)))
+            for k in [0, 4, 2]
+        ]
+        ar_dict, grid = sg.align_records(
+            records, fields=["wavelength"], mode="regular"
+        )
+        self.assertEqual(ar_dict["wavelength"].shape, (3, 13))
+        numpy.testing.assert_allclose(grid, 3600 + 0.8 * numpy.arange(13))
+
+    def test_align_regular_not_regular(self):
+        """Error if wavelengths are not within tolerance of regular grid."""
+        records = synthetic_records(3, npix=400)
+        records[2]["wavelength"] = records[2]["wavelength"] * 1.00001
+        with self.assertRaises(sg.NotRegularSampling):
+            sg.align_records(records, mode="regular")
+
+    def test_align_pages(self):
+        """Streaming aligner gives same result as align_records."""
+        ar_dict, grid = sg.align_records(self.records, fields=self.specflds)
+        pages = [self.records[i : i + 4] for i in range(0, 15, 4)]
+        for source in [pages, iter(pages), iter(self.records)]:
+            pg_dict, pg_grid = sg.align_pages(
+                source, fields=self.specflds, page_size=4
+            )
+            numpy.testing.assert_array_equal(pg_grid, grid)
+            for fld in self.specflds:
+                numpy.testing.assert_array_equal(pg_dict[fld], ar_dict[fld])
+
+    def test_align_pages_memmap(self):
+        """Streaming aligner writes float32 memmap output given a grid."""
+        ar_dict, grid = sg.align_records(self.records, fields=self.specflds)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pg_dict, pg_grid = sg.align_pages(
+                iter(self.records),
+                fields=self.specflds,
+                grid=grid,
+                out=tmpdir,
+                dtype=numpy.float32,
+                numrecs=len(self.records),
+            )
+            flux = numpy.load(os.path.join(tmpdir, "flux.npy"), mmap_mode="r")
+            self.assertEqual(flux.dtype, numpy.float32)
+            numpy.testing.assert_array_equal(
+                flux, ar_dict["flux"].astype(numpy.float32)
+            )
+
+
+class ResampleRecordsTest(unittest.TestCase):
+    """Test resample_records (does not need a Server)"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Two distinct input grids shared by several records each
+        cls.records = synthetic_records(6, npix=300)
+        for rec in cls.records[2:]:
+            ref = cls.records[0] if len(rec.flux) % 2 else cls.records[1]
+            npix = len(ref.wavelength)
+            rec["wavelength"] = ref.wavelength
+            rec["flux"] = numpy.resize(rec.flux, npix)
+            rec["ivar"] = numpy.resize(rec.ivar, npix)
+        cls.records[3]["ivar"][10:20] = 0  # masked pixels
+        lo = max(r.wavelength[0] for r in cls.records)
+        cls.new_grid = numpy.arange(lo - 10, lo + 150, 2.0)
+
+    def test_resample_same_as_spectres(self):
+        """Batched result is same as resampling each record"""
+        ar_dict, grid = rs.resample_records(self.records, self.new_grid)
+        for ri, rec in enumerate(self.records):
+            ivar = numpy.where(rec.ivar > 0, rec.ivar, numpy.nan)
+            flux, err = spectres.spectres(
+                self.new_grid,
+                rec.wavelength,
+                rec.flux,
+                spec_errs=1 / numpy.sqrt(ivar),
+                fill=numpy.nan,
+                verbose=False,
+            )
+            numpy.testing.assert_allclose(ar_dict["flux"][ri], flux)
+            numpy.testing.assert_allclose(
+                ar_dict["ivar"][ri],
+                numpy.where(numpy.isfinite(err), 1 / err**2, 0),
+            )
+
+    def test_resample_matrix(self):
+        """Cached rebinning matrix gives same result as spectres"""
+        rs._rebin_cache.clear()
+        sp_dict, _ = rs.resample_records(
+            self.records, self.new_grid, method="spectres"
+        )
+        ar_dict, _ = rs.resample_records(self.records, self.new_grid)
+        self.assertEqual(len(rs._rebin_cache), 2)
+        rs.resample_records(self.records, self.new_grid)
+        self.assertEqual(len(rs._rebin_cache), 2)
+        for fld in ["flux", "ivar"]:
+            numpy.testing.assert_allclose(
+                ar_dict[fld], sp_dict[fld], rtol=1e-10, equal_nan=True
+            )
+
+    def test_resample_processes(self):
+        """Process pool gives same result"""
+        ar_dict, _ = rs.resample_records(self.records, self.new_grid)
+        pp_dict, _ = rs.resample_records(
+            self.records, self.new_grid, processes=2, chunk=2
+        )
+        for fld in ["flux", "ivar"]:
+            numpy.testing.assert_array_equal(pp_dict[fld], ar_dict[fld])
+
+
+class MergeArmsTest(unittest.TestCase):
+    """Test merge_arms (does not need a Server)"""
+
+    def test_merge_arms(self):
+        """Same as ivar weighted mean of each record"""
+        records = synthetic_desi_records(3)
+        merged = sg.merge_arms(records)
+        self.assertEqual(len(merged), 3)
+        rec, mrec = records[1], merged[1]
+        self.assertNotIn("b_flux", mrec)
+        self.assertEqual(mrec.sparcl_id, rec.sparcl_id)
+        for arm in sg.ARMS:
+            # Merged pixels of this arm
+            cols = numpy.searchsorted(mrec.wavelength, rec[f"{arm}wavelength"])
+            numpy.testing.assert_allclose(
+                mrec.wavelength[cols], rec[f"{arm}wavelength"]
+            )
+            self.assertTrue(
+                (mrec.ivar[cols] >= rec[f"{arm}ivar"] - 1e-12).all()
+            )
+        # Overlap of b and r arms
+        b_col = numpy.searchsorted(rec.b_wavelength, rec.r_wavelength[0])
+        ivar = rec.b_ivar[b_col] + rec.r_ivar[0]
+        flux = (
+            rec.b_ivar[b_col] * rec.b_flux[b_col]
+            + rec.r_ivar[0] * rec.r_flux[0]
+        ) / ivar
+        col = numpy.searchsorted(mrec.wavelength, rec.r_wavelength[0])
+        self.assertAlmostEqual(mrec.flux[col], flux)
+        self.assertAlmostEqual(mrec.ivar[col], ivar)
+        self.assertEqual(mrec.mask[col], rec.b_mask[b_col] & rec.r_mask[0])
+
+
+class SpectraStoreTest(unittest.TestCase):
+    """Test memory-mapped spectra store (does not need a Server)"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "store")
+        self.records = synthetic_records(12, npix=300)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_store_roundtrip(self):
+        """Store pages of records then reopen. Rows hold unpadded spectra."""
+        with SpectraStore.create(self.path, capacity=4) as store:
+            for cnt in range(0, len(self.records), 5):
+                store.append(self.records[cnt : cnt + 5])
+        store = SpectraStore(self.path)
+        self.assertEqual(len(store), 12)
+        self.assertEqual(store.fields, ["flux", "ivar", "mask", "wavelength"])
+        self.assertIsInstance(store["flux"], numpy.memmap)
+        for ri, rec in enumerate(self.records):
+            n = store.lengths[ri]
+            self.assertEqual(n, len(rec.flux))
+            numpy.testing.assert_array_equal(store["flux"][ri, :n], rec.flux)
+            self.assertTrue(numpy.isnan(store["flux"][ri, n:]).all())
+        self.assertEqual(
+            store.records[3]["sparcl_id"], self.records[3]["sparcl_id"]
+        )
+
+    def test_store_widen(self):
+        """Rows are widened when a longer spectrum is appended."""
+        longer = synthetic_records(2, npix=700, seed=1)
+        with SpectraStore.create(self.path, dtype="float32") as store:
+            store.append(self.records)
+            store.append(longer)
+        store = SpectraStore(self.path)
+        self.assertGreaterEqual(store.npix, max(store.lengths))
+        self.assertEqual(store["flux"].dtype, numpy.float32)
+        numpy.testing.assert_array_equal(
+            store["mask"][0, : store.lengths[0]], self.records[0].mask
+        )
+        numpy.testing.assert_allclose(
+            store["wavelength"][-1, : store.lengths[-1]],
+            longer[-1].wavelength.astype("float32"),
+        )
+
+    def test_store_field_lengths(self):
+        """Fields of a record may differ in length (e.g. DESI arms)."""
+        rng = numpy.random.default_rng(0)
+        recs = [
+            dict(b_flux=rng.random(2751), r_flux=rng.random(2326 + i * 555))
+            for i in range(3)
+        ]
+        with SpectraStore.create(self.path) as store:
+            store.append(recs[:1])  # Row width from the first page
+            store.append(recs[1:])
+        store = SpectraStore(self.path)
+        self.assertGreaterEqual(store.npix, 2326 + 2 * 555)
+        for fld in ["b_flux", "r_flux"]:
+            lengths = store.field_lengths(fld)
+            for ri, rec in enumerate(recs):
+                self.assertEqual(lengths[ri], len(rec[fld]))
+                numpy.testing.assert_array_equal(
+                    store[fld][ri, : lengths[ri]], rec[fld]
+                )
+        self.assertEqual(store.lengths.tolist(), [2751, 2881, 3436])
+
+    def test_store_check(self):
+        """An existing store only takes its own fields and dtype."""
+        with SpectraStore.create(self.path, dtype="float32") as store:
+            store.append(self.records)
+        store = SpectraStore(self.path)
+        store.check(fields=store.fields[::-1], dtype="float32")
+        with self.assertRaises(ValueError):
+            store.check(fields=["flux"])
+        with self.assertRaises(ValueError):
+            store.check(dtype="float64")
+
+
+@skipIf(tc is None, "Type conversion needs specutils")
+class TypeConversionTest(unittest.TestCase):
+    """Test batch type conversion (does not need a Server)"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.records = synthetic_records(5, npix=200)
+        cls.records += synthetic_records(2, dr="SDSS-DR16", npix=200)
+        # First three BOSS records share a wavelength grid
+        for rec in cls.records[1:3]:
+            npix = len(cls.records[0].wavelength)
+            for fld in ["flux", "ivar", "mask"]:
+                rec[fld] = numpy.resize(rec[fld], npix)
+            rec["wavelength"] = cls.records[0].wavelength
+        sci = ["sparcl_id", "redshift", "wavelength", "flux", "ivar", "mask"]
+        o2n = {
+            dr: {f"spectra.{fld}": fld for fld in sci}
+            for dr in ["BOSS-DR16", "SDSS-DR16"]
+        }
+        cls.client = _AttrDict(fields=_AttrDict(o2n=o2n))
+
+    def test_spectrum1d_groups(self):
+        """One multi-row Spectrum1D per Data Set and wavelength grid"""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            groups = tc.convert(self.records, "spectrum1d", self.client)
+        self.assertEqual(sorted(len(g.index) for g in groups), [1, 1, 1, 1, 3])
+        grp = [g for g in groups if len(g.index) == 3][0]
+        self.assertEqual(grp._dr, "BOSS-DR16")
+        spec = grp.spec1d
+        self.assertEqual(spec.flux.shape, (3, len(self.records[0].flux)))
+        numpy.testing.assert_array_equal(
+            spec.flux.value[2], self.records[2].flux
+        )
+        numpy.testing.assert_array_equal(
+            spec.spectral_axis.value, self.records[0].wavelength
+        )
+        numpy.testing.assert_array_equal(
+            spec.mask[1], self.records[1].mask != 0
+        )
+        self.assertEqual(
+            spec.meta["records"][1]["sparcl_id"], self.records[1].sparcl_id
+        )
+
+    def test_numpy_cube(self):
+        """One 3D array (records, fields, pixels) per Data Set"""
+        cubes = tc.convert(self.records, "numpy", self.client)
+        self.assertEqual(sorted(cubes.keys()), ["BOSS-DR16", "SDSS-DR16"])
+        boss = cubes["BOSS-DR16"]
+        self.assertEqual(boss.fields, ["flux", "ivar", "mask", "wavelength"])
+        self.assertEqual(boss.cube.shape[:2], (5, 4))
+        self.assertTrue(boss.cube.flags.c_contiguous)
+        rec = self.records[3]
+        npix = len(rec.flux)
+        numpy.testing.assert_array_equal(boss.cube[3, 0, :npix], rec.flux)
+        self.assertTrue(numpy.isnan(boss.cube[3, 0, npix:]).all())
+        self.assertEqual(boss.meta.sparcl_id[3], rec.sparcl_id)
+        self.assertEqual(cubes["SDSS-DR16"].index, [5, 6])
+
+    def test_numpy_cube_align(self):
+        """Aligned 3D array is same as align_records()"""
+        cubes = tc.convert(self.records[:5], "numpy", self.client, align=True)
+        boss = cubes["BOSS-DR16"]
+        adict, grid = sg.align_records(
+            self.records[:5], fields=boss.fields + ["wavelength"]
+        )
+        numpy.testing.assert_array_equal(boss.wavelength, grid)
+        for fi, fld in enumerate(boss.fields):
+            numpy.testing.assert_array_equal(boss.cube[:, fi], adict[fld])
+
+    def test_unknown_dr(self):
+        """Records from unsupported Data Set"""
+        recs = synthetic_records(1, dr="NOT-A-DR", npix=200)
+        with self.assertRaises(ex.UnkDr):
+            tc.convert(recs, "spectrum1d", self.client)
+
+
+# Worker (in another process) of FakeServerTest.test_to_shared
+def _shared_flux_sum(spectra, idx):
+    return float(spectra.array("flux", idx).sum())
+
+
+class FakeServerTest(unittest.TestCase):
+    """Test Client against a local stand-in Server (no real Server needed)"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeSparclServer(numrecs=20, datasets=list(DATASETS))
+        cls.server.start()
+        cls.client = sparcl.client.SparclClient(url=cls.server.url)
+        cls.found = cls.client.find(
+            ["sparcl_id", "specid", "data_release"], sort="specid"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def tearDown(self):
+        self.server.set_faults(
+            latency=0.0, error_rate=0.0, fail_next=0, drop_rate=0.0
+        )
+        with redirect_stdout(io.StringIO()):
+            self.client.logout()
+
+    def test_find(self):
+        """Anonymous find excludes private Data Sets"""
+        self.assertEqual(self.found.count, 60)
+        drs = set(r.data_release for r in self.found.records)
+        self.assertEqual(drs, {"SDSS-DR16", "BOSS-DR16", "DESI-EDR"})
+        specids = [r.specid for r in self.found.records]
+        self.assertEqual(specids, sorted(specids))
+
+    def test_find_split(self):
+        """Long list constraint is split into several requests"""
+        specids = [r.specid for r in self.found.records]
+        cons = dict(specid=specids[::-1] + specids[:5])
+        before = self.server.stats["/sparc/find"]
+        found = self.client.find(
+            ["specid", "ra"], constraints=cons, sort="ra", max_in_list=7
+        )
+        self.assertEqual(self.server.stats["/sparc/find"] - before, 9)
+        self.assertEqual(sorted(r.specid for r in found.records), specids)
+        ras = [r.ra for r in found.records]
+        self.assertEqual(ras, sorted(ras))
+        self.assertNotIn("sparcl_id", found.records[0])
+        self.assertIn("merge", found.timings)
+
+        found = self.client.find(
+            ["specid"],
+            constraints=cons,
+            sort="specid",
+            limit=10,
+            max_in_list=7,
+        )
+        self.assertEqual([r.specid for r in found.records], specids[:10])
+
+    def test_find_cone(self):
+        found = self.client.find(["sparcl_id", "ra", "dec"])
+        ids = numpy.array(found.ids)
+        ra = numpy.array([r.ra for r in found.records])
+        dec = numpy.array([r.dec for r in found.records])
+        # Across RA=0, and around a pole
+        for center, radius in [((1.0, 20.0), 40), ((120.0, -80.0), 30)]:
+            dist = cone.angular_distance(*center, ra, dec)
+            near = ids[dist <= radius][numpy.argsort(dist[dist <= radius])]
+            cone_found = self.client.find_cone(*center, radius, bands=2)
+            self.assertGreater(cone_found.count, 0)
+            self.assertEqual(cone_found.ids, near.tolist())
+            self.assertEqual(set(cone_found.records[0]), {"_dr", "sparcl_id"})
+
+    def test_find_cone_limit(self):
+        """A box with more records than limit gives a warning"""
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            found = self.client.find_cone(120.0, 0.0, 60, limit=500)
+        self.assertGreater(found.count, 3)
+        with self.assertWarns(Warning):
+            found = self.client.find_cone(120.0, 0.0, 60, limit=3)
+        self.assertLessEqual(found.count, 3)
+
+    def test_find_cone_bad(self):
+        with self.assertRaises(ex.BadQuery):
+            self.client.find_cone(10, 10, 1, constraints=dict(ra=[0, 1]))
+        with self.assertRaises(ex.BadQuery):
+            self.client.find_cone(10, 95, 1)
+
+    def test_cone_boxes(self):
+        boxes = cone.cone_boxes(359.0, 0.0, 2.0)
+        self.assertEqual(len(boxes), 2)
+        self.assertAlmostEqual(boxes[0][0], 357.0)
+        self.assertAlmostEqual(boxes[1][1], 1.0)
+        boxes = cone.cone_boxes(10.0, -89.0, 2.0)
+        self.assertEqual(len(boxes), 1)
+        self.assertEqual(boxes[0][:3], (0.0, 360.0, -90.0))
+
+    @skipUnless(importlib.util.find_spec("scipy"), "crossmatch needs scipy")
+    def test_crossmatch(self):
+        found = self.client.find(["sparcl_id", "ra", "dec"])
+        ids = numpy.array(found.ids)
+        ra = numpy.array([r.ra for r in found.records])
+        dec = numpy.array([r.dec for r in found.records])
+        rng = numpy.random.default_rng(3)
+        # Near every record (twice), and random positions
+        cat_ra = numpy.concatenate([ra, ra + 0.5 / 3600, [0.0, 180.0]])
+        cat_dec = numpy.concatenate([dec, dec, [-89.9, 89.9]])
+        order = rng.permutation(len(cat_ra))
+        cat_ra, cat_dec = cat_ra[order], cat_dec[order]
+
+        xm = self.client.crossmatch(cat_ra, cat_dec, 1 / 3600)
+        self.assertEqual(len(xm), 2 * len(ids))
+        for target, match in zip(xm.target, xm.match):
+            dist = cone.angular_distance(
+                cat_ra[target], cat_dec[target], ra, dec
+            )
+            self.assertEqual(xm.ids[match], ids[numpy.argmin(dist)])
+        self.assertEqual(sorted(xm.matched_ids), sorted(ids))
+        self.assertLess(xm.separation.max(), 1 / 3600)
+
+        # Every record within radius
+        xm = self.client.crossmatch(cat_ra[:5], cat_dec[:5], 20, nearest=False)
+        for target in range(5):
+            dist = cone.angular_distance(
+                cat_ra[target], cat_dec[target], ra, dec
+            )
+            self.assertEqual(
+                sorted(xm.ids[xm.match[xm.target == target]]),
+                sorted(ids[dist <= 20]),
+            )
+
+    def test_dedup(self):
+        outs = ["sparcl_id", "targetid", "specprimary"]
+        found = self.client.find(outs)
+        uniq = found.dedup()
+        self.assertIsInstance(uniq, type(found))
+        self.assertEqual(found.count, 60)  # Not changed
+        targetids = [r.targetid for r in uniq.records]
+        self.assertEqual(len(targetids), len(set(targetids)))
+        self.assertEqual(
+            set(targetids), set(r.targetid for r in found.records)
+        )
+        for rec in uniq.records:
+            primary = [
+                r.specprimary
+                for r in found.records
+                if r.targetid == rec.targetid
+            ]
+            self.assertEqual(rec.specprimary, any(primary))
+        with self.assertRaises(ex.UnknownField):
+            self.found.dedup()
+
+    def test_find_private(self):
+        """Anonymous find on a private Data Set is not allowed"""
+        with self.assertRaises(ex.AccessNotAllowed):
+            self.client.find(constraints=dict(data_release=["DESI-DR1"]))
+
+    def test_retrieve(self):
+        ids = self.found.ids[:5]
+        got = self.client.retrieve(ids, include=["sparcl_id", "flux"])
+        self.assertEqual([r.sparcl_id for r in got.records], ids)
+        got2 = self.client.retrieve(ids, include=["sparcl_id", "flux"])
+        numpy.testing.assert_array_equal(
+            got.records[3].flux, got2.records[3].flux
+        )
+
+    def test_retrieve_workers(self):
+        """Decode in a pool of processes"""
+        ids = self.found.ids[:12]
+        inc = ["sparcl_id", "flux", "wavelength", "specid"]
+        got = self.client.retrieve(ids, include=inc)
+        urls = []
+        hook = self.client.add_hook("request", lambda ev: urls.append(ev.url))
+        try:
+            got2 = self.client.retrieve(ids, include=inc, workers=2)
+        finally:
+            self.client.remove_hook("request", hook)
+        # Ordinary pkl responses (of chunks of ids) decoded by the pool
+        self.assertEqual(len(urls), 4)
+        for url in urls:
+            self.assertIn("format=pkl&", url + "&")
+        self.assertEqual(got2.count, 12)
+        self.assertEqual(got2.info, got.info)
+        for rec, rec2 in zip(got.records, got2.records):
+            self.assertEqual(sorted(rec2.keys()), sorted(rec.keys()))
+            self.assertEqual(rec2.sparcl_id, rec.sparcl_id)
+            numpy.testing.assert_array_equal(rec2.flux, rec.flux)
+        rec2.flux[0] = -1.0  # Writable (copy-on-write)
+        self.assertEqual(rec2["flux"][0], -1.0)
+
+    def test_retrieve_workers_empty(self):
+        """Empty response names the chunk of sparcl_ids it was for"""
+        ids = self.found.ids[:12]
+        submit = decode_pool.PickleDecoder.submit
+        paths = []
+
+        def empty_second(decoder, path):
+            paths.append(path)
+            if len(paths) == 2:
+                open(path, "wb").close()  # truncate
+            submit(decoder, path)
+
+        with mock.patch.object(
+            decode_pool.PickleDecoder, "submit", empty_second
+        ):
+            with self.assertRaises(ex.UnknownSparcl) as cm:
+                self.client.retrieve(ids, include=["sparcl_id"], workers=2)
+        self.assertIn(f"({ids[3]} to {ids[5]})", str(cm.exception))
+
+    def test_to_shared(self):
+        ids = self.found.ids[:6]
+        got = self.client.retrieve(ids, include=["sparcl_id", "flux"])
+        with got.to_shared() as spectra:
+            self.assertEqual(spectra.fields, ["flux"])
+            self.assertLess(len(pickle.dumps(spectra)), 1000)
+            with ProcessPoolExecutor(max_workers=2) as pool:
+                sums = list(
+                    pool.map(_shared_flux_sum, [spectra] * 6, range(6))
+                )
+            self.assertEqual(sums, [float(r.flux.sum()) for r in got.records])
+            name = spectra.name
+        with self.assertRaises(FileNotFoundError):
+            SharedMemory(name=name)
+
+    def test_to_store_existing(self):
+        got = self.client.retrieve(self.found.ids[:3], include=["flux"])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            got.to_store(tmpdir, dtype="float32")
+            self.assertEqual(len(got.to_store(tmpdir, fields=["flux"])), 6)
+            with self.assertRaises(ValueError):
+                got.to_store(tmpdir, fields=["flux", "ivar"])
+            with self.assertRaises(ValueError):
+                got.to_store(tmpdir, dtype="float64")
+
+    @skipUnless(importlib.util.find_spec("dask"), "Dask collections need dask")
+    def test_dask_spectra(self):
+        import dask
+        import sparcl.dask_spectra as dsp
+
+        boss = [r for r in self.found.records if r.data_release == "BOSS-DR16"]
+        ids = [r.sparcl_id for r in boss[:7]] + ["not-a-sparcl-id"]
+        self.assertEqual(
+            [len(p) for p in dsp.partitions(ids, partition=3)], [3, 3, 2]
+        )
+        before = self.server.stats["/sparc/spectras"]
+        arrays, grid = dsp.spectra_array(
+            ids, ["flux", "ivar"], client=self.client, partition=3
+        )
+        self.assertEqual(arrays["flux"].chunks[0], (3, 3, 2))
+        # Grid computed now (one retrieve per partition); arrays are lazy
+        self.assertEqual(self.server.stats["/sparc/spectras"] - before, 3)
+        flux, ivar = dask.compute(arrays["flux"], arrays["ivar"])
+        self.assertEqual(self.server.stats["/sparc/spectras"] - before, 6)
+
+        got = self.client.retrieve(
+            ids[:7], include=["sparcl_id", "flux", "ivar", "wavelength"]
+        )
+        ar_dict, ref_grid = sg.align_records(
+            got.reorder(ids[:7]).records, fields=["flux", "ivar", "wavelength"]
+        )
+        numpy.testing.assert_array_equal(grid, ref_grid)
+        numpy.testing.assert_array_equal(flux[:7], ar_dict["flux"])
+        numpy.testing.assert_array_equal(ivar[:7], ar_dict["ivar"])
+        self.assertTrue(numpy.isnan(flux[7]).all())
+
+        bag = dsp.records_bag(
+            self.found, include=["sparcl_id", "specid"], partition=25
+        )
+        self.assertEqual(bag.npartitions, 3)
+        specids = sorted(r["specid"] for r in bag.compute())
+        self.assertEqual(specids, [r.specid for r in self.found.records])
+
+    @skipUnless(importlib.util.find_spec("dask"), "Dask collections need dask")
+    def test_dask_clients(self):
+        """Cache of clients of tasks: keyed by timeouts, and bounded"""
+        import sparcl.dask_spectra as dsp
+
+        client = sparcl.client.SparclClient(
+            url=self.server.url, read_timeout=12
+        )
+        spec = dsp._client_spec(client)
+        self.assertIs(dsp._client(spec), client)
+        other = dict(spec, read_timeout=34)
+        made = dsp._client(other)
+        self.assertIsNot(made, client)
+        self.assertEqual(made.r_timeout, 34)
+        self.assertIs(dsp._client(other), made)
+        # The given client is not kept alive by the cache
+        key = dsp._key(spec)
+        del client
+        gc.collect()
+        self.assertNotIn(key, dsp._clients)
+        for timeout in range(1, dsp.MAX_CLIENTS + 2):
+            dsp._client(dict(spec, read_timeout=timeout))
+        self.assertEqual(len(dsp._made), dsp.MAX_CLIENTS)
+        self.assertNotIn(dsp._key(other), dsp._made)
+
+    def test_frame_spans(self):
+        payload = b"".join(framing.encode_frames([{"a": 1}, [2, 3]]))
+        spans = decode_pool.frame_spans(payload)
+        self.assertEqual(len(spans), 2)
+        self.assertEqual(spans[1][1], len(payload))
+        with self.assertRaises(ex.UnknownSparcl):
+            decode_pool.frame_spans(payload[:-1])
+
+    def test_accept_encoding(self):
+        """Only offer encodings that the client decompresses"""
+        res = self.client._request("get", f"{self.client.apiurl}/version/")
+        accept = res.request.headers["Accept-Encoding"]
+        self.assertEqual(accept, sparcl.client.ACCEPT_ENCODING)
+
+    def test_retrieve_by_specid(self):
+        specids = [r.specid for r in self.found.records[:4]]
+        got = self.client.retrieve_by_specid(
+            specids, include=["specid", "wavelength"]
+        )
+        self.assertEqual(sorted(r.specid for r in got.records), specids)
+
+    def test_missing(self):
+        ids = self.found.ids[:3] + ["no-such-id"]
+        self.assertEqual(self.client.missing(ids), ["no-such-id"])
+        specids = [self.found.records[0].specid, 5]
+        self.assertEqual(self.client.missing_specids(specids), [5])
+
+    def test_login(self):
+        with redirect_stdout(io.StringIO()):
+            self.client.login("test_user_1@noirlab.edu", "test_pw_1")
+        auth = self.client.authorized
+        self.assertEqual(auth["Loggedin_As"], "test_user_1@noirlab.edu")
+        self.assertIn("DESI-DR1", auth["Authorized_Datasets"])
+        found = self.client.find(constraints=dict(data_release=["DESI-DR1"]))
+        self.assertEqual(found.count, 20)
+
+    def test_login_bad_password(self):
+        msg = self.client.login("test_user_1@noirlab.edu", "wrong")
+        self.assertIn("Could not login", msg)
+        self.assertIsNone(self.client.token)
+
+    def test_latency(self):
+        self.server.set_faults(latency=0.2)
+        tic()
+        self.client.find(limit=1)
+        self.assertGreaterEqual(toc(), 0.2)
+
+    def test_injected_error(self):
+        self.server.set_faults(fail_next=1)
+        with self.assertRaises(ex.UnknownServerError):
+            self.client.find(limit=1)
+        self.assertEqual(self.client.find(limit=1).count, 1)
+
+    def test_timings(self):
+        """Phase timings and sizes are attached to Results"""
+        ids = self.found.ids[:4]
+        got = self.client.retrieve(ids, include=["sparcl_id", "flux"])
+        tim = got.timings
+        self.assertEqual(tim["records"], 4)
+        self.assertGreater(tim["bytes"], 4 * 3000 * 8)
+        phases = ["connect", "ttfb", "download", "unpickle", "rename"]
+        for phase in phases:
+            self.assertGreaterEqual(tim[phase], 0)
+        self.assertGreaterEqual(tim["total"], sum(tim[p] for p in phases))
+        self.assertEqual(self.found.timings["records"], 60)
+
+    def test_timings_threads(self):
+        """Concurrent calls each get their own timings"""
+        self.server.set_faults(latency=0.1)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            founds = list(
+                pool.map(lambda n: self.client.find(limit=n), [1, 2, 3, 4])
+            )
+        self.assertEqual([f.timings["records"] for f in founds], [1, 2, 3, 4])
+        for found in founds:
+            self.assertGreaterEqual(found.timings["ttfb"], 0.1)
+
+    def test_hooks(self):
+        """Hooks are called for each event of the request lifecycle"""
+        events = []
+        callback = events.append
+        for event in sparcl.client.HOOK_EVENTS:
+            self.client.add_hook(event, callback)
+        try:
+            self.client.retrieve(self.found.ids[:3], include=["flux"])
+        finally:
+            for event in sparcl.client.HOOK_EVENTS:
+                self.client.remove_hook(event, callback)
+        names = [ev.event for ev in events]
+        self.assertEqual(names[:2], ["request", "response"])
+        self.assertEqual(names[-2:], ["decode", "wrap"])
+        self.assertIn("chunk", names)
+        self.assertEqual(len(set(ev.call_id for ev in events)), 1)
+        self.assertEqual(events[1].status, 200)
+        chunks = [ev for ev in events if ev.event == "chunk"]
+        self.assertEqual(chunks[-1].bytes, chunks[-1].content_length)
+        self.assertEqual(events[-1].records, 3)
+        self.assertEqual(events[-1].call, "retrieve")
+        with self.assertRaises(Exception):
+            self.client.add_hook("no-such-event", callback)
+
+    def test_progress(self):
+        """Progress of paged retrieve is reported"""
+        states = []
+        pages = self.client.retrieve_pages(
+            self.found.ids[:5],
+            page=2,
+            include=["flux"],
+            progress=states.append,
+        )
+        self.assertEqual([p.count for p in pages], [2, 2, 1])
+        self.assertEqual(states[-1].stage, "done")
+        self.assertEqual(states[-1].records, 5)
+        self.assertEqual(states[-1].eta, 0)
+        self.assertEqual(
+            sorted(set((st.page, st.pages) for st in states)),
+            [(1, 3), (2, 3), (3, 3)],
+        )
+        stages = [st.stage for st in states if st.page == 2]
+        self.assertEqual(stages[0], "waiting")
+        self.assertIn("downloading", stages)
+        self.assertIn("decoding", stages)
+        total = [st.total_bytes for st in states]
+        self.assertEqual(total, sorted(total))
+        self.assertTrue(all(st.eta is not None for st in states[3:]))
+
+    def test_retrieve_stream(self):
+        """Streamed records are the same as retrieved records"""
+        ids = self.found.ids[:6]
+        include = ["sparcl_id", "flux", "wavelength"]
+        got = self.client.retrieve(ids, include=include)
+        stream = self.client.retrieve_stream(ids, include=include)
+        first = next(stream)
+        self.assertEqual(stream.count, 1)
+        self.assertTrue(stream.hdr["status"]["success"])
+        recs = [first] + list(stream)
+        self.assertEqual([r.sparcl_id for r in recs], ids)
+        numpy.testing.assert_array_equal(recs[5].flux, got.records[5].flux)
+        self.assertEqual(stream.timings["records"], 6)
+
+    def test_retrieve_stream_ndjson(self):
+        ids = self.found.ids[:2]
+        recs = list(
+            self.client.retrieve_stream(
+                ids, include=["sparcl_id", "ra"], format="ndjson"
+            )
+        )
+        self.assertEqual([r.sparcl_id for r in recs], ids)
+        with self.assertRaises(ex.BadQuery):
+            self.client.retrieve_stream(ids, format="xml")
+
+    def test_frame_decoder(self):
+        """Frames split across any chunk boundaries are decoded"""
+        objs = [dict(a=1), dict(b=numpy.arange(5)), dict(c="x" * 100)]
+        payload = b"".join(framing.encode_frames(objs))
+        decoder = framing.FrameDecoder()
+        got = []
+        for pos in range(0, len(payload), 7):
+            got.extend(decoder.feed(payload[pos : pos + 7]))
+        decoder.close()
+        self.assertEqual(len(got), 3)
+        numpy.testing.assert_array_equal(got[1]["b"], numpy.arange(5))
+        decoder.feed(payload[:10])
+        with self.assertRaises(ex.UnknownSparcl):
+            decoder.close()
+
+    def test_dropped_response(self):
+        self.server.set_faults(drop_rate=1.0)
+        with self.assertRaises(ex.UnknownSparcl):
+            self.client.retrieve(self.found.ids[:3])
+
+
+class MetricsTest(unittest.TestCase):
+    """Test client metrics against a local stand-in Server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeSparclServer(numrecs=10).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_disabled(self):
+        client = sparcl.client.SparclClient(url=self.server.url)
+        self.assertIsNone(client.metrics)
+        self.assertEqual(client.find(limit=2).count, 2)
+
+    def test_counts(self):
+        client = sparcl.client.SparclClient(url=self.server.url, metrics=True)
+        found = client.find(limit=5)
+        client.retrieve(found.ids, include=["flux"])
+        client.version
+        met = client.metrics
+        self.assertEqual(
+            met.requests.value(endpoint="/sparc/find/", status="200"), 1
+        )
+        self.assertEqual(met.latency.count(endpoint="/sparc/spectras/"), 1)
+        self.assertEqual(met.records.value(method="retrieve"), 5)
+        self.assertGreater(met.bytes_in.value(endpoint="/sparc/spectras/"), 0)
+        self.assertGreater(met.bytes_out.value(endpoint="/sparc/find/"), 0)
+        self.assertEqual(met.cache.value(cache="version", result="hit"), 1)
+        snap = met.snapshot()
+        self.assertEqual(snap["sparcl_records_total"][0]["value"], 5)
+
+    def test_error_status(self):
+        metrics = Metrics()
+        client = sparcl.client.SparclClient(
+            url=self.server.url, metrics=metrics
+        )
+        self.server.set_faults(fail_next=1)
+        with self.assertRaises(ex.UnknownServerError):
+            client.find(limit=1)
+        self.assertEqual(
+            metrics.requests.value(endpoint="/sparc/find/", status="500"), 1
+        )
+
+    def test_concurrent_export(self):
+        """Export while other threads add new labels"""
+        metrics = Metrics()
+
+        def record(num):
+            for cnt in range(200):
+                metrics.record_request(f"/sparc/{num}/{cnt}/", 200, 0.01)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(record, num) for num in range(4)]
+            while not all(fut.done() for fut in futures):
+                metrics.prometheus()
+                metrics.snapshot()
+            for fut in futures:
+                fut.result()
+        self.assertEqual(len(metrics.requests.snapshot()), 800)
+
+    def test_prometheus(self):
+        metrics = Metrics(latency_buckets=[0.1, 1])
+        metrics.record_request("/sparc/find/", 200, 0.5, bytes_out=10)
+        metrics.record_request("/sparc/find/", 200, 5.0)
+        text = metrics.prometheus()
+        self.assertIn("# TYPE sparcl_request_seconds histogram", text)
+        ep = 'endpoint="/sparc/find/"'
+        lines = [
+            f'sparcl_requests_total{{{ep},status="200"}} 2.0',
+            f'sparcl_request_seconds_bucket{{{ep},le="0.1"}} 0',
+            f'sparcl_request_seconds_bucket{{{ep},le="1.0"}} 1',
+            f'sparcl_request_seconds_bucket{{{ep},le="+Inf"}} 2',
+            f"sparcl_request_seconds_count{{{ep}}} 2",
+        ]
+        for line in lines:
+            self.assertIn(line, text.splitlines())
+
+
+class FieldsTest(unittest.TestCase):
+    """Test precomputed Field lookups (no Server needed)"""
+
+    def setUp(self):
+        rows = fake_server.datafields(["SDSS-DR16", "BOSS-DR16"])
+        # A field only in BOSS-DR16
+        rows.append(
+            dict(
+                data_release="BOSS-DR16",
+                origdp="boss_only",
+                newdp="boss_only",
+                storage="S",
+                default=True,
+                all=True,
+            )
+        )
+        self.fields = Fields(None, datafields=rows)
+
+    def test_common(self):
+        flds = self.fields
+        self.assertNotIn("boss_only", flds.common())
+        self.assertIn("boss_only", flds.common(["BOSS-DR16"]))
+        self.assertEqual(flds.common(), sorted(flds.available()))
+        self.assertIn("boss_only", flds.default_retrieve_fields())
+        self.assertNotIn(
+            "boss_only", flds.default_retrieve_fields(["SDSS-DR16"])
+        )
+
+    def test_internal_names(self):
+        flds = self.fields
+        names = flds.internal_names(["flux", "boss_only"])
+        self.assertEqual(names, {"flux"})
+        names = flds.internal_names(["flux", "boss_only"], ["BOSS-DR16"])
+        self.assertEqual(names, {"flux", "boss_only"})
+
+    def test_memoized(self):
+        flds = self.fields
+        first = flds.available(["SDSS-DR16", "BOSS-DR16"])
+        self.assertIs(flds.available(["BOSS-DR16", "SDSS-DR16"]), first)
+        self.assertIs(flds.available(), first)
+
+    def test_unknown_dataset(self):
+        with self.assertRaises(ex.UnkDr):
+            self.fields.available(["NO-SUCH-DR"])
+
+    def test_ambiguous_core(self):
+        rows = fake_server.datafields(["SDSS-DR16", "BOSS-DR16"])
+        for row in rows:
+            if row["data_release"] == "BOSS-DR16" and row["origdp"] == "ra":
+                row["newdp"] = "ra_boss"
+        with self.assertRaises(Exception):
+            Fields(None, datafields=rows)
+
+
+class DedupTest(unittest.TestCase):
+    """Test resolution of duplicate records (no Server needed)"""
+
+    def test_keep_mask(self):
+        recs = [
+            dict(targetid=1, specprimary=False),
+            dict(targetid=2, specprimary=False),
+            dict(targetid=1, specprimary=True),
+            dict(targetid=None, specprimary=False),
+            dict(targetid=None, specprimary=False),
+            dict(targetid=2, specprimary=False),
+        ]
+        keep = dedup.keep_mask(recs)
+        self.assertEqual(keep.tolist(), [False, True, True, True, True, False])
+
+    def test_by_fields(self):
+        recs = [
+            dict(targetid=1, data_release="A"),
+            dict(targetid=1, data_release="B"),
+            dict(targetid=1, data_release="A"),
+        ]
+        labels = dedup.group_labels(recs, by=["targetid", "data_release"])
+        self.assertEqual(labels[0], labels[2])
+        self.assertNotEqual(labels[0], labels[1])
+
+    @skipUnless(importlib.util.find_spec("scipy"), "radius needs scipy")
+    def test_radius(self):
+        arcsec = 1 / 3600
+        recs = [
+            dict(targetid=1, ra=10.0, dec=0.0, specprimary=False),
+            dict(targetid=2, ra=10.0 + arcsec / 2, dec=0.0, specprimary=True),
+            dict(targetid=3, ra=10.0 + arcsec, dec=0.0, specprimary=False),
+            dict(targetid=1, ra=20.0, dec=0.0, specprimary=False),
+            dict(targetid=4, ra=30.0, dec=0.0, specprimary=False),
+        ]
+        keep = dedup.keep_mask(recs, radius=0.6 * arcsec)
+        # Friends of friends: 0, 1, 2 (near) and 3 (targetid) are one
+        self.assertEqual(keep.tolist(), [False, True, False, False, True])
+
+
+class FailoverTest(unittest.TestCase):
+    """Test routing and failover across equivalent local Servers"""
+
+    def setUp(self):
+        self.servers = [FakeSparclServer(numrecs=10).start() for _ in "ab"]
+        self.urls = [server.url for server in self.servers]
+
+    def tearDown(self):
+        for server in self.servers:
+            server.stop()
+
+    def server_of(self, url):
+        return self.servers[self.urls.index(url)]
+
+    def test_route_and_failover(self):
+        client = sparcl.client.SparclClient(url=self.urls, metrics=True)
+        self.assertTrue(all(h["up"] for h in client.check_hosts()))
+        first = client.rooturl
+        other = [url for url in self.urls if url != first][0]
+        self.server_of(first).set_faults(error_rate=1.0, error_status=503)
+        found = client.find(limit=3)
+        self.assertEqual(found.count, 3)
+        self.assertEqual(client.rooturl, other)
+        retries = client.metrics.retries.value(endpoint="/sparc/find/")
+        self.assertEqual(retries, 1)
+        # Host that failed is not used during its cool down
+        before = self.server_of(first).stats["/sparc/spectras"]
+        got = client.retrieve(found.ids, include=["flux"])
+        self.assertEqual(got.count, 3)
+        self.assertEqual(
+            self.server_of(first).stats["/sparc/spectras"], before
+        )
+
+    def test_progress_with_retries(self):
+        """A request sent again (to another host) is the same page"""
+        client = sparcl.client.SparclClient(url=self.urls, host_cooldown=0)
+        ids = client.find(limit=4).ids
+        self.server_of(client.rooturl).set_faults(
+            fail_next=1, error_status=503
+        )
+        states = []
+        pages = client.retrieve_pages(
+            ids, page=2, include=["flux"], progress=states.append
+        )
+        self.assertEqual([p.count for p in pages], [2, 2])
+        # Every state before the first page is done is of page 1
+        first = [st.page for st in states if st.records == 0]
+        self.assertEqual(set(first), {1})
+        self.assertEqual(max(st.page for st in states), 2)
+        self.assertTrue(all(0 <= (st.fraction or 0) <= 1 for st in states))
+        self.assertEqual(states[-1].stage, "done")
+
+    def test_host_down(self):
+        self.servers[0].stop()
+        client = sparcl.client.SparclClient(url=self.urls)
+        self.assertEqual(client.rooturl, self.urls[1])
+        status = {h["url"]: h["up"] for h in client.check_hosts()}
+        self.assertEqual(status, {self.urls[0]: False, self.urls[1]: True})
+        self.servers[1].stop()
+        with self.assertRaises(ex.ServerConnectionError):
+            sparcl.client.SparclClient(url=self.urls)
+
+    def test_all_fail(self):
+        client = sparcl.client.SparclClient(url=self.urls, host_cooldown=0)
+        for server in self.servers:
+            server.set_faults(error_rate=1.0, error_status=503)
+        with self.assertRaises(ex.UnknownServerError):
+            client.find(limit=1)
+        self.assertEqual(sum(s.stats["/sparc/find"] for s in self.servers), 2)
+
+
+class RenamedFieldsTest(unittest.TestCase):
+    """Test find against a local Server whose Internal field names
+    differ from the Science field names"""
+
+    @classmethod
+    def setUpClass(cls):
+        renamed = dict(sparcl_id="uuid", specid="specobjid", redshift="z")
+        cls.server = FakeSparclServer(numrecs=20, renamed=renamed).start()
+        cls.client = sparcl.client.SparclClient(url=cls.server.url)
+        cls.found = cls.client.find(["specid", "redshift"], sort="-redshift")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_sort(self):
+        """Sort fields are sent with their Internal names"""
+        zs = [r.redshift for r in self.found.records]
+        self.assertEqual(len(zs), 60)
+        self.assertEqual(zs, sorted(zs, reverse=True))
+
+    def test_sort_split(self):
+        """Merged records of a split find are sorted like the Server"""
+        specids = [r.specid for r in self.found.records]
+        for sort in ["-redshift", "redshift", "specid", " -specid, redshift"]:
+            cons = dict(specid=specids)
+            one = self.client.find(
+                ["sparcl_id", "specid"], constraints=cons, sort=sort
+            )
+            split = self.client.find(
+                ["sparcl_id", "specid"],
+                constraints=cons,
+                sort=sort,
+                limit=25,
+                max_in_list=7,
+            )
+            self.assertEqual(split.ids, one.ids[:25])
+            self.assertEqual(sorted(one.ids), sorted(set(one.ids)))
+            self.assertNotIn("redshift", split.records[0])
+
+    def test_unknown_sort(self):
+        with self.assertRaises(ex.UnknownField):
+            self.client.find(sort="z")
+
+
 @skipIf("usrpw" in os.environ, "Testing auth using usrpw env var")
 class NoopTest(unittest.TestCase):
     """Non-tests."""
@@ -7,9 +7,10 @@ import socket
 from inspect import cleandoc
 
 # External packages
-#   none
+import numpy as np
+
 # LOCAL packages
-#   none
+from sparcl.utils import _AttrDict
 
 
 # e.g. pdocstr(coexist_radec.__doc__),
@@ -43,3 +44,51 @@ def objform(obj):
         return dict((k, objform(v)) for (k, v) in obj.items())
     else:
         return str(type(obj))
+
+
+# Spectra records (Science Field Names) similar to what is returned by
+# client.retrieve() but without needing a SPARCL Server.
+# Wavelengths are on a log-linear grid (like SDSS/BOSS coadds) with a
+# different starting pixel and length for each record.
+def synthetic_records(numrecs=10, dr="BOSS-DR16", npix=4600, seed=0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for ri in range(numrecs):
+        start = int(rng.integers(0, 50))
+        length = npix - int(rng.integers(0, 60))
+        loglam = 3.5523 + 1e-4 * (start + np.arange(length))
+        records.append(
+            _AttrDict(
+                sparcl_id=f"00000000-0000-0000-0000-{ri:012d}",
+                _dr=dr,
+                redshift=float(rng.uniform(0, 1)),
+                wavelength=10**loglam,
+                flux=rng.normal(10, 2, length),
+                ivar=rng.uniform(0.5, 2, length),
+                mask=rng.integers(0, 2, length),
+            )
+        )
+    return records
+
+
+# DESI-like records with separate b, r, z spectrograph arms on a linear
+# grid (0.8 Angstrom) that overlap where the arms meet.
+DESI_ARMS = dict(b_=(3600.0, 2751), r_=(5760.0, 2326), z_=(7520.0, 2881))
+
+
+def synthetic_desi_records(numrecs=10, dr="DESI-EDR", seed=0):
+    rng = np.random.default_rng(seed)
+    records = []
+    for ri in range(numrecs):
+        rec = _AttrDict(
+            sparcl_id=f"00000000-0000-0000-0001-{ri:012d}",
+            _dr=dr,
+            redshift=float(rng.uniform(0, 1)),
+        )
+        for arm, (start, npix) in DESI_ARMS.items():
+            rec[f"{arm}wavelength"] = start + 0.8 * np.arange(npix)
+            rec[f"{arm}flux"] = rng.normal(10, 2, npix)
+            rec[f"{arm}ivar"] = rng.uniform(0.5, 2, npix)
+            rec[f"{arm}mask"] = rng.integers(0, 4, npix)
+        records.append(rec)
+    return records